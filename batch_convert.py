@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Batch converter for archived Petron Settlement Reports
+Converts a directory or glob of PDFs to Excel (or CSV, JSON Lines or
+Parquet) without going through Telegram
+
+Usage:
+    python batch_convert.py archive/ --output-dir converted/
+    python batch_convert.py "archive/2025-*/*.pdf" --output-dir converted/ --rpm 15
+    python batch_convert.py archive/ --output-dir warehouse/ --format parquet
+    python batch_convert.py archive/ --store transactions.sqlite3 --owner 123456789
+
+Files whose output already exists are skipped, so an interrupted run can
+simply be started again. A manifest with per-file timings is written to the
+output directory.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import telegram_bot
+from telegram_bot import create_gemini_service
+from rate_limiter import RateLimiter
+from export_formats import WRITERS, get_writer
+from transaction_store import TransactionStore
+
+logger = logging.getLogger(__name__)
+
+
+def find_pdfs(inputs: list, recursive: bool = False) -> list:
+    """Expand directories and glob patterns into a sorted list of PDF paths"""
+    found = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            pattern = '**/*.pdf' if recursive else '*.pdf'
+            found.update(p for p in path.glob(pattern) if p.is_file())
+        elif any(ch in item for ch in '*?['):
+            found.update(Path(p) for p in glob.glob(item, recursive=True) if p.lower().endswith('.pdf'))
+        elif path.is_file():
+            found.add(path)
+        else:
+            logger.warning(f"No such file or directory: {item}")
+    # The same file reached through two inputs is converted once
+    return sorted({path.resolve() for path in found})
+
+
+def output_paths(pdfs: list, output_dir: Path, extension: str) -> list:
+    """
+    Output path for each PDF, mirroring its folder below the inputs' common folder
+    
+    archive/2025-01/report.pdf and archive/2025-02/report.pdf become
+    2025-01/report.<ext> and 2025-02/report.<ext>, so they never overwrite
+    each other. Raises ValueError if two inputs would still share an output
+    (e.g. report.pdf and report.PDF on a case-insensitive disk).
+    """
+    if not pdfs:
+        return []
+    root = Path(os.path.commonpath([str(pdf.parent) for pdf in pdfs]))
+    paths = [output_dir / pdf.relative_to(root).with_suffix(f'.{extension}') for pdf in pdfs]
+    
+    seen = {}
+    for pdf, path in zip(pdfs, paths):
+        key = str(path).lower()
+        if key in seen:
+            raise ValueError(f"{seen[key]} and {pdf} would both be written to {path}")
+        seen[key] = pdf
+    return paths
+
+
+def render(data: dict, output_format: str) -> bytes:
+    """Write one report in the chosen format (runs in a render process)"""
+    return get_writer(output_format).write([data])
+
+
+def write_atomic(path: Path, content: bytes):
+    """Write via a temporary file so a crash never leaves a partial output"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.part')
+    partial.write_bytes(content)
+    os.replace(partial, path)
+
+
+async def convert_file(pdf_path: Path, output_path: Path, semaphore: asyncio.Semaphore,
+                       render_pool: ProcessPoolExecutor, output_format: str = 'xlsx',
+                       store: TransactionStore = None, owner: int = None) -> dict:
+    """Extract one PDF and render its output file, returning a manifest entry"""
+    entry = {'input': str(pdf_path), 'output': str(output_path)}
+    started = time.perf_counter()
+
+    try:
+        async with semaphore:
+            file_bytes = await asyncio.to_thread(pdf_path.read_bytes)
+            data, sent_bytes = await telegram_bot.extract_report(file_bytes, 'application/pdf')
+            # As in the bot, rows that do not add up are re-read
+            data, reconciliation = await telegram_bot.repair_report(sent_bytes, 'application/pdf', data)
+        extracted = time.perf_counter()
+
+        loop = asyncio.get_running_loop()
+        output_bytes = await loop.run_in_executor(render_pool, render, data, output_format)
+        await asyncio.to_thread(write_atomic, output_path, output_bytes)
+        if store is not None:
+            await asyncio.to_thread(store.save_report, data, owner, reconciliation.ok)
+        finished = time.perf_counter()
+
+        entry.update({
+            'status': 'converted',
+            'reimbursement_batch': data['header']['reimbursement_batch'],
+            'transactions': len(data['transactions']),
+            'extract_seconds': round(extracted - started, 3),
+            'render_seconds': round(finished - extracted, 3),
+            'total_seconds': round(finished - started, 3),
+        })
+        logger.info(f"✅ {pdf_path.name}: {len(data['transactions'])} transactions "
+                    f"in {finished - started:.1f}s")
+
+    except Exception as e:
+        entry.update({
+            'status': 'failed',
+            'error': str(e),
+            'total_seconds': round(time.perf_counter() - started, 3),
+        })
+        logger.error(f"❌ {pdf_path.name}: {e}")
+
+    return entry
+
+
+async def convert_all(pdfs: list, output_dir: Path, concurrency: int, render_workers: int,
+                      force: bool = False, output_format: str = 'xlsx', store: TransactionStore = None,
+                      owner: int = None) -> list:
+    """Convert every PDF, skipping those whose output already exists"""
+    semaphore = asyncio.Semaphore(concurrency)
+    entries = []
+    tasks = []
+    extension = get_writer(output_format).extension
+
+    with ProcessPoolExecutor(max_workers=render_workers) as render_pool:
+        for pdf_path, output_path in zip(pdfs, output_paths(pdfs, output_dir, extension)):
+            if output_path.exists() and not force:
+                entries.append({'input': str(pdf_path), 'output': str(output_path), 'status': 'skipped'})
+                continue
+            tasks.append(convert_file(pdf_path, output_path, semaphore, render_pool, output_format, store, owner))
+
+        logger.info(f"Converting {len(tasks)} PDFs ({len(entries)} already done)")
+        entries.extend(await asyncio.gather(*tasks))
+
+    return entries
+
+
+def write_manifest(path: Path, entries: list, started_at: datetime, wall_seconds: float):
+    """Write the run summary and per-file results"""
+    manifest = {
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'wall_seconds': round(wall_seconds, 3),
+        'converted': sum(1 for e in entries if e['status'] == 'converted'),
+        'skipped': sum(1 for e in entries if e['status'] == 'skipped'),
+        'failed': sum(1 for e in entries if e['status'] == 'failed'),
+        'files': entries,
+    }
+    write_atomic(path, json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert Petron settlement PDFs to Excel or a columnar format")
+    parser.add_argument('inputs', nargs='+', help="PDF files, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir', default='converted', help="Directory for output files")
+    parser.add_argument('-f', '--format', default='xlsx', choices=list(WRITERS),
+                        help="Output format (csv, ndjson and parquet have one typed row per transaction)")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Search directories recursively")
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help="Concurrent extractions")
+    parser.add_argument('--models', help="Comma-separated model cascade, cheapest first (default: GEMINI_MODELS)")
+    parser.add_argument('--rpm', type=float, default=15, help="Gemini requests per minute")
+    parser.add_argument('--tpm', type=float, default=250000,
+                        help="Gemini tokens per minute (0 for no token limit)")
+    parser.add_argument('--render-workers', type=int, default=os.cpu_count() or 2,
+                        help="Processes used to render output files")
+    parser.add_argument('--store', help="Also keep the extracted transactions in this SQLite history")
+    parser.add_argument('--owner', type=int,
+                        help="Telegram user ID to record as sender of the stored reports (see ADMIN_USER_IDS)")
+    parser.add_argument('--manifest', help="Manifest path (default: <output-dir>/manifest.json)")
+    parser.add_argument('--force', action='store_true', help="Re-convert files that already have output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    gemini_api_key = os.getenv('GEMINI_API_KEY')
+    if not gemini_api_key:
+        print("\n❌ Missing GEMINI_API_KEY")
+        print("Set it in .env or export GEMINI_API_KEY='your-key'")
+        return 1
+
+    pdfs = find_pdfs(args.inputs, args.recursive)
+    if not pdfs:
+        print("❌ No PDF files found")
+        return 1
+
+    output_dir = Path(args.output_dir)
+    try:
+        output_paths(pdfs, output_dir, get_writer(args.format).extension)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = Path(args.manifest) if args.manifest else output_dir / 'manifest.json'
+
+    telegram_bot.gemini_service = create_gemini_service(
+        gemini_api_key, args.models, max_workers=args.concurrency, rate_limiter=RateLimiter(args.rpm, args.tpm or None)
+    )
+
+    store = TransactionStore(args.store) if args.store else None
+
+    started_at = datetime.now()
+    started = time.perf_counter()
+    try:
+        entries = asyncio.run(convert_all(pdfs, output_dir, args.concurrency, args.render_workers, args.force,
+                                          args.format, store, args.owner))
+    finally:
+        telegram_bot.gemini_service.shutdown()
+        if store is not None:
+            store.close()
+
+    manifest = write_manifest(manifest_path, entries, started_at, time.perf_counter() - started)
+
+    print("\n" + "=" * 60)
+    print(f"✅ Converted: {manifest['converted']}")
+    print(f"⏭️  Skipped:   {manifest['skipped']}")
+    print(f"❌ Failed:    {manifest['failed']}")
+    print(f"⏱️  Wall time: {manifest['wall_seconds']:.1f}s")
+    print(f"📄 Manifest:  {manifest_path}")
+    print("=" * 60)
+
+    return 1 if manifest['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Excel workbooks for extracted settlement reports
+The formatted single-report layout, its streaming variant for very large
+reports, consolidated workbooks and stored-history summaries
+
+openpyxl is imported on first use; importing this module is cheap.
+"""
+
+import os
+import logging
+from copy import copy, deepcopy
+from io import BytesIO
+
+from report_model import SettlementReport, summarize
+
+logger = logging.getLogger(__name__)
+
+# Excel's hard limit on rows per worksheet
+EXCEL_MAX_ROWS = 1048576
+
+# Reports with more transactions than this are written in streaming mode
+EXCEL_STREAMING_THRESHOLD = int(os.getenv('EXCEL_STREAMING_THRESHOLD', '5000'))
+
+def summarize_reports(reports: list) -> dict:
+    """Total transactions, gross, EWT and net per terminal and per settle day"""
+    return summarize([SettlementReport.from_dict(report) for report in reports])
+
+# Named cell styles of the report layout, created once per process; see
+# report_styles(). Each workbook gets its own copies, registered by name.
+REPORT_STYLES = {}
+CURRENCY_FORMAT = '#,##0.00'
+
+def report_styles() -> dict:
+    """The report's named styles by name, built on first use"""
+    if not REPORT_STYLES:
+        from openpyxl.styles import NamedStyle, Font, Alignment, Border, Side, PatternFill
+        from openpyxl.styles.fonts import DEFAULT_FONT
+        from openpyxl.styles.borders import DEFAULT_BORDER
+        
+        title_font = Font(name='Arial', size=14, bold=True)
+        header_font = Font(name='Arial', size=11, bold=True)
+        thin_border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+        header_fill = PatternFill(start_color='D9D9D9', end_color='D9D9D9', fill_type='solid')
+        
+        styles = [
+            NamedStyle('Report Title', font=title_font, border=copy(DEFAULT_BORDER)),
+            NamedStyle('Report Label', font=header_font, border=copy(DEFAULT_BORDER)),
+            NamedStyle('Report Table Header', font=header_font, fill=header_fill, border=thin_border,
+                       alignment=Alignment(horizontal='center', vertical='center', wrap_text=True)),
+            NamedStyle('Report Cell', font=copy(DEFAULT_FONT), border=thin_border),
+            NamedStyle('Report Count', font=copy(DEFAULT_FONT), border=thin_border,
+                       alignment=Alignment(horizontal='center')),
+            NamedStyle('Report Amount', font=copy(DEFAULT_FONT), border=thin_border,
+                       number_format=CURRENCY_FORMAT),
+            NamedStyle('Report Total Cell', font=header_font, border=thin_border),
+            NamedStyle('Report Total', font=header_font, border=thin_border, number_format=CURRENCY_FORMAT),
+        ]
+        REPORT_STYLES.update((style.name, style) for style in styles)
+    return REPORT_STYLES
+
+def register_report_styles(wb):
+    """Add the report's named styles to a workbook that does not have them yet"""
+    for name, style in report_styles().items():
+        if name not in wb.named_styles:
+            wb.add_named_style(deepcopy(style))
+
+class ExcelService:
+    """Service for generating Excel files"""
+    
+    HEADERS = [
+        "Terminal ID", "Host Batch ID", "Ids", "Settle Date",
+        "No Of Txn", "Transaction\nGross Amount", "EWT",
+        "Transaction\nNet Amount", "Description"
+    ]
+    COLUMN_WIDTHS = {
+        'A': 12, 'B': 13, 'C': 10, 'D': 20, 'E': 10,
+        'F': 16, 'G': 10, 'H': 16, 'I': 40,
+    }
+    TABLE_START_ROW = 7
+    SUMMARY_COLUMN_WIDTHS = {'A': 22, 'B': 12, 'C': 16, 'D': 12, 'E': 16, 'F': 12}
+    
+    # Named style of each transaction column, and of the totals row from "Total:" on
+    ROW_STYLES = ('Report Cell',) * 4 + ('Report Count',) + ('Report Amount',) * 3 + ('Report Cell',)
+    TOTAL_STYLES = ('Report Label',) + ('Report Total',) * 3
+    
+    @staticmethod
+    def generate_report(data: dict, streaming: bool = None) -> bytes:
+        """Generate formatted Excel file from extracted data"""
+        if streaming is None:
+            streaming = len(data['transactions']) > EXCEL_STREAMING_THRESHOLD
+        if streaming:
+            return ExcelService.generate_report_streaming(data)
+        
+        logger.info("Generating Excel report")
+        
+        from openpyxl import Workbook
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Settlement Report"
+        ExcelService.fill_report_sheet(ws, data)
+        
+        # === SAVE TO BYTES ===
+        buffer = BytesIO()
+        wb.save(buffer)
+        buffer.seek(0)
+        
+        logger.info(f"Excel generated: {len(data['transactions'])} transactions")
+        return buffer.getvalue()
+    
+    @staticmethod
+    def fill_report_sheet(ws, data: dict):
+        """Write one report's header block, transaction table and totals to a worksheet"""
+        register_report_styles(ws.parent)
+        ExcelService.write_report_layout(ws)
+        ExcelService.fill_report_data(ws, data)
+    
+    @staticmethod
+    def write_report_layout(ws):
+        """Write the parts of the report layout that do not depend on the data"""
+        # === TITLE SECTION ===
+        ws['A1'] = "Merchant Settlement Report"
+        ws['A1'].style = 'Report Title'
+        ws.merge_cells('A1:I1')
+        
+        # === HEADER INFO LABELS ===
+        for coordinate, label in (('A3', "Customer Number:"), ('A4', "Business Location:"),
+                                  ('G3', "From:"), ('G4', "To:"), ('G5', "Reimbursement Batch:")):
+            ws[coordinate] = label
+            ws[coordinate].style = 'Report Label'
+        
+        # === TABLE HEADERS ===
+        for col_idx, header in enumerate(ExcelService.HEADERS, 1):
+            cell = ws.cell(row=ExcelService.TABLE_START_ROW, column=col_idx, value=header)
+            cell.style = 'Report Table Header'
+        
+        # === COLUMN WIDTHS ===
+        for col, width in ExcelService.COLUMN_WIDTHS.items():
+            ws.column_dimensions[col].width = width
+        
+        ws.row_dimensions[ExcelService.TABLE_START_ROW].height = 30
+    
+    @staticmethod
+    def fill_report_data(ws, data: dict):
+        """Write the header values, transaction rows and totals below write_report_layout's layout"""
+        # === HEADER INFO VALUES ===
+        header = data['header']
+        ws['B3'] = header['customer_number']
+        ws['B4'] = header['business_location_id']
+        ws['C4'] = header['business_location_name']
+        ws['H3'] = header['date_from']
+        ws['H4'] = header['date_to']
+        ws['H5'] = header['reimbursement_batch']
+        
+        # === TRANSACTION ROWS ===
+        row = ExcelService.TABLE_START_ROW
+        for row, txn in enumerate(data['transactions'], row + 1):
+            values = (
+                txn['terminal_id'], txn['host_batch_id'], txn['ids'], txn['settle_date'],
+                txn['no_of_txn'], txn['gross_amount'], txn['ewt'], txn['net_amount'],
+                txn['description'],
+            )
+            for col_idx, (value, style) in enumerate(zip(values, ExcelService.ROW_STYLES), 1):
+                ws.cell(row=row, column=col_idx, value=value).style = style
+        
+        # === TOTALS ROW ===
+        totals = data['totals']
+        values = ("Total:", totals['gross_amount'], totals['ewt'], totals['net_amount'])
+        for col_idx, (value, style) in enumerate(zip(values, ExcelService.TOTAL_STYLES), 5):
+            ws.cell(row=row + 1, column=col_idx, value=value).style = style
+    
+    @staticmethod
+    def generate_report_streaming(data: dict, max_rows_per_sheet: int = EXCEL_MAX_ROWS) -> bytes:
+        """
+        Generate the same layout as generate_report with a write-only workbook
+        
+        Rows are streamed to disk as they are appended, so memory stays flat
+        regardless of row count. See StreamingReportWriter.
+        """
+        logger.info(f"Generating Excel report (streaming, {len(data['transactions'])} transactions)")
+        
+        writer = StreamingReportWriter(max_rows_per_sheet)
+        writer.start(data['header'])
+        for txn in data['transactions']:
+            writer.add_transaction(txn)
+        return writer.finish(data['totals'])
+    
+    @staticmethod
+    def summary_table_rows(summary: dict) -> list:
+        """
+        The per terminal and per settle day totals tables as rows of (value, style) cells
+        
+        Each table ends with the grand total; an empty row separates them.
+        """
+        rows = []
+        for label, totals in (("Terminal ID", summary['by_terminal']), ("Settle Date", summary['by_day'])):
+            if rows:
+                rows.append([])
+            headers = [label, "No Of Txn", "Transaction\nGross Amount", "EWT", "Transaction\nNet Amount"]
+            rows.append([(header, 'Report Table Header') for header in headers])
+            for key, total in list(totals.items()) + [("Total:", summary['total'])]:
+                if key == "Total:":
+                    styles = ('Report Total Cell',) * 2 + ('Report Total',) * 3
+                else:
+                    styles = ('Report Cell',) * 2 + ('Report Amount',) * 3
+                values = [key, total['no_of_txn'], float(total['gross_amount']),
+                          float(total['ewt']), float(total['net_amount'])]
+                rows.append(list(zip(values, styles)))
+        return rows
+    
+    @staticmethod
+    def write_rows(ws, rows: list, start_row: int):
+        """Write rows of (value, style) cells from start_row; a None style leaves the cell as is"""
+        for row, cells in enumerate(rows, start_row):
+            if cells and cells[0][1] == 'Report Table Header':
+                ws.row_dimensions[row].height = 30
+            for col_idx, (value, style) in enumerate(cells, 1):
+                cell = ws.cell(row=row, column=col_idx, value=value)
+                if style is not None:
+                    cell.style = style
+    
+    @staticmethod
+    def write_summary_tables(ws, summary: dict, start_row: int):
+        """Per terminal and per settle day totals tables, each ending with the grand total"""
+        ExcelService.write_rows(ws, ExcelService.summary_table_rows(summary), start_row)
+        for col, width in ExcelService.SUMMARY_COLUMN_WIDTHS.items():
+            ws.column_dimensions[col].width = width
+    
+    @staticmethod
+    def generate_summary(title: str, details: list, summary: dict) -> bytes:
+        """
+        Generate a one-sheet workbook with stored totals per terminal and per day
+        
+        details are (label, value) lines shown under the title.
+        """
+        from openpyxl import Workbook
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Summary"
+        register_report_styles(wb)
+        
+        ws['A1'] = title
+        ws['A1'].style = 'Report Title'
+        ws.merge_cells('A1:F1')
+        for row, (label, value) in enumerate(details, 3):
+            ws.cell(row=row, column=1, value=label).style = 'Report Label'
+            ws.cell(row=row, column=2, value=value)
+        
+        ExcelService.write_summary_tables(ws, summary, 3 + len(details) + 1)
+        
+        buffer = BytesIO()
+        wb.save(buffer)
+        return buffer.getvalue()
+    
+    @staticmethod
+    def generate_consolidated(reports: list, summary: dict = None, streaming: bool = None) -> bytes:
+        """
+        Generate one workbook for several reports
+        
+        The first sheet summarizes all reports per terminal and per settle day,
+        followed by one sheet per reimbursement batch in the report layout.
+        """
+        if summary is None:
+            summary = summarize_reports(reports)
+        if streaming is None:
+            streaming = sum(len(report['transactions']) for report in reports) > EXCEL_STREAMING_THRESHOLD
+        if streaming:
+            return ExcelService.generate_consolidated_streaming(reports, summary)
+        
+        logger.info(f"Generating consolidated Excel report for {len(reports)} reports")
+        
+        from openpyxl import Workbook
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Summary"
+        register_report_styles(wb)
+        
+        # === TITLE, HEADER INFO AND PER TERMINAL AND PER DAY TABLES ===
+        ExcelService.write_rows(ws, ExcelService.consolidated_summary_rows(reports, summary), 1)
+        ws.merge_cells('A1:F1')
+        for col, width in ExcelService.SUMMARY_COLUMN_WIDTHS.items():
+            ws.column_dimensions[col].width = width
+        
+        # === ONE SHEET PER BATCH ===
+        for report in reports:
+            sheet = wb.create_sheet(f"Batch {report['header']['reimbursement_batch']}"[:31])
+            ExcelService.fill_report_sheet(sheet, report)
+        
+        # === SAVE TO BYTES ===
+        buffer = BytesIO()
+        wb.save(buffer)
+        
+        logger.info(f"Consolidated Excel generated: {len(reports)} reports")
+        return buffer.getvalue()
+    
+    @staticmethod
+    def generate_consolidated_streaming(reports: list, summary: dict,
+                                        max_rows_per_sheet: int = EXCEL_MAX_ROWS) -> bytes:
+        """
+        Generate the same workbook as generate_consolidated with write-only sheets
+        
+        Each batch is streamed onto its own sheets by a StreamingReportWriter,
+        so memory stays flat however many transactions the bundle has.
+        """
+        logger.info(f"Generating consolidated Excel report for {len(reports)} reports (streaming)")
+        
+        writer = StreamingReportWriter(max_rows_per_sheet)
+        try:
+            writer.add_sheet("Summary", ExcelService.consolidated_summary_rows(reports, summary),
+                             ExcelService.SUMMARY_COLUMN_WIDTHS, merged='A1:F1')
+            for report in reports:
+                writer.start(report['header'], f"Batch {report['header']['reimbursement_batch']}"[:31])
+                for txn in report['transactions']:
+                    writer.add_transaction(txn)
+                writer.add_totals(report['totals'])
+            return writer.save()
+        finally:
+            writer.discard()
+    
+    @staticmethod
+    def consolidated_summary_rows(reports: list, summary: dict) -> list:
+        """The consolidated Summary sheet as rows of (value, style) cells"""
+        first, last = reports[0]['header'], reports[-1]['header']
+        batches = ", ".join(report['header']['reimbursement_batch'] for report in reports)
+        return [
+            [("Consolidated Settlement Summary", 'Report Title')],
+            [],
+            [("Business Location:", 'Report Label'), (first['business_location_id'], None),
+             (first['business_location_name'], None)],
+            [("From:", 'Report Label'), (first['date_from'], None)],
+            [("To:", 'Report Label'), (last['date_to'], None)],
+            [("Reimbursement Batches:", 'Report Label'), (batches, None)],
+            [],
+        ] + ExcelService.summary_table_rows(summary)
+
+class StreamingReportWriter:
+    """
+    Writes a report incrementally into a write-only workbook
+    
+    Rows can be added as soon as they are known, e.g. while the model is
+    still streaming its answer. Transactions that do not fit on one sheet
+    continue on "Settlement Report (2)", "(3)", ... each with its own header
+    block; the totals row goes on the last sheet. Several reports can follow
+    each other in one workbook, each started under its own sheet title.
+    """
+    
+    TABLE_START_ROW = ExcelService.TABLE_START_ROW
+    HEADERS = ExcelService.HEADERS
+    COLUMN_WIDTHS = ExcelService.COLUMN_WIDTHS
+    
+    def __init__(self, max_rows_per_sheet: int = EXCEL_MAX_ROWS):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        self._cell = WriteOnlyCell
+        self.rows_per_sheet = max_rows_per_sheet - self.TABLE_START_ROW - 1
+        self.wb = Workbook(write_only=True)
+        self.ws = None
+        self.header = None
+        self.title = None
+        self.sheet_count = 0
+        self._report_sheets = 0
+        self.rows_written = 0
+        self._sheet_rows = 0
+        register_report_styles(self.wb)
+    
+    def _styled(self, value, style: str):
+        cell = self._cell(self.ws, value=value)
+        cell.style = style
+        return cell
+    
+    def start(self, header: dict, title: str = "Settlement Report"):
+        """Begin the first sheet of a report with its header"""
+        self.header = header
+        self.title = title
+        self._report_sheets = 0
+        self._new_sheet()
+    
+    def _new_sheet(self):
+        self.sheet_count += 1
+        self._report_sheets += 1
+        title = self.title if self._report_sheets == 1 else f"{self.title} ({self._report_sheets})"
+        ws = self.ws = self.wb.create_sheet(title)
+        self._sheet_rows = 0
+        header = self.header
+        
+        for col, width in self.COLUMN_WIDTHS.items():
+            ws.column_dimensions[col].width = width
+        ws.row_dimensions[self.TABLE_START_ROW].height = 30
+        
+        # === TITLE AND HEADER INFO ===
+        ws.append([self._styled("Merchant Settlement Report", 'Report Title')])
+        ws.merged_cells.add('A1:I1')
+        ws.append([])
+        ws.append([
+            self._styled("Customer Number:", 'Report Label'), header['customer_number'],
+            None, None, None, None,
+            self._styled("From:", 'Report Label'), header['date_from']
+        ])
+        ws.append([
+            self._styled("Business Location:", 'Report Label'), header['business_location_id'],
+            header['business_location_name'], None, None, None,
+            self._styled("To:", 'Report Label'), header['date_to']
+        ])
+        ws.append([
+            None, None, None, None, None, None,
+            self._styled("Reimbursement Batch:", 'Report Label'), header['reimbursement_batch']
+        ])
+        ws.append([])
+        
+        # === TABLE HEADERS ===
+        ws.append([self._styled(text, 'Report Table Header') for text in self.HEADERS])
+    
+    def add_transaction(self, txn: dict):
+        """Append one transaction row, starting a new sheet at the row limit"""
+        if self._sheet_rows >= self.rows_per_sheet:
+            self._new_sheet()
+        
+        self.ws.append([
+            self._styled(txn['terminal_id'], 'Report Cell'),
+            self._styled(txn['host_batch_id'], 'Report Cell'),
+            self._styled(txn['ids'], 'Report Cell'),
+            self._styled(txn['settle_date'], 'Report Cell'),
+            self._styled(txn['no_of_txn'], 'Report Count'),
+            self._styled(txn['gross_amount'], 'Report Amount'),
+            self._styled(txn['ewt'], 'Report Amount'),
+            self._styled(txn['net_amount'], 'Report Amount'),
+            self._styled(txn['description'], 'Report Cell'),
+        ])
+        self._sheet_rows += 1
+        self.rows_written += 1
+    
+    def add_sheet(self, title: str, rows: list, column_widths: dict, merged: str = None):
+        """Append a sheet of rows of (value, style) cells, as ExcelService.write_rows writes them"""
+        ws = self.ws = self.wb.create_sheet(title)
+        for col, width in column_widths.items():
+            ws.column_dimensions[col].width = width
+        for row, cells in enumerate(rows, 1):
+            if cells and cells[0][1] == 'Report Table Header':
+                ws.row_dimensions[row].height = 30
+            ws.append([value if style is None else self._styled(value, style) for value, style in cells])
+        if merged:
+            ws.merged_cells.add(merged)
+    
+    def finish(self, totals: dict) -> bytes:
+        """Append the totals row and return the workbook bytes"""
+        self.add_totals(totals)
+        return self.save()
+    
+    def add_totals(self, totals: dict):
+        """Append the current report's totals row"""
+        self.ws.append([
+            None, None, None, None,
+            self._styled("Total:", 'Report Label'),
+            self._styled(totals['gross_amount'], 'Report Total'),
+            self._styled(totals['ewt'], 'Report Total'),
+            self._styled(totals['net_amount'], 'Report Total'),
+        ])
+    
+    def save(self) -> bytes:
+        """The workbook bytes; nothing can be added afterwards"""
+        buffer = BytesIO()
+        self.wb.save(buffer)
+        
+        logger.info(f"Excel generated: {self.rows_written} transactions on {self.sheet_count} sheet(s)")
+        return buffer.getvalue()
+    
+    def discard(self):
+        """
+        Close the sheets and delete their temporary files
+        
+        Write-only sheets spool their rows to /tmp/openpyxl.* files that are
+        only removed when the workbook is saved. Safe to call after finish().
+        """
+        for ws in self.wb.worksheets:
+            sheet_writer = ws._writer
+            if sheet_writer is None:
+                continue
+            if not ws.closed:
+                ws.close()
+            if os.path.exists(sheet_writer.out):
+                sheet_writer.cleanup()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Output formats for extracted settlement reports
+XLSX for people, CSV, JSON Lines and Parquet for warehouse loaders
+
+Every writer takes a list of extracted reports (the dicts returned by
+extract_report), and optionally their summarize() result, and returns the
+file as bytes. The columnar writers emit one
+row per transaction with typed columns, so a loader never has to open a
+workbook to read the rows back out.
+"""
+
+import csv
+import json
+import logging
+from io import BytesIO, StringIO
+from decimal import Decimal
+from datetime import datetime
+
+from report_model import to_decimal, to_int, parse_settle_date
+from excel_report import ExcelService
+
+logger = logging.getLogger(__name__)
+
+# One row per transaction; report identifiers are repeated on each row so
+# several reports can be loaded into one table. Identifiers stay text to keep
+# leading zeros.
+COLUMNS = [
+    ('reimbursement_batch', 'string'),
+    ('customer_number', 'string'),
+    ('business_location_id', 'string'),
+    ('terminal_id', 'string'),
+    ('host_batch_id', 'string'),
+    ('ids', 'string'),
+    ('settle_date', 'timestamp'),
+    ('no_of_txn', 'int'),
+    ('gross_amount', 'decimal'),
+    ('ewt', 'decimal'),
+    ('net_amount', 'decimal'),
+    ('description', 'string'),
+]
+HEADER_COLUMNS = ('reimbursement_batch', 'customer_number', 'business_location_id')
+
+# Registered writers by format name, and other names users may type
+WRITERS = {}
+ALIASES = {'excel': 'xlsx', 'jsonl': 'ndjson', 'json': 'ndjson', 'pq': 'parquet'}
+DEFAULT_FORMAT = 'xlsx'
+
+
+def typed_rows(reports: list):
+    """Yield one tuple per transaction, in COLUMNS order, with typed values"""
+    for report in reports:
+        header = report.get('header') or {}
+        context = tuple(header.get(name) or None for name in HEADER_COLUMNS)
+        for txn in report.get('transactions') or []:
+            yield context + (
+                txn.get('terminal_id') or None,
+                txn.get('host_batch_id') or None,
+                txn.get('ids') or None,
+                parse_settle_date(txn.get('settle_date')),
+                to_int(txn.get('no_of_txn')),
+                to_decimal(txn.get('gross_amount')),
+                to_decimal(txn.get('ewt')),
+                to_decimal(txn.get('net_amount')),
+                txn.get('description') or None,
+            )
+
+
+def register_writer(cls):
+    """Class decorator adding a writer to WRITERS under its name"""
+    WRITERS[cls.name] = cls
+    return cls
+
+
+def normalize_format(name: str) -> str:
+    """Canonical format name for what a user typed, or None if unknown"""
+    name = (name or '').strip().lower().lstrip('.#')
+    name = ALIASES.get(name, name)
+    return name if name in WRITERS else None
+
+
+def get_writer(name: str):
+    """Writer instance for a format name or alias"""
+    format_name = normalize_format(name)
+    if format_name is None:
+        raise ValueError(f"Unknown output format '{name}'. Choose one of: {', '.join(WRITERS)}")
+    return WRITERS[format_name]()
+
+
+class ReportWriter:
+    """Base class of output formats; subclasses set the class attributes and implement write"""
+
+    name = None
+    extension = None
+    mime_type = None
+
+    def write(self, reports: list, summary: dict = None) -> bytes:
+        """
+        The file for the reports
+
+        summary is the reports' summarize() result when the caller already
+        has it; formats that show totals use it instead of summing again.
+        """
+        raise NotImplementedError
+
+    def filename(self, reports: list) -> str:
+        """settlement_report_<batch>, or <first>-<last> for several reports"""
+        first = reports[0]['header']['reimbursement_batch']
+        last = reports[-1]['header']['reimbursement_batch']
+        batches = first if len(reports) == 1 else f"{first}-{last}"
+        return f"settlement_report_{batches}.{self.extension}"
+
+
+@register_writer
+class XlsxWriter(ReportWriter):
+    """The formatted workbook; several reports become one consolidated workbook"""
+
+    name = 'xlsx'
+    extension = 'xlsx'
+    mime_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    def write(self, reports: list, summary: dict = None) -> bytes:
+        if len(reports) == 1:
+            return ExcelService.generate_report(reports[0])
+        return ExcelService.generate_consolidated(reports, summary)
+
+
+@register_writer
+class CsvWriter(ReportWriter):
+    """UTF-8 CSV with a header row; timestamps in ISO format, amounts with two decimals"""
+
+    name = 'csv'
+    extension = 'csv'
+    mime_type = 'text/csv'
+
+    def write(self, reports: list, summary: dict = None) -> bytes:
+        buffer = StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow([name for name, _ in COLUMNS])
+        for row in typed_rows(reports):
+            writer.writerow(['' if value is None else
+                             value.isoformat(sep=' ') if isinstance(value, datetime) else value
+                             for value in row])
+        return buffer.getvalue().encode('utf-8')
+
+
+@register_writer
+class NdjsonWriter(ReportWriter):
+    """One JSON object per transaction; amounts are numbers with at most two decimals"""
+
+    name = 'ndjson'
+    extension = 'ndjson'
+    mime_type = 'application/x-ndjson'
+
+    @staticmethod
+    def _json_value(value):
+        if isinstance(value, Decimal):
+            # Exact for centavo amounts: float repr is the shortest round-trip text
+            return float(value)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+    def write(self, reports: list, summary: dict = None) -> bytes:
+        names = [name for name, _ in COLUMNS]
+        lines = [
+            json.dumps(dict(zip(names, map(self._json_value, row))), ensure_ascii=False)
+            for row in typed_rows(reports)
+        ]
+        return ('\n'.join(lines) + '\n' if lines else '').encode('utf-8')
+
+
+@register_writer
+class ParquetWriter(ReportWriter):
+    """Parquet with decimal(14, 2) amounts, int32 counts and timestamp settle dates (needs pyarrow)"""
+
+    name = 'parquet'
+    extension = 'parquet'
+    mime_type = 'application/vnd.apache.parquet'
+
+    @staticmethod
+    def schema():
+        import pyarrow as pa
+        types = {
+            'string': pa.string(),
+            'timestamp': pa.timestamp('s'),
+            'int': pa.int32(),
+            'decimal': pa.decimal128(14, 2),
+        }
+        return pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+    def write(self, reports: list, summary: dict = None) -> bytes:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+        rows = list(typed_rows(reports))
+        columns = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+        table = pa.Table.from_arrays(
+            [list(values) for values in columns], schema=self.schema()
+        )
+        buffer = BytesIO()
+        pq.write_table(table, buffer, compression='zstd')
+        return buffer.getvalue()
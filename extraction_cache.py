@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for extraction results
+In-memory LRU in front of a SQLite store, keyed by file hash + prompt/model version
+
+An entry's workbook is optional: it is only generated when someone asks
+for XLSX, and can be added to the entry later.
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    excel BLOB,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS file_ids (
+    file_unique_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+def content_hash(file_bytes) -> str:
+    """SHA-256 of the raw file bytes"""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+class ExtractionCache:
+    """Two-level cache of extracted data and generated workbooks"""
+
+    def __init__(self, path: str, memory_entries: int = 32, max_entries: int = 500,
+                 ttl_seconds: float = 30 * 24 * 3600):
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        logger.info(f"Extraction cache opened at {path} (max {max_entries} entries)")
+
+    @staticmethod
+    def _key(file_hash: str, version: str) -> str:
+        return f"{file_hash}:{version}"
+
+    def _expired(self, created: float, now: float) -> bool:
+        return now - created > self.ttl_seconds
+
+    def _remember(self, key: str, entry: tuple):
+        """Insert into the in-memory LRU, evicting the least recently used"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, file_hash: str, version: str):
+        """Return (data, excel_bytes) for a file hash, or None on a miss; excel_bytes is None without a workbook"""
+        key = self._key(file_hash, version)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                data, excel_bytes, created = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    return data, excel_bytes
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT data, excel, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            data_json, excel_bytes, created = row
+            if self._expired(created, now):
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+
+            data = json.loads(data_json)
+            self._remember(key, (data, excel_bytes, created))
+            return data, excel_bytes
+
+    def file_hash(self, file_unique_id: str):
+        """Content hash of a previous upload with Telegram's file_unique_id, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash FROM file_ids WHERE file_unique_id = ?", (file_unique_id,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def get_by_file_id(self, file_unique_id: str, version: str):
+        """Look up a previous upload by Telegram's file_unique_id"""
+        file_hash = self.file_hash(file_unique_id)
+        if file_hash is None:
+            return None
+        return self.get(file_hash, version)
+
+    def link_file_id(self, file_unique_id: str, file_hash: str):
+        """Remember which content a Telegram file_unique_id refers to"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO file_ids (file_unique_id, content_hash, created) VALUES (?, ?, ?)",
+                (file_unique_id, file_hash, time.time())
+            )
+            self._db.commit()
+
+    def put(self, file_hash: str, version: str, data: dict, excel_bytes: bytes = None,
+            file_unique_id: str = None):
+        """Store extracted data and, if one was generated, the workbook"""
+        key = self._key(file_hash, version)
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, data, excel, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(data), excel_bytes, now, now)
+            )
+            if file_unique_id:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO file_ids (file_unique_id, content_hash, created) VALUES (?, ?, ?)",
+                    (file_unique_id, file_hash, now)
+                )
+            self._evict(now)
+            self._db.commit()
+            self._remember(key, (data, excel_bytes, now))
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        cutoff = now - self.ttl_seconds
+        self._db.execute("DELETE FROM entries WHERE created < ?", (cutoff,))
+        self._db.execute("DELETE FROM file_ids WHERE created < ?", (cutoff,))
+        self._db.execute(
+            "DELETE FROM entries WHERE key IN ("
+            "SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Incremental parser for streamed extraction JSON
+Emits the header and each transaction as soon as its object is complete
+"""
+
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReportStreamParser:
+    """
+    Scans the model's answer chunk by chunk
+
+    Only the structure is tracked while scanning (nesting depth, strings and
+    the current top-level key), so each character is looked at once. When
+    the "header" object or an object inside the "transactions" array closes,
+    that slice is decoded with json.loads and handed to the callbacks.
+    Markdown code fences around the JSON are ignored.
+    """
+
+    def __init__(self, on_header=None, on_transaction=None):
+        self.on_header = on_header
+        self.on_transaction = on_transaction
+        self.header = None
+        self.transaction_count = 0
+        # Set when the streamed answer was replaced by another model's
+        self.discarded = False
+        self._text = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._key = None
+        self._object_start = None
+
+    @property
+    def text(self) -> str:
+        """Everything received so far"""
+        return self._text
+
+    def feed(self, chunk: str):
+        """Consume the next piece of the answer"""
+        self._text += chunk
+        text = self._text
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start + 1:i]
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ':' and self._depth == 1:
+                self._key = self._last_string
+            elif ch in '{[':
+                self._depth += 1
+                if ch == '{' and self._at_tracked_object():
+                    self._object_start = i
+            elif ch in '}]':
+                if ch == '}' and self._object_start is not None and self._at_tracked_object():
+                    self._emit(text[self._object_start:i + 1])
+                    self._object_start = None
+                self._depth -= 1
+                if self._depth == 1:
+                    self._key = None
+
+        self._pos = len(text)
+
+    def _at_tracked_object(self) -> bool:
+        """True at the depth of the header object or of a transaction object"""
+        return ((self._key == 'header' and self._depth == 2)
+                or (self._key == 'transactions' and self._depth == 3))
+
+    def _emit(self, fragment: str):
+        try:
+            value = json.loads(fragment)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping undecodable {self._key} object: {e}")
+            return
+
+        if self._key == 'header':
+            self.header = value
+            if self.on_header is not None:
+                self.on_header(value)
+        else:
+            self.transaction_count += 1
+            if self.on_transaction is not None:
+                self.on_transaction(value)
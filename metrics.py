@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for report processing
+Stage timings, outcome counters and queue gauges, served at /metrics
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Buckets from a fast cache hit up to a long multi-page Gemini extraction
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    'report_stage_seconds',
+    'Time spent in each stage of processing a report (download, extract, repair, excel, export, store, query, reply)',
+    ['stage'],
+    buckets=STAGE_BUCKETS
+)
+REPORTS = Counter(
+    'reports_total',
+    'Reports handled, by outcome (success or failure)',
+    ['outcome']
+)
+CACHE_HITS = Counter(
+    'report_cache_hits_total',
+    'Reports answered from the extraction cache, by lookup (file_id or content)',
+    ['lookup']
+)
+REPAIRS = Counter(
+    'report_repairs_total',
+    'Extractions that did not reconcile and were re-queried, by outcome (fixed, improved or unchanged)',
+    ['outcome']
+)
+MODEL_SECONDS = Histogram(
+    'gemini_request_seconds',
+    'Duration of successful Gemini requests, by model',
+    ['model'],
+    buckets=STAGE_BUCKETS
+)
+MODEL_TOKENS = Counter(
+    'gemini_tokens_total',
+    'Tokens reported by the Gemini API, by model and kind (prompt, cached or output)',
+    ['model', 'kind']
+)
+CASCADE_RESULTS = Counter(
+    'model_cascade_results_total',
+    'Validated extractions by model and outcome (accepted, escalated to the next model, or rejected by the last)',
+    ['model', 'outcome']
+)
+WEBHOOK_SECONDS = Histogram(
+    'webhook_response_seconds',
+    'Time to acknowledge a Telegram webhook request',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+)
+WEBHOOK_DUPLICATES = Counter('webhook_duplicate_updates_total', 'Redelivered updates ignored by update_id')
+JOBS_IN_FLIGHT = Gauge('report_jobs_in_flight', 'Report jobs currently being processed')
+QUEUE_DEPTH = Gauge('report_queue_depth', 'Report jobs waiting for a worker')
+
+
+def stage_timer(stage: str):
+    """Context manager that records the duration of one processing stage"""
+    return STAGE_SECONDS.labels(stage).time()
+
+
+def watch_queue(queue):
+    """Report the queue's depth and running jobs whenever metrics are scraped"""
+    QUEUE_DEPTH.set_function(lambda: queue.depth)
+    JOBS_IN_FLIGHT.set_function(lambda: queue.running)
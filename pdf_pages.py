@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Page-level PDF helpers
+Splits reports into page groups so they can be extracted concurrently, and
+prunes pages that do not contain the settlement table
+"""
+
+import re
+import logging
+from io import BytesIO
+
+logger = logging.getLogger(__name__)
+
+# Gemini bills each PDF page as one image of this many tokens
+TOKENS_PER_PDF_PAGE = 258
+
+TABLE_HEADER_PATTERN = re.compile(r'Terminal\s+ID.*(Settle\s+Date|Host)', re.IGNORECASE | re.DOTALL)
+TABLE_ROW_PATTERN = re.compile(r'^\d{6,}\s+\d+\s+\d+\s+\d{1,2}/\d{1,2}/\d{4}', re.MULTILINE)
+TOTAL_LINE_PATTERN = re.compile(r'^Total\s*:\s*-?[\d,]+\.\d{2}', re.MULTILINE)
+REPORT_HEADER_PATTERN = re.compile(r'Reimbursement\s+Batch\s*:', re.IGNORECASE)
+
+
+def count_pages(file_bytes: bytes) -> int:
+    """Number of pages in a PDF"""
+    from pypdf import PdfReader
+    return len(PdfReader(BytesIO(file_bytes)).pages)
+
+
+def build_pdf(reader, page_indexes) -> bytes:
+    """Write the given pages of an open PdfReader into a new document"""
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for index in page_indexes:
+        writer.add_page(reader.pages[index])
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def split_pdf(file_bytes: bytes, pages_per_chunk: int) -> list:
+    """
+    Split a PDF into consecutive page groups
+
+    Returns a list of (first_page, last_page, pdf_bytes) with 1-based page numbers.
+    """
+    from pypdf import PdfReader
+    reader = PdfReader(BytesIO(file_bytes))
+    total = len(reader.pages)
+    chunks = []
+    for start in range(0, total, pages_per_chunk):
+        end = min(start + pages_per_chunk, total)
+        chunks.append((start + 1, end, build_pdf(reader, range(start, end))))
+    logger.info(f"Split {total} pages into {len(chunks)} chunks of up to {pages_per_chunk}")
+    return chunks
+
+
+def score_page(page) -> tuple:
+    """
+    Classify one pypdf page as (is_table_page, has_report_header)
+
+    A page without any text is kept when it has images (probably a scan
+    the heuristics cannot read) and dropped when it is blank. pypdf's plain
+    text is enough for these patterns and about five times faster than
+    pdfplumber's word layout, which only the text-layer parser needs.
+    """
+    text = page.extract_text() or ''
+    if not text.strip():
+        return len(page.images) > 0, False
+
+    is_table_page = bool(
+        TABLE_HEADER_PATTERN.search(text)
+        or TABLE_ROW_PATTERN.search(text)
+        or TOTAL_LINE_PATTERN.search(text)
+    )
+    return is_table_page, bool(REPORT_HEADER_PATTERN.search(text))
+
+
+def prune_pages(file_bytes: bytes) -> tuple:
+    """
+    Keep only the pages that carry the settlement table
+
+    Cover pages, remittance advices and disclaimers are dropped. If none of
+    the kept pages shows the report header (From/To/Reimbursement Batch),
+    the first page that does is kept too. Returns (pdf_bytes, kept_pages,
+    total_pages); the original bytes are returned unchanged when every page
+    is kept or no page looks like part of the table.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(BytesIO(file_bytes))
+    scores = [score_page(page) for page in reader.pages]
+    total = len(scores)
+
+    kept = [index for index, (is_table_page, _) in enumerate(scores) if is_table_page]
+    if not kept or len(kept) == total:
+        return file_bytes, total, total
+
+    if not any(scores[index][1] for index in kept):
+        header_pages = [index for index, (_, has_header) in enumerate(scores) if has_header]
+        if header_pages:
+            kept = sorted(kept + header_pages[:1])
+
+    slim_bytes = build_pdf(reader, kept)
+    dropped = total - len(kept)
+    logger.info(f"Pruned {dropped} of {total} pages: {len(file_bytes) - len(slim_bytes)} bytes "
+                f"and ~{dropped * TOKENS_PER_PDF_PAGE} tokens saved")
+    return slim_bytes, len(kept), total
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Local text-layer parser for digital Petron Merchant Settlement Reports
+Reads the transaction table from word positions, no model call needed
+"""
+
+import os
+import re
+import logging
+from io import BytesIO
+
+from report_model import SettlementReport
+
+logger = logging.getLogger(__name__)
+
+# Words whose tops differ by less than this (in points) belong to one line
+LINE_TOLERANCE = 3.0
+
+# Longer PDFs are left to Gemini; 0 reads the text layer of any length
+TEXT_LAYER_MAX_PAGES = int(os.getenv('TEXT_LAYER_MAX_PAGES', '60'))
+
+ROW_PATTERN = re.compile(
+    r'^(?P<terminal_id>\d{6,})\s+'
+    r'(?P<host_batch_id>\d+)\s+'
+    r'(?P<ids>\d+)\s+'
+    r'(?P<settle_date>\d{1,2}/\d{1,2}/\d{4}(?:\s+\d{1,2}:\d{2}\s?[AP]M)?)\s+'
+    r'(?P<no_of_txn>\d+)\s+'
+    r'(?P<gross_amount>-?[\d,]+\.\d{2})\s+'
+    r'(?P<ewt>-?[\d,]+\.\d{2})\s+'
+    r'(?P<net_amount>-?[\d,]+\.\d{2})$'
+)
+TOTALS_PATTERN = re.compile(
+    r'^Total\s*:\s*(?P<gross_amount>-?[\d,]+\.\d{2})\s+(?P<ewt>-?[\d,]+\.\d{2})\s+(?P<net_amount>-?[\d,]+\.\d{2})'
+)
+HEADER_PATTERNS = {
+    'date_from': re.compile(r'^From\s*:\s*(.+)$'),
+    'date_to': re.compile(r'^To\s*:\s*(.+)$'),
+    'reimbursement_batch': re.compile(r'^Reimbursement Batch\s*:\s*(\S+)'),
+    'customer_number': re.compile(r'^Customer Number\s*:\s*(\S+)'),
+}
+LOCATION_PATTERN = re.compile(r'^Business Location\s*:\s*(\S+)\s*(.*)$')
+
+
+def parse_amount(text: str) -> float:
+    """Parse an amount like '5,705.80' into a float"""
+    return float(text.replace(',', ''))
+
+
+def group_lines(words: list) -> list:
+    """Cluster words into lines by vertical position, each sorted left to right"""
+    lines = []
+    for word in sorted(words, key=lambda w: (w['top'], w['x0'])):
+        if lines and abs(word['top'] - lines[-1][0]['top']) < LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda w: w['x0']) for line in lines]
+
+
+def parse_row(line: list):
+    """
+    Parse one table line into a transaction dict
+
+    The numeric columns are matched as text, and everything to the right
+    of the net amount column is the description.
+    Returns (transaction, description_x0) or None if the line is not a row.
+    """
+    for split in range(len(line), 0, -1):
+        text = ' '.join(w['text'] for w in line[:split])
+        match = ROW_PATTERN.match(text)
+        if match:
+            break
+    else:
+        return None
+
+    description_words = line[split:]
+    txn = {
+        'terminal_id': match.group('terminal_id'),
+        'host_batch_id': match.group('host_batch_id'),
+        'ids': match.group('ids'),
+        'settle_date': match.group('settle_date'),
+        'no_of_txn': int(match.group('no_of_txn')),
+        'gross_amount': parse_amount(match.group('gross_amount')),
+        'ewt': parse_amount(match.group('ewt')),
+        'net_amount': parse_amount(match.group('net_amount')),
+        'description': ' '.join(w['text'] for w in description_words),
+    }
+    description_x0 = description_words[0]['x0'] if description_words else line[split - 1]['x1']
+    return txn, description_x0
+
+
+def parse_words(pages_words: list) -> dict:
+    """Build the report dict from the words of each page"""
+    header = {
+        'customer_number': '',
+        'business_location_id': '',
+        'business_location_name': '',
+        'date_from': '',
+        'date_to': '',
+        'reimbursement_batch': '',
+    }
+    transactions = []
+    totals = None
+
+    description_x0 = None
+    for words in pages_words:
+        # A description wrapped across a page break continues below the next
+        # page's column titles, before that page's first row
+        rows_on_page = 0
+        past_column_titles = False
+
+        for line in group_lines(words):
+            text = ' '.join(w['text'] for w in line)
+
+            row = parse_row(line)
+            if row is not None:
+                txn, description_x0 = row
+                transactions.append(txn)
+                rows_on_page += 1
+                continue
+
+            totals_match = TOTALS_PATTERN.match(text)
+            if totals_match:
+                totals = {key: parse_amount(value) for key, value in totals_match.groupdict().items()}
+                description_x0 = None
+                continue
+
+            # Wrapped description: only words in the description column
+            if (description_x0 is not None and transactions
+                    and (rows_on_page or past_column_titles)
+                    and line[0]['x0'] >= description_x0 - LINE_TOLERANCE):
+                transactions[-1]['description'] = f"{transactions[-1]['description']} {text}".strip()
+                continue
+            if rows_on_page:
+                description_x0 = None
+            elif any(w['text'] == 'Description' for w in line):
+                past_column_titles = True
+
+            # The header block repeats on every page; the first one found is
+            # authoritative (page 1, unless a cover page comes first)
+            if all(header.values()):
+                continue
+            for key, pattern in HEADER_PATTERNS.items():
+                match = pattern.match(text)
+                if match and not header[key]:
+                    header[key] = match.group(1).strip()
+            location_match = LOCATION_PATTERN.match(text)
+            if location_match and not header['business_location_id']:
+                header['business_location_id'] = location_match.group(1)
+                header['business_location_name'] = location_match.group(2).strip()
+
+    return {'header': header, 'transactions': transactions, 'totals': totals}
+
+
+def extract_text_layer(file_bytes: bytes, max_pages: int = TEXT_LAYER_MAX_PAGES):
+    """
+    Extract a settlement report from the PDF text layer
+
+    Returns the same dict shape as GeminiService.extract_from_bytes, or None
+    when the PDF has no usable text layer or the totals don't reconcile.
+
+    Reading word positions with pdfminer is not free: about 0.1-0.25 s per
+    page depending on the machine, 9-29 s for a 100-page report. PDFs with
+    more than max_pages pages are not read at all and also return None.
+    """
+    # pdfplumber (pdfminer) is imported on first use to keep start-up fast
+    import pdfplumber
+
+    with pdfplumber.open(BytesIO(file_bytes)) as pdf:
+        if max_pages and len(pdf.pages) > max_pages:
+            logger.info(f"PDF has {len(pdf.pages)} pages, more than {max_pages}; text layer not read")
+            return None
+        pages_words = [page.extract_words() for page in pdf.pages]
+
+    if not any(pages_words):
+        logger.info("PDF has no text layer")
+        return None
+
+    data = parse_words(pages_words)
+    if (not data['transactions'] or not data['totals']
+            or not SettlementReport.from_dict(data).reconcile().ok):
+        logger.info(f"Text layer parse did not reconcile ({len(data['transactions'])} rows)")
+        return None
+
+    logger.info(f"Text layer parse extracted {len(data['transactions'])} transactions")
+    return data
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Request and token rate limiting for Gemini calls
+Token buckets for requests-per-minute and tokens-per-minute, plus retry helpers
+"""
+
+import re
+import time
+import random
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+RETRY_AFTER_PATTERN = re.compile(r'retry in ([\d.]+)\s*s', re.IGNORECASE)
+
+
+class RateLimiter:
+    """
+    Shared requests-per-minute and tokens-per-minute quota
+
+    Each bucket refills continuously and starts full, so short bursts up to
+    the per-minute quota go through immediately. Callers that find the quota
+    exhausted wait in arrival order instead of failing. After the API
+    reports a quota error, pause() holds every caller back until the
+    suggested retry time.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute) if tokens_per_minute else 0.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute,
+                             self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute,
+                               self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    async def acquire(self, tokens: int = 0):
+        """Wait until one request of about `tokens` tokens fits in the quota"""
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+
+        # Waiters hold the lock while sleeping, which keeps them in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                wait = self._paused_until - now
+                if wait <= 0:
+                    missing_requests = 1 - self._requests
+                    missing_tokens = tokens - self._tokens if self.tokens_per_minute else 0
+                    if missing_requests <= 0 and missing_tokens <= 0:
+                        self._requests -= 1
+                        if self.tokens_per_minute:
+                            self._tokens -= tokens
+                        return
+                    wait = missing_requests * 60 / self.requests_per_minute
+                    if missing_tokens > 0:
+                        wait = max(wait, missing_tokens * 60 / self.tokens_per_minute)
+
+                await asyncio.sleep(wait)
+
+    def record_tokens(self, estimated: int, actual: int):
+        """Correct the token bucket once a request's real usage is known"""
+        if self.tokens_per_minute:
+            self._tokens -= actual - estimated
+
+    def pause(self, seconds: float):
+        """Hold back all callers for the given time (e.g. after a 429)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"Gemini quota exhausted, pausing requests for {seconds:.1f}s")
+
+
+def retry_after_seconds(error: Exception):
+    """Retry delay suggested by an API error, or None if it has no hint"""
+    for detail in getattr(error, 'details', None) or []:
+        delay = getattr(detail, 'retry_delay', None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    for key, value in headers.items():
+        if key.lower() == 'retry-after':
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                break
+
+    match = RETRY_AFTER_PATTERN.search(str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given attempt (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
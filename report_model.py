@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Compact typed model of an extracted settlement report
+Transactions are stored column by column: amounts as integer centavos and
+settle dates as minutes since 1970 in arrays, identifiers as strings.
+Totals and reconciliation are then integer sums over machine arrays
+instead of float or Decimal arithmetic on a dict per row.
+
+Extraction, the cache and the writers keep exchanging the JSON-shaped dict
+(header, transactions, totals); SettlementReport.from_dict converts at the
+point where amounts are added up or checked.
+"""
+
+import re
+from array import array
+from itertools import compress
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+
+AMOUNT_FIELDS = ('gross_amount', 'ewt', 'net_amount')
+AMOUNT_LABELS = {'gross_amount': 'Gross', 'ewt': 'EWT', 'net_amount': 'Net'}
+CENTS = Decimal('0.01')
+EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+NO_DATE = -(2 ** 63)
+
+# '11/01/2025 1:58PM', '11/01/2025 01:58 PM', '11/01/2025 13:58' or '11/01/2025'
+SETTLE_DATE = re.compile(
+    r'\s*(\d{1,2})/(\d{1,2})/(\d{4})(?:\s+(\d{1,2}):(\d{2})\s*([AaPp][Mm])?)?\s*$'
+)
+
+
+def to_decimal(value):
+    """Amount as a Decimal rounded to centavos, or None when missing or unreadable"""
+    if value is None or value == '':
+        return None
+    try:
+        return Decimal(str(value).replace(',', '')).quantize(CENTS, ROUND_HALF_UP)
+    except InvalidOperation:
+        return None
+
+
+def to_int(value):
+    """Whole number, or None when missing or unreadable"""
+    if value is None or value == '':
+        return None
+    try:
+        return int(str(value).replace(',', ''))
+    except ValueError:
+        return None
+
+
+def to_cents(value) -> int:
+    """Amount in centavos; missing or unreadable amounts count as 0"""
+    if type(value) is float or type(value) is int:
+        # Exact for any two-decimal amount below 10^13
+        return round(value * 100)
+    amount = to_decimal(value)
+    return 0 if amount is None else int(amount * 100)
+
+
+def cents_to_decimal(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
+@lru_cache(maxsize=4096)
+def _day_number(year: int, month: int, day: int) -> int:
+    """Days since 1970 (ValueError for an impossible date)"""
+    return date(year, month, day).toordinal() - EPOCH_ORDINAL
+
+
+def settle_minutes(text) -> int:
+    """Settle date like '11/01/2025 1:58PM' (the time is optional) as minutes since 1970, or NO_DATE"""
+    match = SETTLE_DATE.match(text) if isinstance(text, str) else None
+    if match is None:
+        return NO_DATE
+    month, day, year, hour, minute, meridiem = match.groups()
+    hour = int(hour or 0)
+    minute = int(minute or 0)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return NO_DATE
+        hour = hour % 12 + (12 if meridiem.upper() == 'PM' else 0)
+    if hour > 23 or minute > 59:
+        return NO_DATE
+    try:
+        return _day_number(int(year), int(month), int(day)) * 1440 + hour * 60 + minute
+    except ValueError:
+        return NO_DATE
+
+
+def minutes_to_datetime(minutes: int):
+    return None if minutes == NO_DATE else EPOCH + timedelta(minutes=minutes)
+
+
+def parse_settle_date(text):
+    """Parse a settle date like '11/01/2025 1:58PM' (the time is optional), or None"""
+    return minutes_to_datetime(settle_minutes(text))
+
+
+class Transaction:
+    """One transaction row with typed values"""
+
+    __slots__ = ('terminal_id', 'host_batch_id', 'ids', 'settle_date', 'no_of_txn',
+                 'gross_amount', 'ewt', 'net_amount', 'description')
+
+    def __init__(self, terminal_id, host_batch_id, ids, settle_date, no_of_txn,
+                 gross_amount, ewt, net_amount, description):
+        self.terminal_id = terminal_id
+        self.host_batch_id = host_batch_id
+        self.ids = ids
+        self.settle_date = settle_date
+        self.no_of_txn = no_of_txn
+        self.gross_amount = gross_amount
+        self.ewt = ewt
+        self.net_amount = net_amount
+        self.description = description
+
+    def __repr__(self):
+        return (f"Transaction({self.terminal_id}, {self.ids}, {self.settle_date}, "
+                f"net={self.net_amount})")
+
+
+class Reconciliation:
+    """Outcome of SettlementReport.reconcile"""
+
+    __slots__ = ('bad_rows', 'row_totals', 'totals')
+
+    def __init__(self, bad_rows: list, row_totals: dict, totals: dict):
+        self.bad_rows = bad_rows
+        self.row_totals = row_totals
+        self.totals = totals
+
+    @property
+    def mismatched_totals(self) -> list:
+        """Amount fields whose row sum differs from the report's printed total"""
+        return [field for field in AMOUNT_FIELDS if self.row_totals[field] != self.totals[field]]
+
+    @property
+    def ok(self) -> bool:
+        return not self.bad_rows and not self.mismatched_totals
+
+    @property
+    def problem_count(self) -> int:
+        """Unbalanced rows plus mismatched totals (0 when ok)"""
+        return len(self.bad_rows) + len(self.mismatched_totals)
+
+    def describe(self) -> str:
+        """Short explanation for logs and captions (empty when ok)"""
+        problems = []
+        if self.bad_rows:
+            rows = ', '.join(str(row + 1) for row in self.bad_rows[:5])
+            more = f" and {len(self.bad_rows) - 5} more" if len(self.bad_rows) > 5 else ""
+            problems.append(f"gross - EWT ≠ net on row {rows}{more}")
+        for field in self.mismatched_totals:
+            problems.append(f"{AMOUNT_LABELS[field]} rows sum to {self.row_totals[field]:,.2f}, "
+                            f"report total is {self.totals[field]:,.2f}")
+        return '; '.join(problems)
+
+
+class SettlementReport:
+    """
+    One report's header, transactions and printed totals, stored by column
+
+    Repeated strings (terminal IDs, descriptions) are shared between rows.
+    """
+
+    __slots__ = ('header', 'terminal_id', 'host_batch_id', 'ids', 'description',
+                 'settle_minutes', 'no_of_txn', 'gross_cents', 'ewt_cents', 'net_cents',
+                 'total_cents', '_strings')
+
+    def __init__(self, header: dict = None, totals: dict = None):
+        self.header = dict(header or {})
+        self.terminal_id = []
+        self.host_batch_id = []
+        self.ids = []
+        self.description = []
+        self.settle_minutes = array('q')
+        self.no_of_txn = array('q')
+        self.gross_cents = array('q')
+        self.ewt_cents = array('q')
+        self.net_cents = array('q')
+        self.total_cents = {field: to_cents((totals or {}).get(field)) for field in AMOUNT_FIELDS}
+        self._strings = {}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SettlementReport':
+        report = cls(data.get('header'), data.get('totals'))
+        report.extend(data.get('transactions') or [])
+        return report
+
+    def append(self, txn: dict):
+        """Add one transaction in the extraction's dict shape"""
+        self.extend([txn])
+
+    def extend(self, transactions):
+        """Add transactions in the extraction's dict shape, one column at a time"""
+        transactions = list(transactions)
+
+        def column(field):
+            return [txn.get(field) or '' for txn in transactions]
+
+        def shared(values):
+            strings = self._strings
+            return [strings.setdefault(value, value) for value in values]
+
+        self.terminal_id.extend(shared(column('terminal_id')))
+        self.host_batch_id.extend(column('host_batch_id'))
+        self.ids.extend(column('ids'))
+        self.description.extend(shared(column('description')))
+
+        # Many rows share a settle time, so each distinct text is parsed once
+        minutes = {}
+        for text in column('settle_date'):
+            value = minutes.get(text)
+            if value is None:
+                value = minutes[text] = settle_minutes(text)
+            self.settle_minutes.append(value)
+
+        self.no_of_txn.extend(value if type(value) is int else (to_int(value) or 0)
+                              for value in column('no_of_txn'))
+        self.gross_cents.extend(map(to_cents, column('gross_amount')))
+        self.ewt_cents.extend(map(to_cents, column('ewt')))
+        self.net_cents.extend(map(to_cents, column('net_amount')))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def transaction(self, index: int) -> Transaction:
+        return Transaction(
+            self.terminal_id[index], self.host_batch_id[index], self.ids[index],
+            minutes_to_datetime(self.settle_minutes[index]),
+            self.no_of_txn[index],
+            cents_to_decimal(self.gross_cents[index]),
+            cents_to_decimal(self.ewt_cents[index]),
+            cents_to_decimal(self.net_cents[index]),
+            self.description[index],
+        )
+
+    def __iter__(self):
+        return (self.transaction(index) for index in range(len(self)))
+
+    @property
+    def totals(self) -> dict:
+        """The report's printed totals as Decimals"""
+        return {field: cents_to_decimal(cents) for field, cents in self.total_cents.items()}
+
+    def row_totals(self) -> dict:
+        """Sums of the transaction rows as Decimals"""
+        return {
+            'gross_amount': cents_to_decimal(sum(self.gross_cents)),
+            'ewt': cents_to_decimal(sum(self.ewt_cents)),
+            'net_amount': cents_to_decimal(sum(self.net_cents)),
+        }
+
+    def reconcile(self) -> Reconciliation:
+        """Check gross - EWT = net on every row and the row sums against the printed totals"""
+        gross, ewt, net = self.gross_cents, self.ewt_cents, self.net_cents
+        # One pass at C speed: gross - EWT against net for every row
+        unbalanced = map(int.__ne__, map(int.__sub__, gross, ewt), net)
+        bad_rows = list(compress(range(len(net)), unbalanced))
+        return Reconciliation(bad_rows, self.row_totals(), self.totals)
+
+
+def summarize(reports: list) -> dict:
+    """
+    Total transactions, gross, EWT and net per terminal and per settle day
+
+    Sums centavos as integers and converts to Decimal once per bucket.
+    Days are keyed by MM/DD/YYYY; rows without a readable settle date are
+    grouped under ''.
+    """
+    by_terminal = {}
+    by_day = {}
+    for report in reports:
+        days = [minutes // 1440 if minutes != NO_DATE else None for minutes in report.settle_minutes]
+        columns = zip(report.terminal_id, days, report.no_of_txn,
+                      report.gross_cents, report.ewt_cents, report.net_cents)
+        for terminal_id, day, count, gross, ewt, net in columns:
+            terminal_total = by_terminal.get(terminal_id)
+            if terminal_total is None:
+                terminal_total = by_terminal[terminal_id] = [0, 0, 0, 0]
+            day_total = by_day.get(day)
+            if day_total is None:
+                day_total = by_day[day] = [0, 0, 0, 0]
+            terminal_total[0] += count
+            terminal_total[1] += gross
+            terminal_total[2] += ewt
+            terminal_total[3] += net
+            day_total[0] += count
+            day_total[1] += gross
+            day_total[2] += ewt
+            day_total[3] += net
+
+    def bucket(total: list) -> dict:
+        return {
+            'no_of_txn': total[0],
+            'gross_amount': cents_to_decimal(total[1]),
+            'ewt': cents_to_decimal(total[2]),
+            'net_amount': cents_to_decimal(total[3]),
+        }
+
+    grand_total = [sum(column) for column in zip(*by_terminal.values())] or [0, 0, 0, 0]
+
+    def day_label(day):
+        return '' if day is None else (EPOCH + timedelta(days=day)).strftime('%m/%d/%Y')
+
+    return {
+        'by_terminal': {terminal: bucket(total) for terminal, total in sorted(by_terminal.items())},
+        'by_day': {day_label(day): bucket(total)
+                   for day, total in sorted(by_day.items(), key=lambda item: (item[0] is None, item[0] or 0))},
+        'total': bucket(grand_total),
+    }
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Bounded asyncio job queue with a worker pool
+Schedules jobs round-robin across users, with per-user limits and backpressure
+"""
+
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when a job cannot be accepted"""
+
+
+class ReportQueue:
+    """Runs submitted coroutines on a fixed number of workers, fairly across users"""
+
+    def __init__(self, workers: int = 4, per_user_limit: int = 1,
+                 max_pending: int = 100, max_pending_per_user: int = 20):
+        self.workers = workers
+        self.per_user_limit = per_user_limit
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self._pending = {}         # user_id -> deque of job factories
+        self._ready = deque()      # users with pending jobs, in round-robin order
+        self._inflight = {}        # user_id -> running job count
+        self._depth = 0
+        self._running = 0
+        self._cond = None
+        self._tasks = []
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._depth
+
+    @property
+    def running(self) -> int:
+        """Number of jobs currently being processed"""
+        return self._running
+
+    @property
+    def started(self) -> bool:
+        """True while the workers are running"""
+        return bool(self._tasks)
+
+    async def start(self):
+        """Spawn the worker tasks on the running event loop"""
+        self._cond = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Report queue started with {self.workers} workers "
+                    f"({self.per_user_limit} per user, {self.max_pending} pending max)")
+
+    async def stop(self):
+        """Cancel the workers; pending jobs are dropped"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _position(self, user_id) -> int:
+        """Estimated place in line for the user's newest job under round-robin"""
+        rounds = len(self._pending[user_id])
+        return sum(min(len(jobs), rounds) for jobs in self._pending.values())
+
+    async def submit(self, user_id, job_factory) -> int:
+        """
+        Queue a job for a user
+
+        job_factory is called with no arguments and must return a coroutine.
+        Returns 0 if a worker will start the job right away, otherwise the
+        estimated queue position. Raises QueueFull when the queue or the
+        user's share of it is full.
+        """
+        async with self._cond:
+            user_jobs = self._pending.get(user_id)
+            if self._depth >= self.max_pending:
+                raise QueueFull("The queue is full")
+            if user_jobs is not None and len(user_jobs) >= self.max_pending_per_user:
+                raise QueueFull(f"You already have {len(user_jobs)} reports waiting")
+
+            if user_jobs is None:
+                user_jobs = self._pending[user_id] = deque()
+                self._ready.append(user_id)
+            user_jobs.append(job_factory)
+            self._depth += 1
+
+            position = self._position(user_id)
+            idle = self.workers - self._running
+            starts_now = (position <= idle
+                          and self._inflight.get(user_id, 0) + len(user_jobs) <= self.per_user_limit)
+
+            self._cond.notify()
+            return 0 if starts_now else position
+
+    def _next_job(self):
+        """Pick the next user in rotation who is below their in-flight limit"""
+        for _ in range(len(self._ready)):
+            user_id = self._ready.popleft()
+            if self._inflight.get(user_id, 0) >= self.per_user_limit:
+                self._ready.append(user_id)
+                continue
+
+            user_jobs = self._pending[user_id]
+            job_factory = user_jobs.popleft()
+            if user_jobs:
+                self._ready.append(user_id)
+            else:
+                del self._pending[user_id]
+
+            self._depth -= 1
+            self._running += 1
+            self._inflight[user_id] = self._inflight.get(user_id, 0) + 1
+            return user_id, job_factory
+        return None
+
+    async def _worker(self, number: int):
+        while True:
+            async with self._cond:
+                job = self._next_job()
+                while job is None:
+                    await self._cond.wait()
+                    job = self._next_job()
+
+            user_id, job_factory = job
+            try:
+                await job_factory()
+            except Exception as e:
+                logger.error(f"Job for user {user_id} failed on worker {number}: {e}", exc_info=True)
+            finally:
+                async with self._cond:
+                    self._running -= 1
+                    self._inflight[user_id] -= 1
+                    if not self._inflight[user_id]:
+                        del self._inflight[user_id]
+                    self._cond.notify_all()
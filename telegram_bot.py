@@ -5,13 +5,22 @@ Receives images or PDFs, extracts data with Gemini, returns Excel
 """
 
 import os
+import re
+import sys
 import json
+import time
+import asyncio
+import hashlib
 import logging
+import zipfile
+import threading
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 
-# Load environment variables from .env file
+# Load environment variables from .env file, before the local modules
+# that read their settings on import
 try:
     from dotenv import load_dotenv
     load_dotenv()  # Load .env file if it exists
@@ -19,35 +28,36 @@ except ImportError:
     # python-dotenv not installed, will use system environment variables
     pass
 
-# Telegram bot imports
-try:
-    from telegram import Update
-    from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-except ImportError:
-    print("Installing python-telegram-bot...")
-    os.system("pip install python-telegram-bot --break-system-packages -q")
-    from telegram import Update
-    from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
+from extraction_cache import ExtractionCache, content_hash
+from transaction_store import TransactionStore
+from pdf_parser import extract_text_layer
+from pdf_pages import count_pages, split_pdf, prune_pages
+from report_queue import ReportQueue, QueueFull
+from json_stream import ReportStreamParser
+from rate_limiter import RateLimiter, retry_after_seconds, backoff_delay
+from metrics import (
+    REPORTS, CACHE_HITS, REPAIRS, MODEL_SECONDS, MODEL_TOKENS, CASCADE_RESULTS, stage_timer, watch_queue
+)
+from export_formats import WRITERS, DEFAULT_FORMAT, get_writer, normalize_format
+from report_model import SettlementReport, Reconciliation, to_cents
+from excel_report import ExcelService, StreamingReportWriter, report_styles, summarize_reports
 
-# Gemini imports
-try:
-    import google.generativeai as genai
-except ImportError:
-    print("Installing google-generativeai...")
-    os.system("pip install google-generativeai --break-system-packages -q")
-    import google.generativeai as genai
+# Telegram bot imports
+from telegram import Update
+from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 
-# Excel imports
-try:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-    from openpyxl.utils import get_column_letter
-except ImportError:
-    print("Installing openpyxl...")
-    os.system("pip install openpyxl --break-system-packages -q")
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-    from openpyxl.utils import get_column_letter
+# google.generativeai (grpc, protobuf), openpyxl and the PDF libraries are
+# slow to import, so they are imported on first use, and tornado only in
+# webhook mode; see prewarm() and check_dependencies(). telegram and
+# prometheus_client are imported above, so a missing one already fails the
+# import of this module and is not listed here.
+REQUIRED_MODULES = {
+    'google.generativeai': 'google-generativeai',
+    'openpyxl': 'openpyxl',
+    'pdfplumber': 'pdfplumber',
+    'pypdf': 'pypdf',
+    'tornado': 'tornado',
+}
 
 # Configure logging
 logging.basicConfig(
@@ -98,198 +108,584 @@ Important:
 - Only return valid JSON, no markdown code blocks or extra text
 """
 
+# Appended to the prompt when only part of a report is sent
+PAGE_RANGE_PROMPT = """
+This document contains only pages {first_page}-{last_page} of a {total_pages}-page report.
+- Extract only the transaction rows that appear on these pages
+- Leave header fields empty if they are not shown on these pages
+- Set totals to 0 unless the "Total" line appears on these pages
+"""
+
+# Appended to the prompt to re-read rows where gross - EWT does not equal net
+ROW_REPAIR_PROMPT = """
+A previous extraction of this report misread these transaction rows
+(gross_amount - ewt does not equal net_amount):
+{rows}
+- Re-read only these rows from the document, identified by host_batch_id and ids
+- Return JSON with only a "transactions" list holding the corrected rows
+"""
+
+# Appended to the prompt to find rows missing from an extraction
+MISSING_ROWS_PROMPT = """
+A previous extraction of this report returned {row_count} transaction rows that sum to
+gross {gross}, EWT {ewt} and net {net}, but the report's Total line shows
+gross {total_gross}, EWT {total_ewt} and net {total_net}.
+The ids of the rows already extracted are: {ids}
+- Return JSON with only a "transactions" list holding the rows missing from that list
+- If the Total line was misread instead, also return the correct "totals"
+"""
+
+# Reports longer than this are split and extracted concurrently
+PAGES_PER_CHUNK = int(os.getenv('PAGES_PER_CHUNK', '3'))
+
+# Import heavy modules and build the Gemini client in the background at start-up
+PREWARM = os.getenv('PREWARM', '1') == '1'
+
+# Send Gemini only the pages that contain the settlement table
+PRUNE_PAGES = os.getenv('PRUNE_PAGES', '1') == '1'
+
+# Re-query only the rows of an extraction that do not reconcile; above these
+# sizes a focused request would not be much cheaper than the full one
+REPAIR_EXTRACTION = os.getenv('REPAIR_EXTRACTION', '1') == '1'
+REPAIR_MAX_BAD_ROWS = int(os.getenv('REPAIR_MAX_BAD_ROWS', '50'))
+REPAIR_MAX_ROWS = int(os.getenv('REPAIR_MAX_ROWS', '1000'))
+
+# Telegram user IDs whose /summary and /terminal cover every stored report;
+# everyone else only sees the locations they have sent reports for
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv('ADMIN_USER_IDS', '').replace(' ', '').split(',') if user_id}
+
+# Largest document accepted for download (the Bot API serves files up to 20 MB)
+MAX_FILE_BYTES = int(os.getenv('MAX_FILE_BYTES', str(20 * 1024 * 1024)))
+
+# Limits for consolidating several reports (ZIP or album) into one workbook
+BUNDLE_MAX_FILES = int(os.getenv('BUNDLE_MAX_FILES', '50'))
+BUNDLE_MAX_BYTES = int(os.getenv('BUNDLE_MAX_BYTES', str(100 * 1024 * 1024)))
+ZIP_MIME_TYPES = ('application/zip', 'application/x-zip-compressed')
+
+# Minimum seconds between live row-count updates of the status message
+PROGRESS_INTERVAL = float(os.getenv('PROGRESS_INTERVAL', '1.5'))
+
+# Seconds to wait for the rest of a Telegram album after its first document
+MEDIA_GROUP_WAIT = float(os.getenv('MEDIA_GROUP_WAIT', '2'))
+
+# How EXTRACTION_PROMPT reaches the model:
+#   inline - sent with every request (default)
+#   system - registered once as the model's system instruction
+#   cached - stored as Gemini cached content and refreshed before its TTL
+PROMPT_MODES = ('inline', 'system', 'cached')
+
+# Refresh the prompt cache this many seconds before it would expire
+PROMPT_CACHE_REFRESH_MARGIN = 300
+
+# After a failed prompt cache creation, wait this long before trying again
+PROMPT_CACHE_RETRY_SECONDS = 600
+
+def gemini_errors() -> tuple:
+    """(retryable, quota) exception classes: quota and transient server errors worth retrying"""
+    from google.api_core import exceptions as google_exceptions
+    retryable = (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.TooManyRequests,
+        google_exceptions.InternalServerError,
+        google_exceptions.BadGateway,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.GatewayTimeout,
+        google_exceptions.DeadlineExceeded,
+    )
+    return retryable, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+
+# Token estimate for a request before any usage has been reported
+DEFAULT_REQUEST_TOKENS = 3000
+
+# Models tried in order, cheapest first; an answer that fails the row and
+# totals checks is extracted again by the next one
+DEFAULT_MODELS = 'gemini-2.5-flash-lite,gemini-2.5-flash'
+
 class GeminiService:
     """Service for extracting data using Gemini Vision API"""
     
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-        logger.info("Gemini service initialized with gemini-2.5-flash")
+    def __init__(self, api_key: str, max_workers: int = None, prompt_mode: str = None,
+                 model_name: str = 'gemini-2.5-flash'):
+        self.api_key = api_key
+        self.model_name = model_name
+        
+        # Stronger model that answers when this one's answer fails validation
+        self.escalate_to = None
+        
+        self.prompt_mode = prompt_mode or os.getenv('GEMINI_PROMPT_MODE', 'inline')
+        if self.prompt_mode not in PROMPT_MODES:
+            raise ValueError(f"Unknown prompt mode {self.prompt_mode!r}, expected one of {PROMPT_MODES}")
+        
+        # The client is built on first use (or by prewarm()) to keep start-up fast
+        self._model = None
+        self._model_lock = threading.Lock()
+        
+        self.prompt_cache_ttl = int(os.getenv('GEMINI_PROMPT_CACHE_TTL', '3600'))
+        self._prompt_cache = None
+        self._cached_model = None
+        self._prompt_cache_expires_at = 0.0
+        self._prompt_cache_retry_at = 0.0
+        self._prompt_cache_lock = threading.Lock()
+        
+        # Token usage reported by the API, accumulated across requests
+        self.usage = {'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'output_tokens': 0}
+        self._usage_lock = threading.Lock()
+        
+        # generate_content() is synchronous, so calls run on a dedicated
+        # thread pool to keep the event loop free for other chats
+        if max_workers is None:
+            max_workers = int(os.getenv('GEMINI_MAX_WORKERS', '8'))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gemini')
+        
+        # Optional RateLimiter shared by every caller of this service
+        self.rate_limiter = None
+        self.max_retries = int(os.getenv('GEMINI_MAX_RETRIES', '5'))
+        logger.info(f"Gemini service initialized with {self.model_name} "
+                    f"({max_workers} workers, {self.prompt_mode} prompt)")
     
-    async def extract_from_bytes(self, file_bytes: bytes, mime_type: str) -> dict:
-        """Extract data from image or PDF bytes"""
-        logger.info(f"Extracting data from {mime_type}, size: {len(file_bytes)} bytes")
+    @property
+    def model(self):
+        """The GenerativeModel, created on first access"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    if self.prompt_mode == 'inline':
+                        self._model = genai.GenerativeModel(self.model_name)
+                    else:
+                        # The prompt travels with the model, so requests carry only the document
+                        self._model = genai.GenerativeModel(self.model_name, system_instruction=EXTRACTION_PROMPT)
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
+    @property
+    def cascade(self) -> list:
+        """This service followed by the ones it escalates to"""
+        services = [self]
+        while services[-1].escalate_to is not None:
+            services.append(services[-1].escalate_to)
+        return services
+    
+    @property
+    def cache_version(self) -> str:
+        """Identifies the prompt and models that produced a cached result"""
+        model_names = '\n'.join(service.model_name for service in self.cascade)
+        fingerprint = f"{model_names}\n{EXTRACTION_PROMPT}".encode('utf-8')
+        return hashlib.sha256(fingerprint).hexdigest()[:16]
+    
+    def shutdown(self):
+        """Release the extraction thread pools of this service and those it escalates to"""
+        for service in self.cascade:
+            service.executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _create_prompt_cache(self):
+        """Register EXTRACTION_PROMPT as cached content; returns (cached_content, model)"""
+        import google.generativeai as genai
+        cached_content = genai.caching.CachedContent.create(
+            model=f"models/{self.model_name}",
+            display_name="settlement-extraction-prompt",
+            system_instruction=EXTRACTION_PROMPT,
+            ttl=timedelta(seconds=self.prompt_cache_ttl)
+        )
+        return cached_content, genai.GenerativeModel.from_cached_content(cached_content)
+    
+    def _model_for_request(self):
+        """
+        Model to send the next request to
         
-        try:
-            response = self.model.generate_content([
-                EXTRACTION_PROMPT,
-                {
-                    "mime_type": mime_type,
-                    "data": file_bytes
-                }
-            ])
+        In cached mode the prompt cache is created on first use and its TTL
+        is extended shortly before it runs out. If caching is unavailable
+        (e.g. the prompt is below the API's minimum cache size), requests
+        fall back to the system-instruction model.
+        """
+        if self.prompt_mode != 'cached':
+            return self.model
+        
+        with self._prompt_cache_lock:
+            now = time.time()
+            if self._cached_model is not None and now < self._prompt_cache_expires_at - PROMPT_CACHE_REFRESH_MARGIN:
+                return self._cached_model
+            if self._cached_model is None and now < self._prompt_cache_retry_at:
+                return self.model
             
-            # Parse JSON response
-            response_text = response.text.strip()
+            try:
+                if self._prompt_cache is None:
+                    self._prompt_cache, self._cached_model = self._create_prompt_cache()
+                    logger.info(f"Prompt cache created (TTL {self.prompt_cache_ttl}s)")
+                else:
+                    self._prompt_cache.update(ttl=timedelta(seconds=self.prompt_cache_ttl))
+                    logger.info("Prompt cache TTL refreshed")
+                self._prompt_cache_expires_at = now + self.prompt_cache_ttl
+                return self._cached_model
+            except Exception as e:
+                logger.warning(f"Prompt cache unavailable, using system instruction: {e}")
+                self._prompt_cache = None
+                self._cached_model = None
+                self._prompt_cache_retry_at = now + PROMPT_CACHE_RETRY_SECONDS
+                return self.model
+    
+    def _contents(self, file_bytes: bytes, mime_type: str, prompt: str) -> list:
+        """Request contents; without an inline prompt only the extra instructions are sent"""
+        document = {
+            "mime_type": mime_type,
+            "data": file_bytes
+        }
+        if self.prompt_mode != 'inline' and prompt.startswith(EXTRACTION_PROMPT):
+            extra = prompt[len(EXTRACTION_PROMPT):]
+            return [extra, document] if extra.strip() else [document]
+        return [prompt, document]
+    
+    def _record_usage(self, response) -> int:
+        """Accumulate the token counts the API reports for a response; returns the billed total"""
+        metadata = getattr(response, 'usage_metadata', None)
+        if metadata is None:
+            return None
+        prompt_tokens = getattr(metadata, 'prompt_token_count', 0) or 0
+        cached_tokens = getattr(metadata, 'cached_content_token_count', 0) or 0
+        output_tokens = getattr(metadata, 'candidates_token_count', 0) or 0
+        with self._usage_lock:
+            self.usage['requests'] += 1
+            self.usage['prompt_tokens'] += prompt_tokens
+            self.usage['cached_tokens'] += cached_tokens
+            self.usage['output_tokens'] += output_tokens
+        MODEL_TOKENS.labels(self.model_name, 'prompt').inc(prompt_tokens - cached_tokens)
+        MODEL_TOKENS.labels(self.model_name, 'cached').inc(cached_tokens)
+        MODEL_TOKENS.labels(self.model_name, 'output').inc(output_tokens)
+        logger.info(f"Tokens: {prompt_tokens} prompt ({cached_tokens} cached), {output_tokens} output")
+        return prompt_tokens - cached_tokens + output_tokens
+    
+    @property
+    def estimated_request_tokens(self) -> int:
+        """Average billed tokens per request so far, used to reserve rate-limit quota"""
+        with self._usage_lock:
+            requests = self.usage['requests']
+            if not requests:
+                return DEFAULT_REQUEST_TOKENS
+            billed = self.usage['prompt_tokens'] - self.usage['cached_tokens'] + self.usage['output_tokens']
+            return billed // requests
+    
+    def _generate(self, file_bytes: bytes, mime_type: str, prompt: str):
+        """Blocking Gemini call, run on the executor"""
+        model = self._model_for_request()
+        response = model.generate_content(self._contents(file_bytes, mime_type, prompt))
+        return response.text, self._record_usage(response)
+    
+    def _generate_stream(self, file_bytes: bytes, mime_type: str, prompt: str,
+                         parser: ReportStreamParser, report_progress):
+        """Blocking streamed Gemini call, feeding each chunk to the parser as it arrives"""
+        model = self._model_for_request()
+        response = model.generate_content(self._contents(file_bytes, mime_type, prompt), stream=True)
+        chunk = None
+        for chunk in response:
+            parser.feed(chunk.text)
+            report_progress(parser.transaction_count)
+        # Usage metadata arrives with the final chunk
+        tokens = self._record_usage(chunk) if chunk is not None else None
+        return parser.text, tokens
+    
+    @staticmethod
+    def parse_response(response_text: str) -> dict:
+        """Parse the model's JSON answer, tolerating markdown code blocks"""
+        response_text = response_text.strip()
+        
+        # Remove markdown code blocks if present
+        if response_text.startswith('```json'):
+            response_text = response_text[7:]
+        if response_text.startswith('```'):
+            response_text = response_text[3:]
+        if response_text.endswith('```'):
+            response_text = response_text[:-3]
+        response_text = response_text.strip()
+        
+        return json.loads(response_text)
+    
+    async def _generate_with_retries(self, file_bytes: bytes, mime_type: str, prompt: str,
+                                     parser: ReportStreamParser, on_progress) -> str:
+        """
+        Run one Gemini request through the rate limiter, retrying quota and server errors
+        
+        Retries wait for the API's retry-after hint when there is one, and
+        otherwise back off exponentially with jitter. Quota errors also pause
+        the shared rate limiter so other requests queue instead of failing.
+        A streamed request is only retried if nothing was received yet.
+        """
+        loop = asyncio.get_running_loop()
+        retryable_errors, quota_errors = gemini_errors()
+        
+        def report_progress(count):
+            if on_progress is not None:
+                asyncio.run_coroutine_threadsafe(on_progress(count), loop)
+        
+        for attempt in range(self.max_retries + 1):
+            estimated_tokens = self.estimated_request_tokens
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(estimated_tokens)
             
-            # Remove markdown code blocks if present
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            response_text = response_text.strip()
+            started = time.perf_counter()
+            try:
+                if parser is None:
+                    response_text, tokens = await loop.run_in_executor(
+                        self.executor, self._generate, file_bytes, mime_type, prompt
+                    )
+                else:
+                    response_text, tokens = await loop.run_in_executor(
+                        self.executor, self._generate_stream, file_bytes, mime_type, prompt, parser, report_progress
+                    )
+            except retryable_errors as e:
+                if attempt == self.max_retries or (parser is not None and parser.text):
+                    raise
+                retry_after = retry_after_seconds(e)
+                delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                if self.rate_limiter is not None and isinstance(e, quota_errors):
+                    self.rate_limiter.pause(delay)
+                logger.warning(f"Gemini request failed ({e.__class__.__name__}), "
+                               f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
             
-            data = json.loads(response_text)
-            logger.info(f"Successfully extracted {len(data.get('transactions', []))} transactions")
+            MODEL_SECONDS.labels(self.model_name).observe(time.perf_counter() - started)
+            if self.rate_limiter is not None and tokens is not None:
+                self.rate_limiter.record_tokens(estimated_tokens, tokens)
+            return response_text
+    
+    async def extract_from_bytes(self, file_bytes: bytes, mime_type: str, prompt: str = EXTRACTION_PROMPT,
+                                 parser: ReportStreamParser = None, on_progress=None, validate=None) -> dict:
+        """
+        Extract data from image or PDF bytes
+        
+        With a parser, the response is streamed: the parser's callbacks run
+        on the worker thread as soon as the header and each transaction are
+        complete, and on_progress(row_count) is scheduled on the event loop
+        after every chunk.
+        
+        validate(data) returns what is wrong with an answer ('' if nothing).
+        An answer that fails it, or is not JSON, is extracted again by
+        escalate_to (not streamed; the parser is marked discarded). The last
+        model's answer is returned even if it fails.
+        """
+        logger.info(f"Extracting data from {mime_type} with {self.model_name}, size: {len(file_bytes)} bytes")
+        
+        try:
+            response_text = await self._generate_with_retries(file_bytes, mime_type, prompt, parser, on_progress)
             
-            return data
+            # Parse JSON response
+            data = self.parse_response(response_text)
+            logger.info(f"Successfully extracted {len(data.get('transactions', []))} transactions")
             
         except json.JSONDecodeError as e:
             logger.error(f"JSON parsing error: {e}")
+            if validate is not None and self.escalate_to is not None:
+                return await self._escalate(file_bytes, mime_type, prompt, parser, validate, "not valid JSON")
+            if validate is not None:
+                CASCADE_RESULTS.labels(self.model_name, 'rejected').inc()
             raise ValueError("Failed to parse Gemini response as JSON")
         except Exception as e:
             logger.error(f"Extraction error: {e}")
             raise
+        
+        if validate is None:
+            return data
+        problems = await asyncio.to_thread(validate, data)
+        if not problems:
+            CASCADE_RESULTS.labels(self.model_name, 'accepted').inc()
+            return data
+        if self.escalate_to is not None:
+            return await self._escalate(file_bytes, mime_type, prompt, parser, validate, problems)
+        CASCADE_RESULTS.labels(self.model_name, 'rejected').inc()
+        logger.warning(f"{self.model_name} answer kept although it fails validation: {problems}")
+        return data
+    
+    async def _escalate(self, file_bytes: bytes, mime_type: str, prompt: str, parser: ReportStreamParser,
+                        validate, reason: str) -> dict:
+        """Hand a rejected extraction to the next model of the cascade"""
+        CASCADE_RESULTS.labels(self.model_name, 'escalated').inc()
+        logger.warning(f"{self.model_name} answer rejected ({reason}), escalating to {self.escalate_to.model_name}")
+        if parser is not None:
+            parser.discarded = True
+        return await self.escalate_to.extract_from_bytes(file_bytes, mime_type, prompt, validate=validate)
 
-class ExcelService:
-    """Service for generating Excel files"""
+def create_gemini_service(api_key: str, model_names: str = None, max_workers: int = None,
+                          rate_limiter: RateLimiter = None) -> GeminiService:
+    """
+    GeminiService for the first model of a comma-separated cascade (GEMINI_MODELS)
     
-    @staticmethod
-    def generate_report(data: dict) -> bytes:
-        """Generate formatted Excel file from extracted data"""
-        logger.info("Generating Excel report")
-        
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Settlement Report"
-        
-        # Define styles
-        title_font = Font(name='Arial', size=14, bold=True)
-        header_font = Font(name='Arial', size=11, bold=True)
-        normal_font = Font(name='Arial', size=10)
-        currency_format = '#,##0.00'
-        
-        # Border styles
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        # Header fill
-        header_fill = PatternFill(start_color='D9D9D9', end_color='D9D9D9', fill_type='solid')
-        
-        # === TITLE SECTION ===
-        ws['A1'] = "Merchant Settlement Report"
-        ws['A1'].font = title_font
-        ws.merge_cells('A1:I1')
-        
-        # === HEADER INFO SECTION ===
-        current_row = 3
-        
-        # Left side info
-        ws[f'A{current_row}'] = "Customer Number:"
-        ws[f'B{current_row}'] = data['header']['customer_number']
-        ws[f'A{current_row}'].font = header_font
-        
-        current_row += 1
-        ws[f'A{current_row}'] = "Business Location:"
-        ws[f'B{current_row}'] = data['header']['business_location_id']
-        ws[f'C{current_row}'] = data['header']['business_location_name']
-        ws[f'A{current_row}'].font = header_font
-        
-        # Right side info
-        ws['G3'] = "From:"
-        ws['H3'] = data['header']['date_from']
-        ws['G3'].font = header_font
-        
-        ws['G4'] = "To:"
-        ws['H4'] = data['header']['date_to']
-        ws['G4'].font = header_font
-        
-        ws['G5'] = "Reimbursement Batch:"
-        ws['H5'] = data['header']['reimbursement_batch']
-        ws['G5'].font = header_font
-        
-        # === TABLE HEADERS ===
-        table_start_row = 7
-        headers = [
-            "Terminal ID", "Host Batch ID", "Ids", "Settle Date",
-            "No Of Txn", "Transaction\nGross Amount", "EWT",
-            "Transaction\nNet Amount", "Description"
-        ]
-        
-        for col_idx, header in enumerate(headers, 1):
-            cell = ws.cell(row=table_start_row, column=col_idx, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        
-        # === TRANSACTION ROWS ===
-        current_row = table_start_row + 1
-        
-        for txn in data['transactions']:
-            ws.cell(row=current_row, column=1, value=txn['terminal_id']).border = thin_border
-            ws.cell(row=current_row, column=2, value=txn['host_batch_id']).border = thin_border
-            ws.cell(row=current_row, column=3, value=txn['ids']).border = thin_border
-            ws.cell(row=current_row, column=4, value=txn['settle_date']).border = thin_border
-            
-            txn_cell = ws.cell(row=current_row, column=5, value=txn['no_of_txn'])
-            txn_cell.border = thin_border
-            txn_cell.alignment = Alignment(horizontal='center')
-            
-            gross_cell = ws.cell(row=current_row, column=6, value=txn['gross_amount'])
-            gross_cell.number_format = currency_format
-            gross_cell.border = thin_border
-            
-            ewt_cell = ws.cell(row=current_row, column=7, value=txn['ewt'])
-            ewt_cell.number_format = currency_format
-            ewt_cell.border = thin_border
-            
-            net_cell = ws.cell(row=current_row, column=8, value=txn['net_amount'])
-            net_cell.number_format = currency_format
-            net_cell.border = thin_border
-            
-            desc_cell = ws.cell(row=current_row, column=9, value=txn['description'])
-            desc_cell.border = thin_border
-            
-            current_row += 1
-        
-        # === TOTALS ROW ===
-        totals_row = current_row
-        ws.cell(row=totals_row, column=5, value="Total:").font = header_font
-        
-        total_gross = ws.cell(row=totals_row, column=6, value=data['totals']['gross_amount'])
-        total_gross.number_format = currency_format
-        total_gross.font = header_font
-        total_gross.border = thin_border
-        
-        total_ewt = ws.cell(row=totals_row, column=7, value=data['totals']['ewt'])
-        total_ewt.number_format = currency_format
-        total_ewt.font = header_font
-        total_ewt.border = thin_border
-        
-        total_net = ws.cell(row=totals_row, column=8, value=data['totals']['net_amount'])
-        total_net.number_format = currency_format
-        total_net.font = header_font
-        total_net.border = thin_border
-        
-        # === COLUMN WIDTHS ===
-        column_widths = {
-            'A': 12, 'B': 13, 'C': 10, 'D': 20, 'E': 10,
-            'F': 16, 'G': 10, 'H': 16, 'I': 40,
-        }
-        
-        for col, width in column_widths.items():
-            ws.column_dimensions[col].width = width
-        
-        ws.row_dimensions[table_start_row].height = 30
-        
-        # === SAVE TO BYTES ===
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        logger.info(f"Excel generated: {len(data['transactions'])} transactions")
-        return buffer.getvalue()
+    Each model escalates to the next; all share the rate limiter.
+    """
+    names = [name.strip() for name in (model_names or os.getenv('GEMINI_MODELS', DEFAULT_MODELS)).split(',')]
+    names = [name for name in names if name]
+    if not names:
+        raise ValueError("GEMINI_MODELS lists no models")
+    
+    service = None
+    for name in reversed(names):
+        tier = GeminiService(api_key, max_workers=max_workers, model_name=name)
+        tier.escalate_to = service
+        tier.rate_limiter = rate_limiter
+        service = tier
+    logger.info(f"Model cascade: {' -> '.join(names)}")
+    return service
+
+def parse_report_date(text: str):
+    """Parse a header date like '01 Nov 2025' or a settle date like '11/01/2025'"""
+    for fmt in ('%d %b %Y', '%m/%d/%Y'):
+        try:
+            return datetime.strptime(text, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+MONTHS = {name: number for number in range(1, 13)
+          for name in (date(2000, number, 1).strftime('%B').lower(), date(2000, number, 1).strftime('%b').lower())}
+
+def month_start(year: int, month: int) -> date:
+    """First day of a month, normalizing months outside 1-12 into other years"""
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return date(year, month, 1)
+
+def parse_day(text: str):
+    """A day written as 2025-11-03 or 11/03/2025, or None"""
+    for fmt in ('%Y-%m-%d', '%m/%d/%Y'):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def parse_period(words: list, today: date = None) -> tuple:
+    """
+    Settle date range for a query like "November", "Q3 2025", "this quarter"
+    
+    Returns (since, until, label) with since inclusive and until exclusive;
+    no words means all history (None, None). A month or quarter without a
+    year is the most recent one that has started. Raises ValueError for text
+    that is not a period.
+    """
+    today = today or date.today()
+    text = ' '.join(words).strip().lower()
+    if not text or text in ('all', 'all time'):
+        return None, None, "All time"
+    
+    if text in ('today', 'yesterday'):
+        day = today - timedelta(days=text == 'yesterday')
+        return day, day + timedelta(days=1), day.strftime('%m/%d/%Y')
+    
+    relative = re.fullmatch(r'(this|last) (month|quarter|year)', text)
+    if relative:
+        which, unit = relative.groups()
+        if unit == 'year':
+            year = today.year - (which == 'last')
+            return date(year, 1, 1), date(year + 1, 1, 1), str(year)
+        months = 1 if unit == 'month' else 3
+        first_month = today.month if unit == 'month' else (today.month - 1) // 3 * 3 + 1
+        start = month_start(today.year, first_month - (months if which == 'last' else 0))
+        until = month_start(start.year, start.month + months)
+        if unit == 'month':
+            return start, until, start.strftime('%B %Y')
+        return start, until, f"Q{(start.month - 1) // 3 + 1} {start.year}"
+    
+    quarter = re.fullmatch(r'q([1-4])(?:\s+(\d{4}))?', text)
+    if quarter:
+        number, year = int(quarter.group(1)), quarter.group(2)
+        start = date(int(year) if year else today.year, number * 3 - 2, 1)
+        if not year and start > today:
+            start = start.replace(year=start.year - 1)
+        return start, month_start(start.year, start.month + 3), f"Q{number} {start.year}"
+    
+    month = re.fullmatch(r'([a-z]+)(?:\s+(\d{4}))?', text)
+    if month and month.group(1) in MONTHS:
+        start = date(int(month.group(2)) if month.group(2) else today.year, MONTHS[month.group(1)], 1)
+        if not month.group(2) and start > today:
+            start = start.replace(year=start.year - 1)
+        return start, month_start(start.year, start.month + 1), start.strftime('%B %Y')
+    
+    if re.fullmatch(r'\d{4}', text):
+        year = int(text)
+        return date(year, 1, 1), date(year + 1, 1, 1), text
+    
+    year_month = re.fullmatch(r'(\d{4})-(\d{1,2})|(\d{1,2})/(\d{4})', text)
+    if year_month:
+        year, month = (year_month.group(1), year_month.group(2)) if year_month.group(1) else \
+            (year_month.group(4), year_month.group(3))
+        if 1 <= int(month) <= 12:
+            start = date(int(year), int(month), 1)
+            return start, month_start(start.year, start.month + 1), start.strftime('%B %Y')
+    
+    parts = re.split(r'\s*(?:\.\.|\bto\b|–)\s*', text)
+    days = [parse_day(part) for part in parts]
+    if len(parts) in (1, 2) and all(days):
+        first, last = days[0], days[-1]
+        if last < first:
+            raise ValueError(f"'{text}' ends before it starts")
+        label = first.strftime('%m/%d/%Y') if first == last else \
+            f"{first.strftime('%m/%d/%Y')} - {last.strftime('%m/%d/%Y')}"
+        return first, last + timedelta(days=1), label
+    
+    raise ValueError(f"Unknown period '{text}'")
 
 # Initialize services
 gemini_service = None
 excel_service = ExcelService()
+extraction_cache = None
+transaction_store = None
+report_queue = None
+
+def check_dependencies() -> list:
+    """pip names of required packages that are not installed (nothing is imported)"""
+    import importlib.util
+    return [package for module, package in REQUIRED_MODULES.items()
+            if importlib.util.find_spec(module.split('.')[0]) is None
+            or importlib.util.find_spec(module) is None]
+
+def warm_up():
+    """Import the heavy modules, build the report styles and the Gemini client (blocking)"""
+    import importlib
+    for module in ('pdfplumber', 'pypdf', 'openpyxl'):
+        importlib.import_module(module)
+    report_styles()
+    if gemini_service is not None:
+        gemini_service.model
+
+async def prewarm():
+    """Warm up in a thread so the first report does not pay the start-up cost"""
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(warm_up)
+        logger.info(f"Pre-warm finished in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        logger.warning(f"Pre-warm failed, modules will load on first use: {e}")
+
+async def on_startup(app: Application):
+    """Start background workers once the event loop is running"""
+    if report_queue is not None:
+        await report_queue.start()
+    # In webhook mode pre-warm starts once the server is listening (see main)
+    if PREWARM and app.updater is not None:
+        app.create_task(prewarm())
+
+async def on_shutdown(app: Application):
+    """Release service resources when the bot stops"""
+    if report_queue is not None:
+        await report_queue.stop()
+    if gemini_service is not None:
+        gemini_service.shutdown()
+    if extraction_cache is not None:
+        extraction_cache.close()
+    if transaction_store is not None:
+        transaction_store.close()
+
+def readiness_problems() -> list:
+    """Reasons the bot should not receive new reports right now (empty when ready)"""
+    problems = []
+    if report_queue is not None:
+        if not report_queue.started:
+            problems.append('report queue not started')
+        elif report_queue.depth >= report_queue.max_pending:
+            problems.append('report queue full')
+    return problems
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send welcome message"""
@@ -297,9 +693,14 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "👋 **Welcome to the Settlement Report Bot!**\n\n"
         "Send me a Petron Merchant Settlement Report as a **PDF document**.\n\n"
         "I'll extract the data and send you a formatted Excel file.\n\n"
+        "Send several reports at once (as an album or a **ZIP file**) "
+        "to get one consolidated workbook.\n\n"
         "**Commands:**\n"
         "/start - Show this message\n"
-        "/help - Usage instructions",
+        "/help - Usage instructions\n"
+        "/format - Choose Excel, CSV, JSON Lines or Parquet output\n"
+        "/summary - Totals of stored reports, e.g. /summary this quarter\n"
+        "/terminal - Totals of one terminal, e.g. /terminal 50035936 November",
         parse_mode='Markdown'
     )
 
@@ -312,7 +713,15 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "3. Wait 5-10 seconds for processing\n"
         "4. Download your Excel file!\n\n"
         "**Supported format:**\n"
-        "• PDF documents only\n\n"
+        "• PDF documents\n"
+        "• Several PDFs as an album or ZIP file (one consolidated workbook)\n\n"
+        "**Output format:**\n"
+        "• /format csv (or xlsx, ndjson, parquet) sets your default\n"
+        "• A caption like #csv overrides it for one upload\n\n"
+        "**History:**\n"
+        "• /summary November, /summary Q3 2025, /summary last month\n"
+        "• /terminal 50035936 this quarter\n"
+        "• Add excel at the end to also get a workbook\n\n"
         "**Tips:**\n"
         "• Ensure the PDF is clear and readable\n"
         "• All transaction rows should be visible\n"
@@ -320,6 +729,125 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown'
     )
 
+def caption_format(caption: str):
+    """Output format requested by a caption hashtag like #csv, or None"""
+    for tag in re.findall(r'#(\w+)', caption or ''):
+        output_format = normalize_format(tag)
+        if output_format:
+            return output_format
+    return None
+
+async def format_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show or set the user's output format"""
+    current = context.user_data.get('output_format', DEFAULT_FORMAT)
+    if not context.args:
+        await update.message.reply_text(
+            f"📄 **Output format:** {current}\n\n"
+            f"Change it with /format followed by one of: {', '.join(WRITERS)}\n"
+            "Or add a caption like #csv to a single upload.",
+            parse_mode='Markdown'
+        )
+        return
+    
+    output_format = normalize_format(context.args[0])
+    if output_format is None:
+        await update.message.reply_text(
+            f"❌ Unknown format '{context.args[0]}'. Choose one of: {', '.join(WRITERS)}"
+        )
+        return
+    
+    context.user_data['output_format'] = output_format
+    await update.message.reply_text(f"✅ Reports will be sent as **{output_format}**", parse_mode='Markdown')
+
+# Trailing word that asks for the answer as a workbook too
+EXCEL_WORDS = ('excel', 'xlsx', '#excel', '#xlsx')
+
+def summary_text(title: str, period: str, summary: dict, top_terminals: int = 5) -> str:
+    """Reply for /summary and /terminal: totals, settle days and the largest terminals"""
+    total = summary['total']
+    days = [day for day in summary['by_day'] if day]
+    lines = [
+        f"📊 **{title}**",
+        f"📅 **Period:** {period}",
+    ]
+    if days:
+        lines.append(f"🗓️ **Settle days:** {len(days)} ({days[0]} - {days[-1]})")
+    lines += [
+        "",
+        f"🧾 **Transactions:** {total['no_of_txn']:,}",
+        f"💵 **Gross:** ₱{total['gross_amount']:,.2f}",
+        f"🏛️ **EWT:** ₱{total['ewt']:,.2f}",
+        f"💰 **Net:** ₱{total['net_amount']:,.2f}",
+    ]
+    if len(summary['by_terminal']) > 1:
+        largest = sorted(summary['by_terminal'].items(), key=lambda item: item[1]['net_amount'], reverse=True)
+        lines += ["", f"🏪 **Terminals:** {len(largest)}, largest by net:"]
+        lines += [f"• {terminal or '(none)'}: ₱{totals['net_amount']:,.2f}"
+                  for terminal, totals in largest[:top_terminals]]
+    return '\n'.join(lines)
+
+async def reply_summary(update: Update, words: list, title: str, terminal_id: str = None):
+    """Answer a history query from the rollup table, with a workbook if asked"""
+    if transaction_store is None:
+        await update.message.reply_text("❌ The transaction history is turned off on this bot.")
+        return
+    
+    want_excel = bool(words) and words[-1].lower() in EXCEL_WORDS
+    if want_excel:
+        words = words[:-1]
+    try:
+        since, until, period = parse_period(words)
+    except ValueError as e:
+        await update.message.reply_text(
+            f"❌ {e}\n\nTry a month (November, 2025-11), a quarter (Q3, Q3 2025), "
+            "this month, last quarter, a year (2025) or a range (11/01/2025..11/15/2025)."
+        )
+        return
+    
+    # Users only see the locations they have sent reports for
+    with stage_timer('query'):
+        locations = None
+        if update.effective_user.id not in ADMIN_USER_IDS:
+            locations = await asyncio.to_thread(transaction_store.locations, update.effective_user.id)
+        summary = await asyncio.to_thread(
+            transaction_store.summary, since=since, until=until, terminal_id=terminal_id,
+            business_location_ids=locations
+        )
+    if not summary['by_day']:
+        await update.message.reply_text(f"📭 No stored transactions for {period}.")
+        return
+    
+    text = summary_text(title, period, summary)
+    if not want_excel:
+        await update.message.reply_text(text, parse_mode='Markdown')
+        return
+    
+    details = [("Period:", period)] + ([("Terminal ID:", terminal_id)] if terminal_id else [])
+    with stage_timer('excel'):
+        excel_bytes = await asyncio.to_thread(excel_service.generate_summary, title, details, summary)
+    slug = re.sub(r'[^0-9A-Za-z]+', '_', f"{terminal_id or ''} {period}").strip('_').lower()
+    await update.message.reply_document(
+        document=BytesIO(excel_bytes),
+        filename=f"summary_{slug}.xlsx",
+        caption=text,
+        parse_mode='Markdown'
+    )
+
+async def summary_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Totals of every stored report for a period, e.g. /summary this quarter"""
+    await reply_summary(update, list(context.args), "Settlement Summary")
+
+async def terminal_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Totals of one terminal for a period, e.g. /terminal 50035936 November"""
+    if not context.args:
+        await update.message.reply_text(
+            "🏪 Usage: /terminal <terminal ID> [period] [excel]\n"
+            "Example: /terminal 50035936 November"
+        )
+        return
+    terminal_id = context.args[0]
+    await reply_summary(update, list(context.args[1:]), f"Terminal {terminal_id}", terminal_id)
+
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Reject photo messages and ask for PDF"""
     await update.message.reply_text(
@@ -333,30 +861,88 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown'
     )
 
+async def enqueue_job(update: Update, job_factory):
+    """Run a job on the report queue, telling the user if it has to wait"""
+    if report_queue is None:
+        await job_factory()
+        return
+    
+    # Workers share Gemini fairly across users
+    position = await report_queue.submit(update.effective_user.id, job_factory)
+    if position:
+        await update.message.reply_text(
+            f"⏳ Queued, position {position}. Your report will be processed shortly."
+        )
+
+async def reject_queue_full(update: Update, error: QueueFull):
+    """Tell the user the queue cannot take more work right now"""
+    logger.warning(f"Rejected document from user {update.effective_user.id}: {error}")
+    await update.message.reply_text(
+        f"⏳ **Too many reports in progress:** {str(error)}\n\n"
+        "Please send it again in a few minutes.",
+        parse_mode='Markdown'
+    )
+
 async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle document messages (PDFs only)"""
+    """Handle document messages (PDFs, or ZIPs of PDFs)"""
     try:
         document = update.message.document
         logger.info(f"Received document: {document.file_name} from user {update.effective_user.id}")
         
-        # Check if it's a PDF
+        # Check if it's a PDF or a ZIP of PDFs
         mime_type = document.mime_type
-        if mime_type != 'application/pdf':
+        is_zip = mime_type in ZIP_MIME_TYPES or (document.file_name or '').lower().endswith('.zip')
+        if mime_type != 'application/pdf' and not is_zip:
             await update.message.reply_text(
                 "❌ **Only PDF files are supported**\n\n"
                 f"You sent: {document.file_name}\n"
                 f"Type: {mime_type}\n\n"
-                "Please send your settlement report as a **PDF document**.",
+                "Please send your settlement report as a **PDF document**, "
+                "or several reports as a **ZIP file**.",
                 parse_mode='Markdown'
             )
             return
         
-        # Download PDF
-        file = await document.get_file()
-        file_bytes = await file.download_as_bytearray()
+        # Oversized files are refused before they are queued or downloaded
+        check_file_size(document)
+        
+        # A caption hashtag overrides the user's /format choice
+        output_format = caption_format(update.message.caption) or context.user_data.get('output_format', DEFAULT_FORMAT)
         
-        await process_file(update, bytes(file_bytes), mime_type)
+        if is_zip:
+            await enqueue_job(update, lambda: download_and_consolidate_zip(update, document, output_format))
+            return
+        
+        # PDFs sent together as an album are consolidated into one workbook
+        if update.message.media_group_id:
+            collect_media_group(update, context, document, output_format)
+            return
         
+        # Repeat uploads and forwards of a known file skip download and extraction
+        if extraction_cache is not None:
+            file_hash = extraction_cache.file_hash(document.file_unique_id)
+            cached = extraction_cache.get(file_hash, gemini_service.cache_version) if file_hash else None
+            if cached is not None:
+                logger.info(f"Cache hit for file {document.file_unique_id}")
+                CACHE_HITS.labels('file_id').inc()
+                data, excel_bytes = cached
+                await add_report_owner([data], update.effective_user.id)
+                report_bytes = await cached_report_bytes(file_hash, data, excel_bytes, output_format)
+                await send_report(update, data, report_bytes, output_format)
+                REPORTS.labels('success').inc()
+                return
+        
+        await enqueue_job(update, lambda: download_and_process(update, document, output_format))
+        
+    except QueueFull as e:
+        await reject_queue_full(update, e)
+    except FileTooLarge as e:
+        logger.warning(f"Rejected document from user {update.effective_user.id}: {e}")
+        await update.message.reply_text(
+            f"❌ **File too large:** {str(e)}\n\n"
+            "Please send a smaller PDF, or split a ZIP into several smaller ones.",
+            parse_mode='Markdown'
+        )
     except Exception as e:
         logger.error(f"Error handling document: {e}")
         await update.message.reply_text(
@@ -364,28 +950,169 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Please ensure the file is a valid Petron settlement report."
         )
 
-async def process_file(update: Update, file_bytes: bytes, mime_type: str):
-    """Process PDF file and return Excel"""
-    # Send processing message
-    processing_msg = await update.message.reply_text("🔄 Processing your report...")
+# Documents of albums still being received, by media_group_id
+media_groups = {}
+
+def collect_media_group(update: Update, context: ContextTypes.DEFAULT_TYPE, document,
+                        output_format: str = DEFAULT_FORMAT):
+    """Buffer album documents; the first one schedules processing of the whole album"""
+    group_id = update.message.media_group_id
+    if group_id in media_groups:
+        media_groups[group_id].append(document)
+        return
+    
+    # Telegram puts an album's caption on its first document
+    media_groups[group_id] = [document]
+    context.application.create_task(flush_media_group(update, group_id, output_format))
+
+async def flush_media_group(update: Update, group_id: str, output_format: str = DEFAULT_FORMAT):
+    """Queue an album for consolidation once all of its documents have arrived"""
+    await asyncio.sleep(MEDIA_GROUP_WAIT)
+    documents = media_groups.pop(group_id)
+    logger.info(f"Album {group_id} complete with {len(documents)} documents")
+    
+    if len(documents) == 1:
+        job = lambda: download_and_process(update, documents[0], output_format)
+    else:
+        job = lambda: download_and_consolidate(update, documents, output_format)
     
     try:
-        # Extract data using Gemini
-        logger.info("Extracting data with Gemini...")
-        data = await gemini_service.extract_from_bytes(file_bytes, mime_type)
+        await enqueue_job(update, job)
+    except QueueFull as e:
+        await reject_queue_full(update, e)
+
+class FileTooLarge(ValueError):
+    """Raised for documents above MAX_FILE_BYTES"""
+
+def check_file_size(document):
+    """Reject a document by its announced size, before any bandwidth is spent on it"""
+    if document.file_size and document.file_size > MAX_FILE_BYTES:
+        raise FileTooLarge(
+            f"{document.file_name or 'The file'} is {document.file_size / (1024 * 1024):.1f} MB; "
+            f"the limit is {MAX_FILE_BYTES / (1024 * 1024):.0f} MB"
+        )
+
+class DownloadBuffer:
+    """
+    Write target for File.download_to_memory that keeps a single copy
+    
+    PTB hands over the downloaded body as one bytes object; it is kept by
+    reference rather than copied into a BytesIO or bytearray, and the size
+    limit is enforced again in case Telegram did not announce a file size.
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.chunks = []
+        self.size = 0
+    
+    def write(self, data) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise FileTooLarge(f"The file exceeds the {self.max_bytes / (1024 * 1024):.0f} MB limit")
+        self.chunks.append(data)
+        return len(data)
+    
+    def getvalue(self) -> bytes:
+        if len(self.chunks) == 1 and isinstance(self.chunks[0], bytes):
+            return self.chunks[0]
+        return b''.join(self.chunks)
+
+async def download_document(document) -> bytes:
+    """Download a document with one copy in memory, enforcing MAX_FILE_BYTES"""
+    check_file_size(document)
+    with stage_timer('download'):
+        file = await document.get_file()
+        check_file_size(file)
+        buffer = DownloadBuffer(MAX_FILE_BYTES)
+        await file.download_to_memory(buffer)
+    return buffer.getvalue()
+
+def read_zip_pdfs(zip_bytes: bytes) -> list:
+    """Return (file_name, pdf_bytes) for each PDF in a ZIP, in name order"""
+    with zipfile.ZipFile(BytesIO(zip_bytes)) as archive:
+        entries = sorted(
+            (info for info in archive.infolist()
+             if not info.is_dir()
+             and info.filename.lower().endswith('.pdf')
+             and not Path(info.filename).name.startswith('.')
+             and not info.filename.startswith('__MACOSX/')),
+            key=lambda info: info.filename
+        )
+        if not entries:
+            raise ValueError("The ZIP file contains no PDF reports")
+        if len(entries) > BUNDLE_MAX_FILES:
+            raise ValueError(f"The ZIP file contains {len(entries)} PDFs; the limit is {BUNDLE_MAX_FILES}")
+        if sum(info.file_size for info in entries) > BUNDLE_MAX_BYTES:
+            raise ValueError(f"The PDFs in the ZIP file exceed {BUNDLE_MAX_BYTES // (1024 * 1024)} MB")
+        return [(Path(info.filename).name, archive.read(info)) for info in entries]
+
+async def download_and_consolidate_zip(update: Update, document, output_format: str = DEFAULT_FORMAT):
+    """Download a ZIP of PDFs and consolidate them into one workbook"""
+    try:
+        zip_bytes = await download_document(document)
+        files = await asyncio.to_thread(read_zip_pdfs, zip_bytes)
         
-        # Generate Excel
-        logger.info("Generating Excel file...")
-        excel_bytes = excel_service.generate_report(data)
+        await process_bundle(update, files, output_format)
         
-        # Delete processing message
-        await processing_msg.delete()
+    except (ValueError, zipfile.BadZipFile) as e:
+        REPORTS.labels('failure').inc()
+        await update.message.reply_text(f"❌ **Could not read ZIP file:** {str(e)}", parse_mode='Markdown')
+    except Exception as e:
+        REPORTS.labels('failure').inc()
+        logger.error(f"Error handling ZIP: {e}")
+        await update.message.reply_text(
+            f"❌ Error processing ZIP: {str(e)}\n\n"
+            "Please ensure it contains valid Petron settlement reports."
+        )
+
+async def download_and_consolidate(update: Update, documents: list, output_format: str = DEFAULT_FORMAT):
+    """Download the PDFs of an album and consolidate them into one workbook"""
+    try:
+        documents = [d for d in documents if d.mime_type == 'application/pdf'][:BUNDLE_MAX_FILES]
+        
+        async def download(document):
+            return document.file_name, await download_document(document)
         
-        # Send Excel file
-        filename = f"settlement_report_{data['header']['reimbursement_batch']}.xlsx"
+        files = await asyncio.gather(*[download(d) for d in documents])
+        await process_bundle(update, list(files), output_format)
         
+    except Exception as e:
+        REPORTS.labels('failure').inc()
+        logger.error(f"Error handling album: {e}")
+        await update.message.reply_text(
+            f"❌ Error processing PDFs: {str(e)}\n\n"
+            "Please ensure the files are valid Petron settlement reports."
+        )
+
+async def download_and_process(update: Update, document, output_format: str = DEFAULT_FORMAT):
+    """Download a PDF document and process it"""
+    try:
+        file_bytes = await download_document(document)
+        
+        await process_file(update, file_bytes, document.mime_type, document.file_unique_id, output_format)
+        
+    except Exception as e:
+        REPORTS.labels('failure').inc()
+        logger.error(f"Error handling document: {e}")
+        await update.message.reply_text(
+            f"❌ Error processing PDF: {str(e)}\n\n"
+            "Please ensure the file is a valid Petron settlement report."
+        )
+
+async def send_report(update: Update, data: dict, report_bytes: bytes, output_format: str = DEFAULT_FORMAT,
+                      reconciliation: Reconciliation = None):
+    """Send the generated report file with an extraction summary (reconciled here if not given)"""
+    filename = get_writer(output_format).filename([data])
+    if reconciliation is None:
+        reconciliation = await asyncio.to_thread(reconcile_report, data)
+    problems = reconciliation.describe()
+    if problems:
+        logger.warning(f"Batch {data['header'].get('reimbursement_batch')} does not reconcile: {problems}")
+    
+    with stage_timer('reply'):
         await update.message.reply_document(
-            document=BytesIO(excel_bytes),
+            document=BytesIO(report_bytes),
             filename=filename,
             caption=(
                 f"✅ **Report extracted successfully!**\n\n"
@@ -393,18 +1120,460 @@ async def process_file(update: Update, file_bytes: bytes, mime_type: str):
                 f"💰 **Total Net Amount:** ₱{data['totals']['net_amount']:,.2f}\n"
                 f"📅 **Period:** {data['header']['date_from']} - {data['header']['date_to']}\n"
                 f"🔢 **Batch:** {data['header']['reimbursement_batch']}"
+                + (f"\n\n⚠️ **Totals check:** {problems}" if problems else "")
             ),
             parse_mode='Markdown'
         )
+
+def merge_page_results(results: list) -> dict:
+    """
+    Merge extractions of consecutive page groups into one report
+    
+    The header comes from the first pages and the totals from the last pages
+    that show them. A row straddling a page break can be returned by both
+    neighbouring groups; the duplicate is dropped and its fields fill any
+    gaps in the first copy.
+    """
+    header = dict(results[0].get('header') or {})
+    for result in results[1:]:
+        for key, value in (result.get('header') or {}).items():
+            if value and not header.get(key):
+                header[key] = value
+    
+    transactions = []
+    seen = {}
+    for result in results:
+        for txn in result.get('transactions') or []:
+            key = (txn.get('terminal_id'), txn.get('host_batch_id'), txn.get('ids'))
+            if key in seen:
+                original = seen[key]
+                for field, value in txn.items():
+                    if value and not original.get(field):
+                        original[field] = value
+                continue
+            seen[key] = txn
+            transactions.append(txn)
+    
+    totals = {'gross_amount': 0.0, 'ewt': 0.0, 'net_amount': 0.0}
+    for result in reversed(results):
+        result_totals = result.get('totals') or {}
+        if any(result_totals.get(key) for key in totals):
+            totals = result_totals
+            break
+    
+    return {'header': header, 'transactions': transactions, 'totals': totals}
+
+def reconcile_report(data: dict) -> Reconciliation:
+    """Check every row and the row sums against the report's totals"""
+    return SettlementReport.from_dict(data).reconcile()
+
+def extraction_problems(data: dict) -> str:
+    """Model cascade check for a whole report: every row balances and the rows add up to the totals"""
+    return reconcile_report(data).describe()
+
+def page_problems(data: dict) -> str:
+    """Model cascade check for a page range, whose rows cannot add up to the report totals"""
+    bad_rows = sum(not is_balanced(txn) for txn in data['transactions'])
+    return f"gross - EWT ≠ net on {bad_rows} row(s)" if bad_rows else ''
+
+async def extract_pages(file_bytes: bytes, total_pages: int) -> dict:
+    """Extract page groups of a long PDF concurrently and merge them in order"""
+    chunks = await asyncio.to_thread(split_pdf, file_bytes, PAGES_PER_CHUNK)
+    results = await asyncio.gather(*[
+        gemini_service.extract_from_bytes(
+            chunk_bytes,
+            'application/pdf',
+            EXTRACTION_PROMPT + PAGE_RANGE_PROMPT.format(
+                first_page=first_page, last_page=last_page, total_pages=total_pages
+            ),
+            validate=page_problems
+        )
+        for first_page, last_page, chunk_bytes in chunks
+    ])
+    return merge_page_results(results)
+
+async def extract_report(file_bytes: bytes, mime_type: str, parser: ReportStreamParser = None,
+                         on_progress=None) -> tuple:
+    """
+    Extract report data, reading the PDF text layer locally when possible
+    
+    Returns (data, file_bytes) where file_bytes is the document as sent to
+    Gemini, i.e. without the pages prune_pages dropped; repair_report takes
+    it so the PDF is not pruned twice. parser and on_progress are passed on
+    to a single streamed Gemini request; they are not used when the text
+    layer or per-page extraction is.
+    """
+    if mime_type == 'application/pdf':
+        try:
+            data = await asyncio.to_thread(extract_text_layer, file_bytes)
+        except Exception as e:
+            logger.warning(f"Text layer parse failed, falling back to Gemini: {e}")
+            data = None
+        if data is not None:
+            return data, file_bytes
+        
+        if PRUNE_PAGES:
+            try:
+                file_bytes, total_pages, _ = await asyncio.to_thread(prune_pages, file_bytes)
+            except Exception as e:
+                logger.warning(f"Page pruning failed, sending the whole PDF: {e}")
+                total_pages = await asyncio.to_thread(count_pages, file_bytes)
+        else:
+            total_pages = await asyncio.to_thread(count_pages, file_bytes)
+        if total_pages > PAGES_PER_CHUNK:
+            logger.info(f"Extracting {total_pages} pages with Gemini in parallel...")
+            return await extract_pages(file_bytes, total_pages), file_bytes
+    
+    logger.info("Extracting data with Gemini...")
+    data = await gemini_service.extract_from_bytes(
+        file_bytes, mime_type, parser=parser, on_progress=on_progress, validate=extraction_problems
+    )
+    return data, file_bytes
+
+def transaction_key(txn: dict) -> tuple:
+    return (str(txn.get('host_batch_id') or ''), str(txn.get('ids') or ''))
+
+def is_balanced(txn: dict) -> bool:
+    """Whether gross - EWT = net on one transaction row, in centavos as reconcile checks it"""
+    return to_cents(txn.get('gross_amount')) - to_cents(txn.get('ewt')) == to_cents(txn.get('net_amount'))
+
+def apply_row_repairs(data: dict, bad_rows: list, corrections: dict) -> dict:
+    """Copy of data with the bad rows replaced by balanced corrections, matched by key"""
+    transactions = list(data['transactions'])
+    by_key = {transaction_key(txn): txn for txn in corrections.get('transactions') or []}
+    for index in bad_rows:
+        correction = by_key.get(transaction_key(transactions[index]))
+        if correction is not None and is_balanced(correction):
+            transactions[index] = dict(transactions[index], **correction)
+    return dict(data, transactions=transactions)
+
+def apply_missing_rows(data: dict, found: dict) -> dict:
+    """Copy of data with new balanced rows appended and, if given, corrected totals"""
+    transactions = list(data['transactions'])
+    known = {transaction_key(txn) for txn in transactions}
+    for txn in found.get('transactions') or []:
+        key = transaction_key(txn)
+        if key not in known and is_balanced(txn):
+            known.add(key)
+            transactions.append(txn)
+    repaired = dict(data, transactions=transactions)
+    totals = found.get('totals')
+    if totals and all(totals.get(field) for field in ('gross_amount', 'ewt', 'net_amount')):
+        repaired['totals'] = totals
+    return repaired
+
+async def repair_report(file_bytes: bytes, mime_type: str, data: dict,
+                        reconciliation: Reconciliation = None) -> tuple:
+    """
+    Re-query Gemini about only the parts of an extraction that do not reconcile
+    
+    Rows where gross - EWT differs from net are re-read by their ids; if the
+    row sums still differ from the totals, the model is told what it already
+    returned and asked for just the missing rows. Either answer is a few rows
+    instead of the whole table. The questions go to the last model of the
+    cascade, about file_bytes as extract_report returned them.
+    
+    Returns (data, reconciliation) for the report to keep: the repaired one
+    if it has fewer reconciliation problems than the original, otherwise the
+    original. Callers pass the reconciliation on instead of checking again;
+    data is reconciled here unless its reconciliation is given.
+    """
+    if reconciliation is None:
+        reconciliation = await asyncio.to_thread(reconcile_report, data)
+    if reconciliation.ok or not REPAIR_EXTRACTION or gemini_service is None:
+        return data, reconciliation
+    
+    problems = reconciliation.problem_count
+    batch = data['header'].get('reimbursement_batch')
+    logger.info(f"Batch {batch} does not reconcile ({reconciliation.describe()}), re-querying")
+    
+    service = gemini_service.cascade[-1]
+    repaired, check = data, reconciliation
+    try:
+        bad_rows = reconciliation.bad_rows
+        if bad_rows and len(bad_rows) <= REPAIR_MAX_BAD_ROWS:
+            rows = '\n'.join(
+                json.dumps({field: data['transactions'][index].get(field) for field in (
+                    'terminal_id', 'host_batch_id', 'ids', 'gross_amount', 'ewt', 'net_amount')})
+                for index in bad_rows
+            )
+            corrections = await service.extract_from_bytes(
+                file_bytes, mime_type, EXTRACTION_PROMPT + ROW_REPAIR_PROMPT.format(rows=rows)
+            )
+            repaired = apply_row_repairs(repaired, bad_rows, corrections)
+            check = await asyncio.to_thread(reconcile_report, repaired)
+        
+        if check.mismatched_totals and not check.bad_rows and len(repaired['transactions']) <= REPAIR_MAX_ROWS:
+            row_totals, totals = check.row_totals, check.totals
+            found = await service.extract_from_bytes(
+                file_bytes, mime_type, EXTRACTION_PROMPT + MISSING_ROWS_PROMPT.format(
+                    row_count=len(repaired['transactions']),
+                    gross=row_totals['gross_amount'], ewt=row_totals['ewt'], net=row_totals['net_amount'],
+                    total_gross=totals['gross_amount'], total_ewt=totals['ewt'], total_net=totals['net_amount'],
+                    ids=', '.join(str(txn.get('ids')) for txn in repaired['transactions'])
+                )
+            )
+            repaired = apply_missing_rows(repaired, found)
+            check = await asyncio.to_thread(reconcile_report, repaired)
+    except Exception as e:
+        logger.warning(f"Re-query for batch {batch} failed: {e}")
+    
+    remaining = check.problem_count
+    if remaining >= problems:
+        REPAIRS.labels('unchanged').inc()
+        logger.warning(f"Batch {batch} still does not reconcile after re-query")
+        return data, reconciliation
+    REPAIRS.labels('fixed' if remaining == 0 else 'improved').inc()
+    logger.info(f"Batch {batch} repaired: {problems} problem(s) before, {remaining} after")
+    return repaired, check
+
+async def store_reports(reports: list, owner: int = None, reconciled: list = None):
+    """Keep extracted reports in the transaction history, sent by owner; a failure only logs"""
+    if transaction_store is None:
+        return
+    try:
+        with stage_timer('store'):
+            await asyncio.to_thread(transaction_store.save_reports, reports, owner, reconciled)
+    except Exception as e:
+        logger.warning(f"Could not store {len(reports)} report(s) in the transaction history: {e}")
+
+async def add_report_owner(reports: list, owner: int):
+    """Record another sender of reports answered from the cache; a failure only logs"""
+    if transaction_store is None:
+        return
+    try:
+        await asyncio.to_thread(transaction_store.add_owner, owner, reports)
+    except Exception as e:
+        logger.warning(f"Could not record user {owner} as sender of {len(reports)} report(s): {e}")
+
+async def cached_report_bytes(file_hash: str, data: dict, excel_bytes: bytes, output_format: str) -> bytes:
+    """
+    The requested file for a cached extraction
+    
+    An entry cached by a request for another format has no workbook; the
+    first XLSX request generates it and adds it to the entry.
+    """
+    if output_format != 'xlsx':
+        with stage_timer('export'):
+            return await asyncio.to_thread(get_writer(output_format).write, [data])
+    if excel_bytes is None:
+        with stage_timer('excel'):
+            excel_bytes = await asyncio.to_thread(get_writer('xlsx').write, [data])
+        await asyncio.to_thread(extraction_cache.put, file_hash, gemini_service.cache_version, data, excel_bytes)
+    return excel_bytes
+
+async def process_file(update: Update, file_bytes: bytes, mime_type: str, file_unique_id: str = None,
+                       output_format: str = DEFAULT_FORMAT):
+    """Process PDF file and return Excel (or the chosen output format)"""
+    # Send processing message
+    processing_msg = await update.message.reply_text("🔄 Processing your report...")
+    
+    try:
+        file_hash = content_hash(file_bytes)
+        cached = None
+        if extraction_cache is not None:
+            cached = extraction_cache.get(file_hash, gemini_service.cache_version)
+        
+        if cached is not None:
+            logger.info(f"Cache hit for content {file_hash[:12]}")
+            CACHE_HITS.labels('content').inc()
+            data, excel_bytes = cached
+            reconciliation = None
+            if file_unique_id:
+                extraction_cache.link_file_id(file_unique_id, file_hash)
+            await add_report_owner([data], update.effective_user.id)
+            report_bytes = await cached_report_bytes(file_hash, data, excel_bytes, output_format)
+        else:
+            # A streamed Gemini answer is written to the workbook row by row
+            # while the model is still generating. Only a request for XLSX
+            # gets a workbook; the other formats never pay for one.
+            writer = StreamingReportWriter() if output_format == 'xlsx' else None
+            
+            def on_transaction(txn):
+                if writer.header is not None:
+                    writer.add_transaction(txn)
+            
+            parser = ReportStreamParser()
+            if writer is not None:
+                parser = ReportStreamParser(on_header=writer.start, on_transaction=on_transaction)
+            try:
+                last_progress = 0.0
+                
+                async def on_progress(row_count):
+                    nonlocal last_progress
+                    now = time.monotonic()
+                    if not row_count or now - last_progress < PROGRESS_INTERVAL:
+                        return
+                    last_progress = now
+                    try:
+                        await processing_msg.edit_text(f"🔄 Extracting... {row_count} rows so far")
+                    except Exception as e:
+                        logger.debug(f"Progress update skipped: {e}")
+                
+                # Extract data from the text layer, or with Gemini
+                with stage_timer('extract'):
+                    data, sent_bytes = await extract_report(file_bytes, mime_type, parser, on_progress)
+                
+                # Rows that do not add up are re-read, not the whole document
+                extracted = data
+                with stage_timer('repair'):
+                    data, reconciliation = await repair_report(sent_bytes, mime_type, data)
+                
+                excel_bytes = None
+                if writer is None:
+                    # Other formats are written straight from the extracted rows
+                    with stage_timer('export'):
+                        report_bytes = await asyncio.to_thread(get_writer(output_format).write, [data])
+                else:
+                    logger.info("Generating Excel file...")
+                    with stage_timer('excel'):
+                        if (data is extracted and not parser.discarded and writer.header == data['header']
+                                and writer.rows_written == len(data['transactions'])):
+                            excel_bytes = await asyncio.to_thread(writer.finish, data['totals'])
+                        else:
+                            excel_bytes = await asyncio.to_thread(get_writer('xlsx').write, [data])
+                    report_bytes = excel_bytes
+            finally:
+                # Rows that never reach finish() are dropped with their temp files
+                if writer is not None:
+                    writer.discard()
+            
+            # Only answers that reconcile are cached, so a bad extraction is
+            # retried on the next upload; the history flags it instead
+            if extraction_cache is not None and reconciliation.ok:
+                await asyncio.to_thread(
+                    extraction_cache.put, file_hash, gemini_service.cache_version, data, excel_bytes, file_unique_id
+                )
+            await store_reports([data], update.effective_user.id, [reconciliation.ok])
+        
+        # Delete processing message
+        await processing_msg.delete()
+        
+        # Send report file
+        await send_report(update, data, report_bytes, output_format, reconciliation)
+        REPORTS.labels('success').inc()
         
         logger.info(f"Successfully processed report for batch {data['header']['reimbursement_batch']}")
         
     except ValueError as e:
+        REPORTS.labels('failure').inc()
         await processing_msg.edit_text(
             f"❌ **Extraction failed:** {str(e)}\n\n"
             "The report format may not be recognized. Please ensure it's a valid Petron settlement report."
         )
     except Exception as e:
+        REPORTS.labels('failure').inc()
+        logger.error(f"Processing error: {e}", exc_info=True)
+        await processing_msg.edit_text(
+            f"❌ **Error:** {str(e)}\n\n"
+            "Please try again or contact support if the issue persists."
+        )
+
+async def process_bundle(update: Update, files: list, output_format: str = DEFAULT_FORMAT):
+    """Extract several PDFs concurrently and return one consolidated workbook (or file)"""
+    processing_msg = await update.message.reply_text(f"🔄 Processing {len(files)} reports...")
+    
+    try:
+        async def extract(file_bytes):
+            """The report, whether it reconciles and whether it was answered from the extraction cache"""
+            file_hash = content_hash(file_bytes)
+            if extraction_cache is not None:
+                cached = extraction_cache.get(file_hash, gemini_service.cache_version)
+                if cached is not None:
+                    CACHE_HITS.labels('content').inc()
+                    return cached[0], True, True
+            data, sent_bytes = await extract_report(file_bytes, 'application/pdf')
+            data, reconciliation = await repair_report(sent_bytes, 'application/pdf', data)
+            # As in process_file, only answers that reconcile are cached; the
+            # workbook is the consolidated one, so the entry gets none
+            if extraction_cache is not None and reconciliation.ok:
+                await asyncio.to_thread(extraction_cache.put, file_hash, gemini_service.cache_version, data)
+            return data, reconciliation.ok, False
+        
+        with stage_timer('extract'):
+            results = await asyncio.gather(
+                *[extract(file_bytes) for _, file_bytes in files],
+                return_exceptions=True
+            )
+        
+        reports = []
+        fresh_reports = []
+        fresh_reconciled = []
+        cached_reports = []
+        unreconciled = []
+        failed = []
+        seen_batches = set()
+        for (file_name, _), result in zip(files, results):
+            if isinstance(result, Exception):
+                logger.error(f"Extraction failed for {file_name}: {result}")
+                failed.append(file_name)
+                continue
+            report, reconciled, from_cache = result
+            # Batch numbers are only unique within a business location
+            header = report['header']
+            batch = (header.get('business_location_id'), header['reimbursement_batch'])
+            if batch in seen_batches:
+                logger.info(f"Skipping duplicate batch {batch[1]} from {file_name}")
+                continue
+            seen_batches.add(batch)
+            reports.append(report)
+            if not reconciled:
+                unreconciled.append(header['reimbursement_batch'])
+            if from_cache:
+                cached_reports.append(report)
+            else:
+                fresh_reports.append(report)
+                fresh_reconciled.append(reconciled)
+        
+        if not reports:
+            raise ValueError("None of the reports could be extracted")
+        # Cached reports are already in the history; only their sender is new
+        if fresh_reports:
+            await store_reports(fresh_reports, update.effective_user.id, fresh_reconciled)
+        if cached_reports:
+            await add_report_owner(cached_reports, update.effective_user.id)
+        
+        reports.sort(key=lambda r: (parse_report_date(r['header']['date_from']) or datetime.max,
+                                    r['header']['reimbursement_batch']))
+        summary = await asyncio.to_thread(summarize_reports, reports)
+        writer = get_writer(output_format)
+        with stage_timer('excel' if output_format == 'xlsx' else 'export'):
+            report_bytes = await asyncio.to_thread(writer.write, reports, summary)
+        
+        await processing_msg.delete()
+        
+        first, last = reports[0]['header'], reports[-1]['header']
+        caption = (
+            f"✅ **{len(reports)} reports consolidated!**\n\n"
+            f"📊 **{sum(len(r['transactions']) for r in reports)} transactions**\n"
+            f"💰 **Total Net Amount:** ₱{summary['total']['net_amount']:,.2f}\n"
+            f"📅 **Period:** {first['date_from']} - {last['date_to']}\n"
+            f"🔢 **Batches:** {first['reimbursement_batch']} - {last['reimbursement_batch']}"
+        )
+        if failed:
+            caption += f"\n\n⚠️ Could not extract: {', '.join(failed)}"
+        if unreconciled:
+            caption += f"\n\n⚠️ Rows do not add up to the totals in batch {', '.join(unreconciled)}"
+        
+        with stage_timer('reply'):
+            await update.message.reply_document(
+                document=BytesIO(report_bytes),
+                filename=writer.filename(reports),
+                caption=caption,
+                parse_mode='Markdown'
+            )
+        REPORTS.labels('success').inc()
+        
+        logger.info(f"Consolidated {len(reports)} reports, {len(failed)} failed")
+        
+    except ValueError as e:
+        REPORTS.labels('failure').inc()
+        await processing_msg.edit_text(
+            f"❌ **Extraction failed:** {str(e)}\n\n"
+            "The report format may not be recognized. Please ensure they are valid Petron settlement reports."
+        )
+    except Exception as e:
+        REPORTS.labels('failure').inc()
         logger.error(f"Processing error: {e}", exc_info=True)
         await processing_msg.edit_text(
             f"❌ **Error:** {str(e)}\n\n"
@@ -413,6 +1582,13 @@ async def process_file(update: Update, file_bytes: bytes, mime_type: str):
 
 def main():
     """Start the bot"""
+    missing = check_dependencies()
+    if missing:
+        logger.error(f"Missing packages: {', '.join(missing)}")
+        print(f"\n❌ Missing packages: {', '.join(missing)}")
+        print("Install them with: pip install -r requirements.txt")
+        sys.exit(1)
+    
     # Check environment variables
     bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
     gemini_api_key = os.getenv('GEMINI_API_KEY')
@@ -437,17 +1613,60 @@ def main():
         print("3. Copy the key and set it: export GEMINI_API_KEY='your-key'")
         return
     
-    # Initialize Gemini service
-    global gemini_service
-    gemini_service = GeminiService(gemini_api_key)
+    # Initialize the Gemini model cascade, with one rate limiter for every
+    # Gemini request in this process
+    global gemini_service, extraction_cache, transaction_store, report_queue
+    gemini_service = create_gemini_service(gemini_api_key, rate_limiter=RateLimiter(
+        float(os.getenv('GEMINI_RPM', '15')),
+        float(os.getenv('GEMINI_TPM', '250000')) or None
+    ))
+    
+    # Initialize extraction cache (set CACHE_PATH to an empty value to disable)
+    cache_path = os.getenv('CACHE_PATH', 'extraction_cache.sqlite3')
+    if cache_path:
+        extraction_cache = ExtractionCache(
+            cache_path,
+            memory_entries=int(os.getenv('CACHE_MEMORY_ENTRIES', '32')),
+            max_entries=int(os.getenv('CACHE_MAX_ENTRIES', '500')),
+            ttl_seconds=float(os.getenv('CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+        )
+    
+    # Initialize the transaction history (set STORE_PATH to an empty value to disable)
+    store_path = os.getenv('STORE_PATH', 'transactions.sqlite3')
+    if store_path:
+        transaction_store = TransactionStore(store_path)
+    
+    # Initialize report queue
+    report_queue = ReportQueue(
+        workers=int(os.getenv('JOB_WORKERS', '4')),
+        per_user_limit=int(os.getenv('JOB_PER_USER_LIMIT', '1')),
+        max_pending=int(os.getenv('JOB_MAX_PENDING', '100')),
+        max_pending_per_user=int(os.getenv('JOB_MAX_PENDING_PER_USER', '20'))
+    )
+    watch_queue(report_queue)
     
     # Create application
     logger.info("Starting Telegram bot...")
-    app = Application.builder().token(bot_token).build()
+    # Concurrent updates let /start, downloads and other chats proceed
+    # while extractions are running
+    builder = (
+        Application.builder()
+        .token(bot_token)
+        .concurrent_updates(True)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    if webhook_url:
+        # Webhook mode uses our own server, which also serves metrics and health checks
+        builder.updater(None)
+    app = builder.build()
     
     # Add handlers
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_command))
+    app.add_handler(CommandHandler("format", format_command))
+    app.add_handler(CommandHandler("summary", summary_command))
+    app.add_handler(CommandHandler("terminal", terminal_command))
     app.add_handler(MessageHandler(filters.PHOTO, handle_photo))
     app.add_handler(MessageHandler(filters.Document.ALL, handle_document))
     
@@ -463,13 +1682,18 @@ def main():
         print(f"Port: {port}")
         print("\nBot will only run when receiving messages.")
         print("Zero resource usage when idle!")
+        print("\nMonitoring: /metrics, /healthz, /readyz")
         print("="*60 + "\n")
         
-        app.run_webhook(
+        from web_server import run_webhook_server
+        run_webhook_server(
+            app,
             listen="0.0.0.0",
             port=port,
             url_path=bot_token,
-            webhook_url=f"{webhook_url}/{bot_token}"
+            webhook_url=f"{webhook_url}/{bot_token}",
+            readiness=readiness_problems,
+            on_listening=prewarm if PREWARM else None
         )
     else:
         # Polling mode - for local development
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark: latency percentiles, throughput and peak RSS
+Drives GeminiService, ExcelService.generate_report and process_file against
+the fake Gemini model at several concurrency levels, and optionally the local
+text-layer parser on a synthetic PDF. Each run happens in a
+fresh subprocess so peak RSS is not shared between runs, and is warmed up
+with warm_up() first, as the bot does at start-up, so the first requests
+do not pay for the imports and the report styles.
+
+Usage:
+    python bench_e2e.py                              # all scenarios at concurrency 1, 8, 64
+    python bench_e2e.py --scenario process_file --concurrency 8 64
+    python bench_e2e.py --latency 0.5 --error-rate 0.05 --rows 500
+    python bench_e2e.py --scenario text_layer --concurrency 1 4 --rows 2000
+    python bench_e2e.py --save baseline              # write benchmarks/baseline.json
+    python bench_e2e.py --compare baseline           # fail if >20% slower than the baseline
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import subprocess
+from io import BytesIO
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+BASELINE_DIR = HERE / "benchmarks"
+
+SCENARIOS = ['gemini', 'excel', 'process_file', 'text_layer']
+DEFAULT_SCENARIOS = ['gemini', 'excel', 'process_file']
+DEFAULT_CONCURRENCY = [1, 8, 64]
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def blank_pdf() -> bytes:
+    """One-page PDF without a text layer, so process_file goes to Gemini"""
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+async def drive(operation, requests: int, concurrency: int) -> tuple:
+    """Run `requests` operations with at most `concurrency` at once; returns (latencies, errors, wall)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(n):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok = await operation(n)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if ok is False:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(n) for n in range(requests)])
+    return latencies, errors, time.perf_counter() - started
+
+
+def run_once(scenario: str, concurrency: int, requests: int, latency: float, error_rate: float, rows: int):
+    """Child process: run one scenario and print the measurements as JSON"""
+    sys.path.insert(0, str(ROOT))
+    sys.path.insert(0, str(HERE))
+    import logging
+    logging.disable(logging.CRITICAL)
+    import telegram_bot
+    from telegram_bot import GeminiService
+    from excel_report import ExcelService
+    from fake_gemini import FakeGeminiModel, make_report
+    from fake_telegram import FakeUpdate
+    from synthetic_report import render_pdf
+    from pdf_parser import extract_text_layer
+
+    report = make_report(rows)
+    service = GeminiService('bench-key', max_workers=concurrency)
+    service.model = FakeGeminiModel(latency=latency, error_rate=error_rate, report=report, seed=concurrency)
+    telegram_bot.gemini_service = service
+    telegram_bot.extraction_cache = None
+    pdf_bytes = blank_pdf()
+    telegram_bot.warm_up()
+
+    async def gemini(n):
+        data = await service.extract_from_bytes(pdf_bytes, 'application/pdf')
+        return len(data['transactions']) == len(report['transactions'])
+
+    async def excel(n):
+        excel_bytes = await asyncio.to_thread(ExcelService.generate_report, report)
+        return len(excel_bytes) > 0
+
+    async def process_file(n):
+        update = FakeUpdate(user_id=n)
+        await telegram_bot.process_file(update, pdf_bytes, 'application/pdf')
+        return len(update.message.documents) == 1
+
+    if scenario == 'text_layer':
+        report_pdf = render_pdf(report)
+
+    async def text_layer(n):
+        data = await asyncio.to_thread(extract_text_layer, report_pdf)
+        return data is not None and len(data['transactions']) == len(report['transactions'])
+
+    operation = {'gemini': gemini, 'excel': excel, 'process_file': process_file,
+                 'text_layer': text_layer}[scenario]
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        latencies, errors, wall = asyncio.run(drive(operation, requests, concurrency))
+    finally:
+        service.shutdown()
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        'scenario': scenario,
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': errors,
+        'retries': service.model.failures,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'reports_per_sec': requests / wall,
+        'peak_rss_mb': peak_kb / 1024,
+        'run_rss_mb': (peak_kb - baseline_kb) / 1024,
+    }))
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Print the change against a baseline; returns the runs that regressed"""
+    previous = {(r['scenario'], r['concurrency']): r for r in baseline}
+    regressions = []
+    print(f"\n{'scenario':<13} {'conc':>5} {'p95 Δ':>9} {'reports/s Δ':>12} {'peak RSS Δ':>11}")
+    for r in results:
+        old = previous.get((r['scenario'], r['concurrency']))
+        if old is None:
+            continue
+        p95_change = r['p95'] / old['p95'] - 1
+        rate_change = r['reports_per_sec'] / old['reports_per_sec'] - 1
+        rss_change = r['peak_rss_mb'] / old['peak_rss_mb'] - 1
+        flag = ''
+        if p95_change > tolerance or rate_change < -tolerance or rss_change > tolerance:
+            regressions.append(r)
+            flag = '  ⚠️ regression'
+        print(f"{r['scenario']:<13} {r['concurrency']:>5} {p95_change:>+8.1%} {rate_change:>+11.1%} "
+              f"{rss_change:>+10.1%}{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark with a fake Gemini model")
+    parser.add_argument('--scenario', nargs='+', choices=SCENARIOS, default=DEFAULT_SCENARIOS)
+    parser.add_argument('--concurrency', nargs='+', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--requests', type=int, help="Requests per run (default: max(16, 4 x concurrency))")
+    parser.add_argument('--latency', type=float, default=0.2, help="Fake model latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of fake requests that fail")
+    parser.add_argument('--rows', type=int, help="Synthetic transactions per report (default: the 17-row sample)")
+    parser.add_argument('--save', metavar='NAME', help="Save results as benchmarks/NAME.json")
+    parser.add_argument('--compare', metavar='NAME', help="Compare against benchmarks/NAME.json")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed regression (default 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("📊 End-to-End Benchmark (fake Gemini)")
+    print("=" * 80)
+    print(f"latency {args.latency}s, error rate {args.error_rate:.0%}, "
+          f"rows {args.rows or 'sample'}")
+    print(f"{'scenario':<13} {'conc':>5} {'reqs':>5} {'err':>4} {'retry':>5} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'reports/s':>10} {'peak RSS':>10} {'+RSS':>9}")
+
+    results = []
+    for scenario in args.scenario:
+        for concurrency in args.concurrency:
+            requests = args.requests or max(16, 4 * concurrency)
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', scenario, str(concurrency), str(requests),
+                 str(args.latency), str(args.error_rate), str(args.rows or 0)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            r = json.loads(output.strip().splitlines()[-1])
+            results.append(r)
+            print(f"{r['scenario']:<13} {r['concurrency']:>5} {r['requests']:>5} {r['errors']:>4} {r['retries']:>5} "
+                  f"{r['p50']:>7.3f}s {r['p95']:>7.3f}s {r['p99']:>7.3f}s {r['reports_per_sec']:>10.1f} "
+                  f"{r['peak_rss_mb']:>8.1f}MB {r['run_rss_mb']:>7.1f}MB")
+
+    if args.save:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save}.json"
+        path.write_text(json.dumps({
+            'settings': {'latency': args.latency, 'error_rate': args.error_rate, 'rows': args.rows},
+            'results': results,
+        }, indent=2) + "\n")
+        print(f"\n💾 Saved baseline to {path}")
+
+    if args.compare:
+        path = BASELINE_DIR / f"{args.compare}.json"
+        regressions = compare(results, json.loads(path.read_text())['results'], args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} run(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+        print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 8 and sys.argv[1] == '--child':
+        scenario, concurrency, requests, latency, error_rate, rows = sys.argv[2:]
+        run_once(scenario, int(concurrency), int(requests), float(latency), float(error_rate),
+                 int(rows) or None)
+    else:
+        sys.exit(main())
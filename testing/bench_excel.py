@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark Excel generation: rows/sec and peak RSS by row count
+Each run happens in a fresh subprocess so peak RSS is not shared between runs
+
+Usage:
+    python bench_excel.py                 # 1k, 100k and 1M rows
+    python bench_excel.py 1000 20000      # custom row counts
+    python bench_excel.py --per-report    # CPU time per typical small report
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_PATH = Path(__file__).resolve().parent / "extracted_from_pdf.json"
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+# The standard in-memory workbook is skipped above this size
+STANDARD_MAX_ROWS = 100_000
+
+# Row counts of typical daily reports, and how many of each to generate
+PER_REPORT_SIZES = [10, 50, 200]
+PER_REPORT_COUNT = 100
+
+
+def make_data(rows: int) -> dict:
+    """Repeat the sample transactions up to the requested row count"""
+    with open(SAMPLE_PATH) as f:
+        sample = json.load(f)
+    base = sample['transactions']
+    transactions = []
+    for i in range(rows):
+        txn = dict(base[i % len(base)])
+        txn['ids'] = str(13400000 + i)
+        transactions.append(txn)
+    sample['transactions'] = transactions
+    return sample
+
+
+def run_once(mode: str, rows: int):
+    """Child process: generate one report and print the measurements as JSON"""
+    sys.path.insert(0, str(ROOT))
+    import logging
+    logging.disable(logging.INFO)
+    from excel_report import ExcelService
+
+    data = make_data(rows)
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.perf_counter()
+    excel_bytes = ExcelService.generate_report(data, streaming=(mode == 'streaming'))
+    elapsed = time.perf_counter() - started
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        'mode': mode,
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed,
+        'peak_rss_mb': peak_kb / 1024,
+        'generation_rss_mb': (peak_kb - baseline_kb) / 1024,
+        'file_mb': len(excel_bytes) / 1024 / 1024,
+    }))
+
+
+def per_report():
+    """CPU milliseconds per report for many small reports, as the bot sees them (best of 3 rounds)"""
+    sys.path.insert(0, str(ROOT))
+    import logging
+    logging.disable(logging.INFO)
+    from excel_report import ExcelService
+
+    print("📊 Excel Generation CPU per Report")
+    print("=" * 80)
+    print(f"{'rows':>6} {'reports':>8} {'cpu ms/report':>14} {'reports/sec':>12}")
+
+    ExcelService.generate_report(make_data(10))  # imports and one-time setup
+    for rows in PER_REPORT_SIZES:
+        data = make_data(rows)
+        rounds = []
+        for _ in range(3):
+            started = time.process_time()
+            for _ in range(PER_REPORT_COUNT):
+                ExcelService.generate_report(data, streaming=False)
+            rounds.append((time.process_time() - started) / PER_REPORT_COUNT)
+        cpu = min(rounds)
+        print(f"{rows:>6} {PER_REPORT_COUNT:>8} {cpu * 1000:>14.2f} {1 / cpu:>12.1f}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    print("📊 Excel Generation Benchmark")
+    print("=" * 80)
+    print(f"{'mode':<10} {'rows':>10} {'seconds':>9} {'rows/sec':>10} {'peak RSS':>10} {'+RSS':>9} {'file':>8}")
+
+    for rows in sizes:
+        for mode in ('standard', 'streaming'):
+            if mode == 'standard' and rows > STANDARD_MAX_ROWS:
+                continue
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', mode, str(rows)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            r = json.loads(output.strip().splitlines()[-1])
+            print(f"{r['mode']:<10} {r['rows']:>10,} {r['seconds']:>9.2f} {r['rows_per_sec']:>10,.0f} "
+                  f"{r['peak_rss_mb']:>8.1f}MB {r['generation_rss_mb']:>7.1f}MB {r['file_mb']:>6.1f}MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        run_once(sys.argv[2], int(sys.argv[3]))
+    elif sys.argv[1:] == ['--per-report']:
+        per_report()
+    else:
+        main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark output formats: write time and file size of XLSX, CSV, JSON Lines and Parquet
+Every format writes the same synthetic report; the best of several runs is kept
+
+Usage:
+    python bench_export.py                # 1k, 10k and 100k rows
+    python bench_export.py 1000 500000    # custom row counts
+"""
+
+import sys
+import time
+import logging
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+from fake_gemini import make_report
+from export_formats import WRITERS, get_writer
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def measure(output_format: str, data: dict, repeats: int) -> tuple:
+    """Best write time in seconds and the file size in bytes"""
+    writer = get_writer(output_format)
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        output = writer.write([data])
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(output)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    logging.disable(logging.INFO)
+
+    print("📊 Output Format Benchmark")
+    print("=" * 80)
+    print(f"{'format':<10} {'rows':>10} {'seconds':>9} {'rows/sec':>11} {'file':>10} {'vs xlsx':>16}")
+
+    for rows in sizes:
+        data = make_report(rows)
+        repeats = 3 if rows <= 100_000 else 1
+        xlsx_seconds, xlsx_bytes = measure('xlsx', data, repeats)
+        for output_format in WRITERS:
+            try:
+                seconds, size = (xlsx_seconds, xlsx_bytes) if output_format == 'xlsx' \
+                    else measure(output_format, data, repeats)
+            except RuntimeError as e:
+                print(f"{output_format:<10} {rows:>10,} skipped: {e}")
+                continue
+            print(f"{output_format:<10} {rows:>10,} {seconds:>9.3f} {rows / seconds:>11,.0f} "
+                  f"{size / 1024:>8.0f}KB {xlsx_seconds / seconds:>6.1f}x {size / xlsx_bytes:>7.0%} size")
+        print()
+
+
+if __name__ == "__main__":
+    main()
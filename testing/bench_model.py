@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark the typed report model against dict transactions on a consolidated report
+Compares retained memory and the time to total, summarize and reconcile
+
+Usage:
+    python bench_model.py                 # 100k rows across 20 reports
+    python bench_model.py 500000 50       # rows, reports
+"""
+
+import sys
+import json
+import time
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+from fake_gemini import make_report
+from report_model import SettlementReport, summarize
+
+
+def dict_summary(reports: list) -> dict:
+    """The dict-based consolidation: Decimal per amount, per row"""
+    def bucket():
+        return {'no_of_txn': 0, 'gross_amount': Decimal(0), 'ewt': Decimal(0), 'net_amount': Decimal(0)}
+
+    by_terminal, by_day, grand_total = {}, {}, bucket()
+    for report in reports:
+        for txn in report['transactions']:
+            day = (txn['settle_date'] or '').split(' ')[0]
+            gross = Decimal(str(txn['gross_amount']))
+            ewt = Decimal(str(txn['ewt']))
+            net = Decimal(str(txn['net_amount']))
+            for total in (by_terminal.setdefault(txn['terminal_id'], bucket()),
+                          by_day.setdefault(day, bucket()), grand_total):
+                total['no_of_txn'] += txn['no_of_txn']
+                total['gross_amount'] += gross
+                total['ewt'] += ewt
+                total['net_amount'] += net
+    return {'by_terminal': by_terminal, 'by_day': by_day, 'total': grand_total}
+
+
+def dict_reconcile(report: dict) -> tuple:
+    """Row check and totals check on dicts with Decimal arithmetic"""
+    bad_rows = []
+    sums = {'gross_amount': Decimal(0), 'ewt': Decimal(0), 'net_amount': Decimal(0)}
+    for index, txn in enumerate(report['transactions']):
+        amounts = {field: Decimal(str(txn[field])) for field in sums}
+        if amounts['gross_amount'] - amounts['ewt'] != amounts['net_amount']:
+            bad_rows.append(index)
+        for field, amount in amounts.items():
+            sums[field] += amount
+    totals = {field: Decimal(str(report['totals'][field])) for field in sums}
+    return bad_rows, [field for field in sums if sums[field] != totals[field]]
+
+
+def retained_mb(build) -> tuple:
+    """(result, MB still allocated by build's result)"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 1024 / 1024
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    report_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print("📊 Report Model Benchmark")
+    print("=" * 80)
+    per_report = rows // report_count
+    payloads = []
+    for index in range(report_count):
+        report = make_report(per_report)
+        report['header']['reimbursement_batch'] = str(5216 + index)
+        payloads.append(json.dumps(report))
+    print(f"{report_count} reports x {per_report:,} rows = {per_report * report_count:,} transactions\n")
+
+    # Memory: the extraction's dicts versus the model built from them once they are dropped
+    dicts, dict_mb = retained_mb(lambda: [json.loads(payload) for payload in payloads])
+    models, model_mb = retained_mb(lambda: [SettlementReport.from_dict(json.loads(payload)) for payload in payloads])
+    print(f"{'retained memory':<28} dicts {dict_mb:>8.1f}MB   model {model_mb:>8.1f}MB   "
+          f"({dict_mb / model_mb:.1f}x smaller)")
+
+    # Time: consolidated summary plus reconciliation of every report
+    _, dict_summary_s = timed(dict_summary, dicts)
+    _, dict_reconcile_s = timed(lambda: [dict_reconcile(report) for report in dicts])
+    _, convert_s = timed(lambda: [SettlementReport.from_dict(report) for report in dicts])
+    _, model_summary_s = timed(summarize, models)
+    _, model_reconcile_s = timed(lambda: [model.reconcile() for model in models])
+
+    dict_total = dict_summary_s + dict_reconcile_s
+    model_total = model_summary_s + model_reconcile_s
+    print(f"{'summarize':<28} dicts {dict_summary_s:>8.3f}s    model {model_summary_s:>8.3f}s")
+    print(f"{'reconcile':<28} dicts {dict_reconcile_s:>8.3f}s    model {model_reconcile_s:>8.3f}s")
+    print(f"{'total':<28} dicts {dict_total:>8.3f}s    model {model_total:>8.3f}s   "
+          f"({dict_total / model_total:.1f}x faster)")
+    print(f"{'total incl. dict -> model':<28} {'':>15}    model {model_total + convert_s:>8.3f}s   "
+          f"({dict_total / (model_total + convert_s):.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
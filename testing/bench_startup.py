@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold start: time to import telegram_bot and to pre-warm it
+Each sample runs in a fresh interpreter, like a scale-to-zero host waking up
+
+Usage:
+    python bench_startup.py            # 5 samples
+    python bench_startup.py 10         # 10 samples
+"""
+
+import sys
+import json
+import subprocess
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ['google.generativeai', 'grpc', 'google.protobuf', 'openpyxl', 'pdfplumber', 'pypdf']
+
+CHILD = f"""
+import sys, time, json, logging
+sys.path.insert(0, {str(ROOT)!r})
+started = time.perf_counter()
+import telegram_bot
+imported = time.perf_counter()
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+logging.disable(logging.CRITICAL)
+telegram_bot.gemini_service = telegram_bot.GeminiService('bench-key', max_workers=1)
+telegram_bot.warm_up()
+warmed = time.perf_counter()
+telegram_bot.gemini_service.shutdown()
+print(json.dumps({{'import': imported - started, 'prewarm': warmed - imported, 'loaded_at_import': loaded}}))
+"""
+
+
+def sample() -> dict:
+    output = subprocess.run([sys.executable, '-c', CHILD], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int = 10) -> list:
+    """Top cumulative import times (ms) from python -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import sys; sys.path.insert(0, {str(ROOT)!r}); import telegram_bot"],
+        capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative) / 1000, name.rstrip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print("🚀 Start-up Benchmark")
+    print("=" * 80)
+    results = [sample() for _ in range(samples)]
+    imports = [r['import'] for r in results]
+    prewarms = [r['prewarm'] for r in results]
+    print(f"import telegram_bot: median {statistics.median(imports) * 1000:.0f}ms, "
+          f"min {min(imports) * 1000:.0f}ms, max {max(imports) * 1000:.0f}ms")
+    print(f"pre-warm (deferred): median {statistics.median(prewarms) * 1000:.0f}ms")
+    loaded = results[0]['loaded_at_import']
+    print(f"heavy modules loaded at import: {', '.join(loaded) if loaded else 'none'}")
+
+    print("\nSlowest imports (cumulative):")
+    for ms, name in slowest_imports():
+        print(f"  {ms:>8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
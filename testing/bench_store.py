@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark the SQLite transaction history over a year of daily reports
+Measures the import rate, the cost of re-importing a batch, query latency
+and /summary-style rollup queries against scanning the transaction rows
+
+Usage:
+    python bench_store.py                 # 365 reports x 300 rows
+    python bench_store.py 1095 300        # reports (three years), rows per report
+"""
+
+import sys
+import time
+import tempfile
+import statistics
+from datetime import date, timedelta
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+from synthetic_report import generate_report_data
+from transaction_store import TransactionStore
+
+START = date(2025, 1, 1)
+
+
+def query_ms(function, repeat: int = 20) -> float:
+    """Median milliseconds per call"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+
+def main():
+    report_count = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    print("📊 Transaction Store Benchmark")
+    print("=" * 80)
+    reports = [
+        generate_report_data(rows, terminals=12, days=1, seed=n, start=START + timedelta(days=n), batch=str(5000 + n))
+        for n in range(report_count)
+    ]
+    # The same terminals settle every day
+    terminals = sorted({txn['terminal_id'] for txn in reports[0]['transactions']})
+    for report in reports:
+        own = sorted({txn['terminal_id'] for txn in report['transactions']})
+        shared = dict(zip(own, terminals))
+        for txn in report['transactions']:
+            txn['terminal_id'] = shared.get(txn['terminal_id'], terminals[0])
+    print(f"{report_count} reports x {rows:,} rows = {report_count * rows:,} transactions\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TransactionStore(str(Path(tmp) / "transactions.sqlite3"))
+
+        started = time.perf_counter()
+        for report in reports:
+            store.save_report(report)
+        elapsed = time.perf_counter() - started
+        print(f"{'import (one commit per report)':<36} {elapsed:>8.2f}s   "
+              f"{report_count * rows / elapsed:>10,.0f} rows/s")
+
+        started = time.perf_counter()
+        store.save_report(reports[100])
+        print(f"{'re-import one batch':<36} {(time.perf_counter() - started) * 1000:>8.1f}ms")
+
+        location = reports[0]['header']['business_location_id']
+        terminal = reports[0]['transactions'][0]['terminal_id']
+        host_batch = reports[200]['transactions'][10]['host_batch_id']
+        month = (date(2025, 6, 1), date(2025, 7, 1))
+        queries = [
+            ("year total", lambda: store.totals()),
+            ("location, one month", lambda: store.totals(business_location_id=location,
+                                                         since=month[0], until=month[1])),
+            ("terminal, whole year", lambda: store.totals(terminal_id=terminal)),
+            ("terminal, one month rows", lambda: store.transactions(terminal_id=terminal,
+                                                                    since=month[0], until=month[1])),
+            ("host batch lookup", lambda: store.transactions(host_batch_id=host_batch)),
+            ("reimbursement batch rows", lambda: store.transactions(reimbursement_batch='5100')),
+        ]
+        print()
+        for name, function in queries:
+            print(f"{name:<36} {query_ms(function):>8.2f}ms")
+
+        # /summary and /terminal read the daily terminal rollups
+        last_day = START + timedelta(days=report_count - 1)
+        quarter = (date(last_day.year, (last_day.month - 1) // 3 * 3 + 1, 1), last_day + timedelta(days=1))
+        summaries = [
+            ("summary, all history", lambda: store.summary(), lambda: store.totals()),
+            ("summary, this quarter", lambda: store.summary(since=quarter[0], until=quarter[1]),
+             lambda: store.totals(since=quarter[0], until=quarter[1])),
+            ("terminal, all history", lambda: store.summary(terminal_id=terminal),
+             lambda: store.totals(terminal_id=terminal)),
+        ]
+        print(f"\n{'':<36} {'rollup':>8}    {'row scan':>8}")
+        for name, rollup, scan in summaries:
+            days = len(rollup()['by_day'])
+            print(f"{name:<36} {query_ms(rollup, 5):>8.2f}ms  {query_ms(scan, 5):>8.2f}ms   ({days} days)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
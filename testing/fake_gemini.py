@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the Gemini model
+Answers with canned or synthetic report JSON after a configurable latency,
+optionally failing a share of requests the way an overloaded API does
+"""
+
+import json
+import time
+import random
+import threading
+from pathlib import Path
+
+from google.api_core import exceptions as google_exceptions
+
+from synthetic_report import generate_report_data
+
+SAMPLE_PATH = Path(__file__).resolve().parent / "extracted_from_pdf.json"
+
+
+def make_report(rows: int = None) -> dict:
+    """The sample report, or a synthetic one with the given number of rows"""
+    if rows is None:
+        with open(SAMPLE_PATH) as f:
+            return json.load(f)
+    return generate_report_data(rows, terminals=max(3, rows // 1000))
+
+
+class UsageMetadata:
+    def __init__(self, prompt_tokens, output_tokens, cached_tokens=0):
+        self.prompt_token_count = prompt_tokens
+        self.cached_content_token_count = cached_tokens
+        self.candidates_token_count = output_tokens
+
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakeGeminiModel:
+    """
+    Drop-in for GenerativeModel.generate_content, with or without stream=True
+
+    latency is the total time per request (with +/- jitter as a fraction);
+    a streamed answer is spread over `chunks` pieces across that time.
+    error_rate is the share of requests that fail with ServiceUnavailable
+    before answering, carrying a short retry hint.
+    """
+
+    def __init__(self, latency: float = 0.2, error_rate: float = 0.0, report: dict = None,
+                 chunks: int = 8, jitter: float = 0.2, seed: int = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.chunks = chunks
+        self.jitter = jitter
+        self.text = json.dumps(report if report is not None else make_report())
+        self.calls = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _latency(self) -> float:
+        with self._lock:
+            self.calls += 1
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.failures += 1
+        if failed:
+            time.sleep(self.latency * factor / 4)
+            raise google_exceptions.ServiceUnavailable("The model is overloaded. Please retry in 0.05s.")
+        return self.latency * factor
+
+    def _usage(self):
+        return UsageMetadata(prompt_tokens=500, output_tokens=len(self.text) // 4)
+
+    def generate_content(self, contents, stream: bool = False):
+        latency = self._latency()
+        if not stream:
+            time.sleep(latency)
+            return FakeResponse(self.text, self._usage())
+        return self._stream(latency)
+
+    def _stream(self, latency: float):
+        size = -(-len(self.text) // self.chunks)
+        pieces = [self.text[i:i + size] for i in range(0, len(self.text), size)]
+        for number, piece in enumerate(pieces, start=1):
+            time.sleep(latency / len(pieces))
+            yield FakeResponse(piece, self._usage() if number == len(pieces) else None)
+
+
+class CannedModel:
+    """Answers every request at once with the same text, streamed in two pieces if asked"""
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, contents, stream=False):
+        self.calls += 1
+        usage = UsageMetadata(prompt_tokens=1000, output_tokens=200)
+        if stream:
+            middle = len(self.text) // 2
+            return iter([FakeResponse(self.text[:middle], usage), FakeResponse(self.text[middle:], usage)])
+        return FakeResponse(self.text, usage)
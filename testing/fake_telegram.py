@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Offline stand-ins for the Telegram objects the bot's handlers use
+They record what the bot sends instead of calling the Bot API
+"""
+
+
+class FakeMessage:
+    """Enough of telegram.Message for the command handlers, handle_document and process_file"""
+
+    def __init__(self, document=None, caption=None):
+        self.document = document
+        self.caption = caption
+        self.media_group_id = None
+        self.replies = []
+        self.documents = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+        # The bot edits and deletes its status messages
+        return FakeMessage()
+
+    async def edit_text(self, text, **kwargs):
+        self.replies.append(text)
+
+    async def delete(self):
+        pass
+
+    async def reply_document(self, document, filename=None, caption=None, **kwargs):
+        self.documents.append((filename, document.getvalue(), caption))
+
+
+class FakeUser:
+    def __init__(self, user_id=1):
+        self.id = user_id
+
+
+class FakeUpdate:
+    def __init__(self, document=None, user_id=1):
+        self.message = FakeMessage(document)
+        self.effective_user = FakeUser(user_id)
+
+
+class FakeContext:
+    def __init__(self, *args):
+        self.args = list(args)
+        self.user_data = {}
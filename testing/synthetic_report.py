@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Synthetic Petron Merchant Settlement Reports for load and scale testing
+Generates ground-truth report JSON and renders it as a PDF with the same
+layout and text layer as the real reports. No PDF library is needed.
+
+Usage:
+    python synthetic_report.py --rows 10000 --terminals 12 --output out/report_10k
+    python synthetic_report.py --rows 500 --pages 5 --long-descriptions 0.1 --straddle --cover
+
+Writes <output>.pdf and <output>.json (the expected extraction).
+"""
+
+import sys
+import json
+import zlib
+import random
+import argparse
+from pathlib import Path
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+
+# Page size of the real reports, in points
+PAGE_WIDTH = 720
+PAGE_HEIGHT = 792
+TOP_MARGIN = 40
+LINE_HEIGHT = 12.2
+TABLE_TOP = 150
+BODY_SIZE = 8.1
+HEADER_SIZE = 8.95
+DESCRIPTION_SIZE = 7.15
+
+# Column positions measured from a real report: left edges, or right edges for numbers
+COLUMNS = {
+    'terminal_id': ('left', 52.7),
+    'host_batch_id': ('left', 114.0),
+    'ids': ('left', 159.1),
+    'settle_day': ('left', 200.5),
+    'settle_time': ('right', 277.3),
+    'no_of_txn': ('right', 324.0),
+    'gross_amount': ('right', 387.8),
+    'ewt': ('right', 452.0),
+    'net_amount': ('right', 525.0),
+}
+DESCRIPTION_X = 528.0
+DESCRIPTION_WIDTH = 160.0
+
+DEFAULT_DESCRIPTION = "Default Fleet Transaction (Prod Level)"
+LONG_DESCRIPTIONS = [
+    "Default Fleet Transaction (Prod Level) Manual Adjustment for Reversed Card Swipe Ref 2231",
+    "Fleet Card Settlement with Loyalty Points Redemption and Partial Cash Top-Up at Pump 4",
+    "Default Fleet Transaction (Prod Level) Late Settlement Carried Over From Previous Batch Window",
+]
+
+# Helvetica advance widths (1/1000 em) for the characters whose width matters here
+CHAR_WIDTHS = {**{d: 556 for d in '0123456789'}, ',': 278, '.': 278, '-': 333, ':': 278,
+               '/': 278, ' ': 278, '(': 333, ')': 333, 'A': 667, 'M': 833, 'P': 667}
+DEFAULT_CHAR_WIDTH = 556
+
+
+def text_width(text: str, size: float) -> float:
+    return sum(CHAR_WIDTHS.get(ch, DEFAULT_CHAR_WIDTH) for ch in text) * size / 1000
+
+
+def money(value: Decimal) -> str:
+    return f"{value:,.2f}"
+
+
+def wrap(text: str, size: float, width: float) -> list:
+    """Greedy word wrap to the given width"""
+    lines = []
+    current = ''
+    for word in text.split():
+        candidate = f"{current} {word}".strip()
+        if current and text_width(candidate, size) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+
+def generate_report_data(rows: int, terminals: int = 3, days: int = 3, seed: int = 0,
+                         long_descriptions: float = 0.0, start: date = date(2025, 11, 1),
+                         batch: str = "5216") -> dict:
+    """
+    Ground-truth report with `rows` transactions spread over terminals and days
+
+    Amounts are computed with Decimal: EWT is 1% of the VAT-exclusive gross,
+    net = gross - EWT, and the totals are the exact column sums.
+    long_descriptions is the share of rows whose description wraps.
+    """
+    rng = random.Random(seed)
+    terminal_ids = sorted(str(rng.randint(20000000, 59999999)) for _ in range(terminals))
+    end = start + timedelta(days=days - 1)
+
+    transactions = []
+    sums = {'gross_amount': Decimal(0), 'ewt': Decimal(0), 'net_amount': Decimal(0)}
+    for n in range(rows):
+        day = start + timedelta(days=n * days // max(rows, 1))
+        hour = rng.randint(0, 23)
+        time_text = f"{hour % 12 or 12}:{rng.randint(0, 59):02d}{'AM' if hour < 12 else 'PM'}"
+        count = rng.randint(1, 40)
+        gross = sum(Decimal(rng.randint(20000, 250000)) / 100 for _ in range(count)).quantize(CENT)
+        ewt = (gross / Decimal('1.12') * Decimal('0.01')).quantize(CENT, rounding=ROUND_HALF_UP)
+        net = gross - ewt
+        description = DEFAULT_DESCRIPTION
+        if rng.random() < long_descriptions:
+            description = rng.choice(LONG_DESCRIPTIONS)
+
+        transactions.append({
+            'terminal_id': terminal_ids[rng.randrange(terminals)],
+            'host_batch_id': str(28916000 + n * 3 + rng.randint(0, 2)),
+            'ids': str(13398000 + n),
+            'settle_date': f"{day:%m/%d/%Y} {time_text}",
+            'no_of_txn': count,
+            'gross_amount': float(gross),
+            'ewt': float(ewt),
+            'net_amount': float(net),
+            'description': description,
+        })
+        sums['gross_amount'] += gross
+        sums['ewt'] += ewt
+        sums['net_amount'] += net
+
+    return {
+        'header': {
+            'customer_number': str(1049850 + seed),
+            'business_location_id': "100000040277201",
+            'business_location_name': "Top Gun 747 Corporation",
+            'date_from': f"{start:%d %b %Y}",
+            'date_to': f"{end:%d %b %Y}",
+            'reimbursement_batch': batch,
+        },
+        'transactions': transactions,
+        'totals': {key: float(value) for key, value in sums.items()},
+    }
+
+
+class PageCanvas:
+    """Collects positioned text for one page as PDF content operators"""
+
+    def __init__(self):
+        self.ops = []
+
+    def text(self, x: float, top: float, text: str, size: float = BODY_SIZE, bold: bool = False):
+        # pdfplumber's `top` is roughly the baseline minus the font's ascent
+        y = PAGE_HEIGHT - top - size * 0.75
+        escaped = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        font = 'F2' if bold else 'F1'
+        self.ops.append(f"BT /{font} {size} Tf 1 0 0 1 {x:.2f} {y:.2f} Tm ({escaped}) Tj ET")
+
+    def right(self, x1: float, top: float, text: str, size: float = BODY_SIZE, bold: bool = False):
+        self.text(x1 - text_width(text, size), top, text, size, bold)
+
+    def content(self) -> bytes:
+        return "\n".join(self.ops).encode('latin-1')
+
+
+def draw_page_header(canvas: PageCanvas, header: dict):
+    """The header block and column titles that start every table page"""
+    canvas.text(568.5, TOP_MARGIN, "From :", HEADER_SIZE)
+    canvas.text(616.5, TOP_MARGIN, header['date_from'], HEADER_SIZE)
+    canvas.text(568.5, TOP_MARGIN + 13, "To :", HEADER_SIZE)
+    canvas.text(616.5, TOP_MARGIN + 13, header['date_to'], HEADER_SIZE)
+    canvas.text(483.8, TOP_MARGIN + 26.5, "Reimbursement Batch :", HEADER_SIZE)
+    canvas.text(651.5, TOP_MARGIN + 26.5, header['reimbursement_batch'], HEADER_SIZE)
+    canvas.text(30.0, 90.2, "Customer Number:")
+    canvas.text(120.0, 90.2, header['customer_number'])
+    canvas.text(30.0, 102.2, "Business Location:")
+    canvas.text(120.0, 102.2, header['business_location_id'])
+    canvas.text(222.0, 102.2, header['business_location_name'])
+
+    canvas.text(120.7, 126.2, "Host")
+    canvas.text(298.6, 126.2, "No Of")
+    canvas.text(336.0, 126.2, "Transaction")
+    canvas.text(471.6, 127.4, "Transaction")
+    canvas.text(49.1, 132.2, "Terminal ID")
+    canvas.text(171.7, 132.2, "Ids")
+    canvas.text(226.0, 132.2, "Settle Date")
+    canvas.text(414.0, 132.4, "EWT")
+    canvas.text(587.2, 132.2, "Description")
+    canvas.text(113.5, 136.4, "Batch ID")
+    canvas.text(302.5, 136.4, "Txn")
+    canvas.text(331.4, 136.4, "Gross Amount")
+    canvas.text(471.5, 137.6, "Net Amount")
+
+
+def draw_row(canvas: PageCanvas, top: float, txn: dict, description: str):
+    settle_day, settle_time = txn['settle_date'].split(' ', 1)
+    values = {
+        'terminal_id': txn['terminal_id'],
+        'host_batch_id': txn['host_batch_id'],
+        'ids': txn['ids'],
+        'settle_day': settle_day,
+        'settle_time': settle_time,
+        'no_of_txn': str(txn['no_of_txn']),
+        'gross_amount': money(Decimal(str(txn['gross_amount']))),
+        'ewt': money(Decimal(str(txn['ewt']))),
+        'net_amount': money(Decimal(str(txn['net_amount']))),
+    }
+    for key, (align, x) in COLUMNS.items():
+        if align == 'left':
+            canvas.text(x, top, values[key])
+        else:
+            canvas.right(x, top, values[key])
+    canvas.text(DESCRIPTION_X, top - 0.2, description, DESCRIPTION_SIZE)
+
+
+def layout_pages(data: dict, lines_per_page: int, straddle: bool) -> list:
+    """
+    Lay the rows out on pages and return one PageCanvas per page
+
+    A row whose description wraps normally moves to the next page as a
+    whole; with straddle, its continuation lines may spill onto the next
+    page instead, the way some report renderers split long rows.
+    """
+    pages = []
+    canvas = None
+    line = lines_per_page
+
+    def new_page():
+        nonlocal canvas, line
+        canvas = PageCanvas()
+        draw_page_header(canvas, data['header'])
+        pages.append(canvas)
+        line = 0
+
+    def top_of(line_number):
+        return TABLE_TOP + line_number * LINE_HEIGHT
+
+    for txn in data['transactions']:
+        description_lines = wrap(txn['description'], DESCRIPTION_SIZE, DESCRIPTION_WIDTH)
+        needed = 1 if straddle else len(description_lines)
+        if line + needed > lines_per_page:
+            new_page()
+        draw_row(canvas, top_of(line), txn, description_lines[0])
+        line += 1
+        for continuation in description_lines[1:]:
+            if line >= lines_per_page:
+                new_page()
+            canvas.text(DESCRIPTION_X, top_of(line) - 0.2, continuation, DESCRIPTION_SIZE)
+            line += 1
+
+    if canvas is None or line >= lines_per_page:
+        new_page()
+    totals = data['totals']
+    top = top_of(line) + 0.3
+    canvas.text(247.2, top, "Total :")
+    for key in ('gross_amount', 'ewt', 'net_amount'):
+        canvas.right(COLUMNS[key][1], top + 0.5, money(Decimal(str(totals[key]))), 7.8, bold=True)
+
+    return pages
+
+
+def cover_page() -> PageCanvas:
+    """A remittance advice page with no table, like the ones banks prepend"""
+    canvas = PageCanvas()
+    canvas.text(72, 80, "PETRON CORPORATION", 14, bold=True)
+    canvas.text(72, 110, "Remittance Advice", 11)
+    canvas.text(72, 140, "Please find attached the merchant settlement report for the period.", 9)
+    canvas.text(72, 700, "This is a system-generated document and does not require a signature.", 7)
+    return canvas
+
+
+def write_pdf(pages: list) -> bytes:
+    """Serialize page canvases into a PDF with Helvetica and Helvetica-Bold"""
+    page_count = len(pages)
+    # Objects: 1 catalog, 2 pages, 3-4 fonts, then a page and its content per page
+    page_ids = [5 + 2 * i for i in range(page_count)]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {page_count} >>".encode(),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        4: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    }
+    for page_id, canvas in zip(page_ids, pages):
+        stream = zlib.compress(canvas.content())
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        ).encode()
+        objects[page_id + 1] = (
+            f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode() + stream + b"\nendstream"
+        )
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(output)
+        output += f"{number} 0 obj\n".encode() + objects[number] + b"\nendobj\n"
+    xref = len(output)
+    size = max(objects) + 1
+    output += f"xref\n0 {size}\n0000000000 65535 f \n".encode()
+    for number in range(1, size):
+        output += f"{offsets[number]:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(output)
+
+
+def render_pdf(data: dict, lines_per_page: int = 50, straddle: bool = False, cover: bool = False) -> bytes:
+    """Render a report dict as a Petron-layout PDF with a text layer"""
+    pages = layout_pages(data, lines_per_page, straddle)
+    if cover:
+        pages.insert(0, cover_page())
+    return write_pdf(pages)
+
+
+def generate(rows: int, terminals: int = 3, pages: int = None, lines_per_page: int = 50, days: int = 3,
+             long_descriptions: float = 0.0, straddle: bool = False, cover: bool = False, seed: int = 0) -> tuple:
+    """Ground truth and matching PDF bytes; `pages` overrides lines_per_page to spread rows evenly"""
+    data = generate_report_data(rows, terminals, days, seed, long_descriptions)
+    if pages:
+        # One extra line leaves room for the totals on the last page
+        lines_per_page = max(2, -(-(rows + 1) // pages))
+    return data, render_pdf(data, lines_per_page, straddle, cover)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic Petron settlement PDFs with ground truth")
+    parser.add_argument('--rows', type=int, default=1000, help="Transactions in the report")
+    parser.add_argument('--terminals', type=int, default=3)
+    parser.add_argument('--days', type=int, default=3, help="Days covered by the report")
+    parser.add_argument('--pages', type=int, help="Spread rows over this many pages")
+    parser.add_argument('--lines-per-page', type=int, default=50)
+    parser.add_argument('--long-descriptions', type=float, default=0.0,
+                        help="Share of rows with descriptions that wrap onto extra lines")
+    parser.add_argument('--straddle', action='store_true', help="Let wrapped rows continue on the next page")
+    parser.add_argument('--cover', action='store_true', help="Prepend a remittance advice page")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='synthetic_report', help="Output path without extension")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    data, pdf_bytes = generate(args.rows, args.terminals, args.pages, args.lines_per_page, args.days,
+                               args.long_descriptions, args.straddle, args.cover, args.seed)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.with_suffix('.pdf').write_bytes(pdf_bytes)
+    output.with_suffix('.json').write_text(json.dumps(data, indent=2))
+
+    print(f"✅ {len(data['transactions'])} rows, {len(pdf_bytes) / 1024:.0f} KB")
+    print(f"📄 {output.with_suffix('.pdf')}")
+    print(f"📋 {output.with_suffix('.json')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
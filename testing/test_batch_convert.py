@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test how the batch converter finds PDFs and names their outputs
+"""
+
+import sys
+import csv
+import json
+import asyncio
+import tempfile
+from io import StringIO
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import telegram_bot
+from fake_gemini import make_report, CannedModel
+from batch_convert import find_pdfs, output_paths, convert_file
+from telegram_bot import create_gemini_service
+
+
+def make_archive(root: Path, names: list):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'%PDF-1.4')
+
+
+def test_same_names_in_different_folders():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = Path(tmp) / "archive"
+        make_archive(archive, ["2025-01/report.pdf", "2025-02/report.pdf", "2025-02/other.pdf"])
+        pdfs = find_pdfs([str(archive / "2025-*" / "*.pdf")])
+        assert len(pdfs) == 3
+
+        out = Path(tmp) / "converted"
+        paths = output_paths(pdfs, out, 'xlsx')
+        assert sorted(path.relative_to(out).as_posix() for path in paths) == \
+            ["2025-01/report.xlsx", "2025-02/other.xlsx", "2025-02/report.xlsx"]
+
+        # A flat folder keeps the plain names
+        assert output_paths(find_pdfs([str(archive / "2025-02")]), out, 'csv') == \
+            [out / "other.csv", out / "report.csv"]
+
+
+def test_same_file_twice_is_converted_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = Path(tmp) / "archive"
+        make_archive(archive, ["report.pdf"])
+        assert len(find_pdfs([str(archive), str(archive / "report.pdf")])) == 1
+
+
+def test_colliding_outputs_are_refused():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        try:
+            output_paths([root / "report.pdf", root / "REPORT.pdf"], root / "out", 'xlsx')
+            assert False, "collision not detected"
+        except ValueError as e:
+            assert "would both be written" in str(e)
+
+
+def test_unreconciled_extraction_is_repaired():
+    truth = make_report(6)
+    data = make_report(6)
+    data['transactions'][2] = dict(data['transactions'][2], net_amount=1.0)
+
+    async def extract_report(file_bytes, mime_type):
+        return data, file_bytes
+
+    service = create_gemini_service('test-key', 'model-0', max_workers=1)
+    service.cascade[-1].model = CannedModel(json.dumps({'transactions': [truth['transactions'][2]]}))
+    saved = telegram_bot.gemini_service, telegram_bot.extract_report
+    telegram_bot.gemini_service, telegram_bot.extract_report = service, extract_report
+    try:
+        with tempfile.TemporaryDirectory() as tmp, ThreadPoolExecutor(1) as render_pool:
+            pdf_path, output_path = Path(tmp) / "report.pdf", Path(tmp) / "report.csv"
+            pdf_path.write_bytes(b'%PDF-1.4')
+            entry = asyncio.run(convert_file(pdf_path, output_path, asyncio.Semaphore(1), render_pool, 'csv'))
+            rows = list(csv.DictReader(StringIO(output_path.read_text())))
+    finally:
+        telegram_bot.gemini_service, telegram_bot.extract_report = saved
+        service.shutdown()
+
+    assert entry['status'] == 'converted'
+    assert [float(row['net_amount']) for row in rows] == [txn['net_amount'] for txn in truth['transactions']]
+
+
+if __name__ == "__main__":
+    print("🧪 Batch Convert Test")
+    print("=" * 80)
+    test_same_names_in_different_folders()
+    test_same_file_twice_is_converted_once()
+    test_colliding_outputs_are_refused()
+    test_unreconciled_extraction_is_repaired()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test consolidating several reports into one workbook
+"""
+
+import sys
+import json
+import asyncio
+import tempfile
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import telegram_bot
+from excel_report import ExcelService, summarize_reports
+from export_formats import get_writer
+from extraction_cache import ExtractionCache, content_hash
+from fake_telegram import FakeUpdate
+from telegram_bot import read_zip_pdfs
+
+TESTING_DIR = HERE
+SAMPLE_PATH = TESTING_DIR / "extracted_from_pdf.json"
+PDF_PATH = TESTING_DIR / "PFC Nov 3 2025 (1).pdf"
+
+
+def daily_reports():
+    """Split the sample report into one report per settle day"""
+    with open(SAMPLE_PATH) as f:
+        sample = json.load(f)
+
+    reports = []
+    for n, day in enumerate(['11/01/2025', '11/02/2025', '11/03/2025']):
+        transactions = [t for t in sample['transactions'] if t['settle_date'].startswith(day)]
+        header = dict(sample['header'], reimbursement_batch=str(5216 + n))
+        totals = {key: round(sum(t[key] for t in transactions), 2) for key in ('gross_amount', 'ewt', 'net_amount')}
+        reports.append({'header': header, 'transactions': transactions, 'totals': totals})
+    return sample, reports
+
+
+def test_summary_totals():
+    sample, reports = daily_reports()
+    summary = summarize_reports(reports)
+
+    assert list(summary['by_day']) == ['11/01/2025', '11/02/2025', '11/03/2025']
+    assert set(summary['by_terminal']) == {'20020788', '50035936'}
+    assert float(summary['total']['gross_amount']) == sample['totals']['gross_amount']
+    assert float(summary['total']['ewt']) == sample['totals']['ewt']
+    assert float(summary['total']['net_amount']) == sample['totals']['net_amount']
+    assert sum(t['no_of_txn'] for t in summary['by_terminal'].values()) == summary['total']['no_of_txn']
+
+
+def test_consolidated_workbook():
+    sample, reports = daily_reports()
+    wb = load_workbook(BytesIO(ExcelService.generate_consolidated(reports)))
+
+    assert wb.sheetnames == ['Summary', 'Batch 5216', 'Batch 5217', 'Batch 5218']
+    summary = wb['Summary']
+    totals = [row for row in summary.iter_rows(values_only=True) if row[0] == 'Total:']
+    assert len(totals) == 2
+    assert all(row[4] == sample['totals']['net_amount'] for row in totals)
+    assert wb['Batch 5217']['H5'].value == '5217'
+
+
+def test_writer_uses_the_given_summary():
+    # process_bundle has already summarized the reports; the workbook must not sum them again
+    _, reports = daily_reports()
+    summary = summarize_reports(reports)
+    summary['total'] = dict(summary['total'], net_amount=summary['total']['net_amount'] + 1)
+    wb = load_workbook(BytesIO(get_writer('xlsx').write(reports, summary)))
+
+    totals = [row for row in wb['Summary'].iter_rows(values_only=True) if row[0] == 'Total:']
+    assert all(row[4] == float(summary['total']['net_amount']) for row in totals)
+
+
+def test_streamed_consolidated_workbook_matches():
+    # Bundles above EXCEL_STREAMING_THRESHOLD rows are written with write-only sheets
+    _, reports = daily_reports()
+    summary = summarize_reports(reports)
+    regular = load_workbook(BytesIO(ExcelService.generate_consolidated(reports, summary, streaming=False)))
+    streamed = load_workbook(BytesIO(ExcelService.generate_consolidated(reports, summary, streaming=True)))
+
+    assert streamed.sheetnames == regular.sheetnames
+    for name in regular.sheetnames:
+        assert list(streamed[name].iter_rows(values_only=True)) == list(regular[name].iter_rows(values_only=True))
+        assert [c.style for row in streamed[name].iter_rows() for c in row if c.value is not None] == \
+            [c.style for row in regular[name].iter_rows() for c in row if c.value is not None]
+    assert streamed['Summary']['A1'].style == 'Report Title'
+    assert streamed['Batch 5217']['H5'].value == '5217'
+
+
+def test_read_zip_pdfs():
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.write(PDF_PATH, 'nov/b.pdf')
+        archive.write(PDF_PATH, 'a.pdf')
+        archive.writestr('__MACOSX/._a.pdf', b'')
+        archive.writestr('notes.txt', b'ignored')
+
+    files = read_zip_pdfs(buffer.getvalue())
+    assert [name for name, _ in files] == ['a.pdf', 'b.pdf']
+    assert files[0][1] == PDF_PATH.read_bytes()
+
+
+def test_bundle_uses_the_extraction_cache():
+    pdf_bytes = PDF_PATH.read_bytes()
+    extractions = []
+    extract_report = telegram_bot.extract_report
+
+    async def counting_extract_report(file_bytes, mime_type, *args, **kwargs):
+        extractions.append(file_bytes)
+        return await extract_report(file_bytes, mime_type, *args, **kwargs)
+
+    service = telegram_bot.GeminiService('test-key', max_workers=1)
+    saved = telegram_bot.gemini_service, telegram_bot.extraction_cache, telegram_bot.extract_report
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ExtractionCache(str(Path(tmp) / "cache.sqlite3"))
+        telegram_bot.gemini_service, telegram_bot.extraction_cache = service, cache
+        telegram_bot.extract_report = counting_extract_report
+        try:
+            for _ in range(2):
+                update = FakeUpdate()
+                asyncio.run(telegram_bot.process_bundle(update, [('a.pdf', pdf_bytes)], 'csv'))
+                assert update.message.documents[0][0].endswith('.csv')
+            # The second bundle is answered from the entry the first one cached
+            assert len(extractions) == 1
+            data, excel_bytes = cache.get(content_hash(pdf_bytes), service.cache_version)
+            assert data['header']['reimbursement_batch'] == '5216'
+            assert excel_bytes is None
+        finally:
+            telegram_bot.gemini_service, telegram_bot.extraction_cache, telegram_bot.extract_report = saved
+            service.shutdown()
+            cache.close()
+
+
+if __name__ == "__main__":
+    print("🧪 Consolidation Test")
+    print("=" * 80)
+    test_summary_totals()
+    test_consolidated_workbook()
+    test_writer_uses_the_given_summary()
+    test_streamed_consolidated_workbook_matches()
+    test_read_zip_pdfs()
+    test_bundle_uses_the_extraction_cache()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test the size-capped, single-copy document download
+Uses stand-ins for telegram Document and File objects
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import telegram_bot
+from telegram_bot import download_document, FileTooLarge, DownloadBuffer, MAX_FILE_BYTES
+from fake_telegram import FakeUpdate
+
+PDF_BYTES = b'%PDF-1.4\n' + b'0' * (2 * 1024 * 1024)
+
+
+class FakeFile:
+    def __init__(self, body: bytes, file_size=None):
+        self.body = body
+        self.file_size = file_size
+
+    async def download_to_memory(self, out):
+        # Like PTB: the whole body is written in one call
+        out.write(self.body)
+
+
+class FakeDocument:
+    def __init__(self, body: bytes, file_size=None, file_name='report.pdf', mime_type='application/pdf'):
+        self.body = body
+        self.file_size = file_size
+        self.file_name = file_name
+        self.mime_type = mime_type
+        self.file_unique_id = 'unique-1'
+        self.get_file_calls = 0
+
+    async def get_file(self):
+        self.get_file_calls += 1
+        return FakeFile(self.body, self.file_size)
+
+
+def test_download_keeps_one_copy():
+    document = FakeDocument(PDF_BYTES, file_size=len(PDF_BYTES))
+    file_bytes = asyncio.run(download_document(document))
+    assert file_bytes is PDF_BYTES
+
+
+def test_oversized_file_rejected_before_download():
+    document = FakeDocument(PDF_BYTES, file_size=MAX_FILE_BYTES + 1)
+    try:
+        asyncio.run(download_document(document))
+        rejected = False
+    except FileTooLarge:
+        rejected = True
+    assert rejected
+    assert document.get_file_calls == 0
+
+
+def test_cap_enforced_without_announced_size():
+    buffer = DownloadBuffer(max_bytes=1024)
+    buffer.write(b'x' * 1000)
+    try:
+        buffer.write(b'x' * 100)
+        rejected = False
+    except FileTooLarge:
+        rejected = True
+    assert rejected
+
+
+def test_handler_refuses_oversized_document():
+    document = FakeDocument(b'', file_size=MAX_FILE_BYTES * 2)
+    update = FakeUpdate(document)
+    queued = []
+
+    async def enqueue_job(update, job_factory):
+        queued.append(job_factory)
+
+    original = telegram_bot.enqueue_job
+    telegram_bot.enqueue_job = enqueue_job
+    try:
+        asyncio.run(telegram_bot.handle_document(update, None))
+    finally:
+        telegram_bot.enqueue_job = original
+
+    assert queued == []
+    assert document.get_file_calls == 0
+    assert "File too large" in update.message.replies[0]
+
+
+if __name__ == "__main__":
+    print("🧪 Document Download Test")
+    print("=" * 80)
+    test_download_keeps_one_copy()
+    test_oversized_file_rejected_before_download()
+    test_cap_enforced_without_announced_size()
+    test_handler_refuses_oversized_document()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test streaming (write-only) Excel generation against the standard layout
+"""
+
+import sys
+import json
+from io import BytesIO
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from excel_report import ExcelService
+
+SAMPLE_PATH = Path(__file__).resolve().parent / "extracted_from_pdf.json"
+
+
+def load_sample():
+    with open(SAMPLE_PATH) as f:
+        return json.load(f)
+
+
+def cell_signature(cell):
+    return (
+        cell.value, cell.number_format,
+        cell.font.name, cell.font.sz, cell.font.b,
+        cell.border.left.style, cell.border.bottom.style,
+        cell.fill.fill_type, cell.fill.fgColor.rgb,
+        cell.alignment.horizontal, cell.alignment.vertical, cell.alignment.wrap_text,
+    )
+
+
+def test_streaming_matches_standard_layout():
+    data = load_sample()
+    standard = load_workbook(BytesIO(ExcelService.generate_report(data, streaming=False))).active
+    streamed = load_workbook(BytesIO(ExcelService.generate_report(data, streaming=True))).active
+
+    assert streamed.title == standard.title
+    assert streamed.max_row == standard.max_row
+    assert [str(r) for r in streamed.merged_cells.ranges] == ['A1:I1']
+    assert streamed.row_dimensions[7].height == 30
+    assert streamed.column_dimensions['I'].width == standard.column_dimensions['I'].width
+    for row in range(1, standard.max_row + 1):
+        for col in range(1, 10):
+            assert cell_signature(streamed.cell(row, col)) == cell_signature(standard.cell(row, col))
+
+
+def test_splits_across_sheets_at_row_limit():
+    data = load_sample()
+    # 7 header rows + 1 reserved totals row leaves 4 transactions per sheet
+    wb = load_workbook(BytesIO(ExcelService.generate_report_streaming(data, max_rows_per_sheet=12)))
+
+    assert wb.sheetnames == ["Settlement Report"] + [f"Settlement Report ({n})" for n in range(2, 6)]
+    ids = [row[2] for ws in wb for row in ws.iter_rows(min_row=8, values_only=True) if row[2]]
+    assert ids == [txn['ids'] for txn in data['transactions']]
+
+    last = wb.worksheets[-1]
+    assert last.cell(last.max_row, 5).value == "Total:"
+    assert last.cell(last.max_row, 8).value == data['totals']['net_amount']
+    assert all(ws.max_row <= 12 for ws in wb)
+
+
+if __name__ == "__main__":
+    print("🧪 Streaming Excel Generation Test")
+    print("=" * 80)
+    test_streaming_matches_standard_layout()
+    test_splits_across_sheets_at_row_limit()
+    print("✅ Test completed successfully!")
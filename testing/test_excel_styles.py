@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test the named style registry of the report workbooks
+"""
+
+import sys
+import json
+from io import BytesIO
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from excel_report import ExcelService, report_styles
+
+SAMPLE_PATH = Path(__file__).resolve().parent / "extracted_from_pdf.json"
+
+
+def load_sample():
+    with open(SAMPLE_PATH) as f:
+        return json.load(f)
+
+
+def test_cells_use_named_styles():
+    data = load_sample()
+    ws = load_workbook(BytesIO(ExcelService.generate_report(data, streaming=False))).active
+
+    assert set(report_styles()) <= set(ws.parent.named_styles)
+    assert ws['A1'].style == 'Report Title'
+    assert ws['G5'].style == 'Report Label'
+    assert ws['A7'].style == 'Report Table Header'
+    assert ws['A8'].style == 'Report Cell'
+    assert ws['E8'].style == 'Report Count'
+    assert ws['F8'].style == 'Report Amount'
+    totals_row = 8 + len(data['transactions'])
+    assert ws.cell(totals_row, 8).style == 'Report Total'
+    assert ws.cell(totals_row, 8).number_format == '#,##0.00'
+
+
+def test_reports_do_not_share_cells():
+    data = load_sample()
+    small = dict(data, transactions=data['transactions'][:2])
+    small['header'] = dict(data['header'], reimbursement_batch='9999')
+
+    ExcelService.generate_report(data, streaming=False)
+    ws = load_workbook(BytesIO(ExcelService.generate_report(small, streaming=False))).active
+
+    assert ws['H5'].value == '9999'
+    assert ws.max_row == 8 + 2
+    assert ws.cell(10, 5).value == "Total:"
+    assert ws.cell(10, 5).style == 'Report Label'
+
+
+def test_consolidated_workbook_registers_styles_once():
+    data = load_sample()
+    second = dict(data, header=dict(data['header'], reimbursement_batch='5217'))
+    wb = load_workbook(BytesIO(ExcelService.generate_consolidated([data, second])))
+
+    assert wb.named_styles.count('Report Cell') == 1
+    assert wb['Summary']['A1'].style == 'Report Title'
+    assert wb['Batch 5217']['F8'].style == 'Report Amount'
+
+
+if __name__ == "__main__":
+    print("🧪 Excel Style Registry Test")
+    print("=" * 80)
+    test_cells_use_named_styles()
+    test_reports_do_not_share_cells()
+    test_consolidated_workbook_registers_styles_once()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test the CSV, JSON Lines and Parquet output formats and format selection
+"""
+
+import sys
+import csv
+import json
+import asyncio
+import tempfile
+import subprocess
+from io import BytesIO, StringIO
+from decimal import Decimal
+from datetime import datetime
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import telegram_bot
+from fake_gemini import make_report, CannedModel
+from fake_telegram import FakeUpdate, FakeContext
+from export_formats import COLUMNS, WRITERS, get_writer, normalize_format, typed_rows, parse_settle_date
+from extraction_cache import ExtractionCache, content_hash
+
+
+def sample_report() -> dict:
+    data = make_report(3)
+    data['transactions'][0]['settle_date'] = '11/01/2025 1:58PM'
+    data['transactions'][0]['gross_amount'] = '1,234.50'
+    data['transactions'][1]['settle_date'] = '11/02/2025'
+    data['transactions'][2]['no_of_txn'] = None
+    return data
+
+
+def test_typed_rows():
+    rows = list(typed_rows([sample_report()]))
+    assert len(rows) == 3
+    assert all(len(row) == len(COLUMNS) for row in rows)
+    first = dict(zip([name for name, _ in COLUMNS], rows[0]))
+    assert first['reimbursement_batch'] == '5216'
+    assert first['settle_date'] == datetime(2025, 11, 1, 13, 58)
+    assert first['gross_amount'] == Decimal('1234.50')
+    assert isinstance(first['no_of_txn'], int)
+    assert rows[1][6] == datetime(2025, 11, 2)
+    assert rows[2][7] is None
+
+
+def test_settle_date_formats():
+    assert parse_settle_date('11/01/2025 8:32 AM') == datetime(2025, 11, 1, 8, 32)
+    assert parse_settle_date('not a date') is None
+    assert parse_settle_date('') is None
+
+
+def test_csv():
+    text = get_writer('csv').write([sample_report()]).decode('utf-8')
+    rows = list(csv.DictReader(StringIO(text)))
+    assert len(rows) == 3
+    assert rows[0]['settle_date'] == '2025-11-01 13:58:00'
+    assert rows[0]['gross_amount'] == '1234.50'
+    assert rows[2]['no_of_txn'] == ''
+
+
+def test_ndjson():
+    lines = get_writer('jsonl').write([sample_report(), make_report(2)]).decode('utf-8').splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == 5
+    assert records[0]['gross_amount'] == 1234.5
+    assert records[0]['settle_date'] == '2025-11-01T13:58:00'
+    assert records[2]['no_of_txn'] is None
+
+
+def test_parquet():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        # pyarrow is optional; without it the writer explains how to add it
+        try:
+            get_writer('parquet').write([sample_report()])
+            assert False, "parquet written without pyarrow"
+        except RuntimeError as e:
+            assert 'pip install' in str(e)
+        return
+
+    table = pq.read_table(BytesIO(get_writer('parquet').write([sample_report()])))
+    assert table.num_rows == 3
+    assert table.schema.field('gross_amount').type == pa.decimal128(14, 2)
+    assert table.schema.field('no_of_txn').type == pa.int32()
+    assert table.column('gross_amount')[0].as_py() == Decimal('1234.50')
+    assert table.column('settle_date')[0].as_py() == datetime(2025, 11, 1, 13, 58)
+
+    empty = pq.read_table(BytesIO(get_writer('parquet').write([make_report(0)])))
+    assert empty.num_rows == 0
+
+
+def test_xlsx_without_the_bot():
+    # The workbook writer must not need the Telegram bot or its settings
+    script = (
+        "import sys, export_formats; "
+        "export_formats.get_writer('xlsx').write([{'header': %r, 'transactions': [], 'totals': %r}]); "
+        "assert 'telegram_bot' not in sys.modules"
+    ) % (make_report(0)['header'], make_report(0)['totals'])
+    subprocess.run([sys.executable, '-c', script], cwd=HERE.parent, check=True)
+
+
+def test_format_names():
+    assert set(WRITERS) == {'xlsx', 'csv', 'ndjson', 'parquet'}
+    assert normalize_format('#CSV') == 'csv'
+    assert normalize_format('excel') == 'xlsx'
+    assert normalize_format('pdf') is None
+    assert get_writer('parquet').filename([make_report(1)]) == 'settlement_report_5216.parquet'
+    try:
+        get_writer('pdf')
+        rejected = False
+    except ValueError:
+        rejected = True
+    assert rejected
+
+
+def test_caption_flag():
+    assert telegram_bot.caption_format("November #parquet please") == 'parquet'
+    assert telegram_bot.caption_format("#urgent #jsonl") == 'ndjson'
+    assert telegram_bot.caption_format("no flag") is None
+    assert telegram_bot.caption_format(None) is None
+
+
+def test_format_command():
+    update, context = FakeUpdate(), FakeContext('Parquet')
+    asyncio.run(telegram_bot.format_command(update, context))
+    assert context.user_data['output_format'] == 'parquet'
+
+    context.args = ['pdf']
+    asyncio.run(telegram_bot.format_command(update, context))
+    assert context.user_data['output_format'] == 'parquet'
+    assert 'Unknown format' in update.message.replies[-1]
+
+
+def test_workbook_only_for_xlsx_requests():
+    image = b'settlement report photo'
+    service = telegram_bot.GeminiService('test-key', max_workers=1)
+    service.model = CannedModel(json.dumps(make_report(5)))
+    saved = telegram_bot.gemini_service, telegram_bot.extraction_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ExtractionCache(str(Path(tmp) / "cache.sqlite3"))
+        telegram_bot.gemini_service, telegram_bot.extraction_cache = service, cache
+        try:
+            # A CSV request caches the extraction without generating a workbook
+            update = FakeUpdate()
+            asyncio.run(telegram_bot.process_file(update, image, 'image/png', output_format='csv'))
+            assert update.message.documents[0][0] == 'settlement_report_5216.csv'
+            assert cache.get(content_hash(image), service.cache_version)[1] is None
+
+            # The first XLSX request for it generates the workbook and caches it
+            update = FakeUpdate()
+            asyncio.run(telegram_bot.process_file(update, image, 'image/png', output_format='xlsx'))
+            filename, excel_bytes, _ = update.message.documents[0]
+            assert filename == 'settlement_report_5216.xlsx'
+            assert cache.get(content_hash(image), service.cache_version)[1] == excel_bytes
+            assert service.model.calls == 1
+        finally:
+            telegram_bot.gemini_service, telegram_bot.extraction_cache = saved
+            service.shutdown()
+            cache.close()
+
+
+if __name__ == "__main__":
+    print("🧪 Output Format Test")
+    print("=" * 80)
+    test_typed_rows()
+    test_settle_date_formats()
+    test_csv()
+    test_ndjson()
+    test_parquet()
+    test_xlsx_without_the_bot()
+    test_format_names()
+    test_caption_flag()
+    test_format_command()
+    test_workbook_only_for_xlsx_requests()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the extraction cache (in-memory LRU + SQLite store)
+"""
+
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from extraction_cache import ExtractionCache, content_hash
+
+SAMPLE_PATH = Path(__file__).resolve().parent / "extracted_from_pdf.json"
+VERSION = "v1"
+
+
+def load_sample():
+    with open(SAMPLE_PATH) as f:
+        return json.load(f)
+
+
+def test_roundtrip_and_file_id_lookup():
+    data = load_sample()
+    file_hash = content_hash(b"%PDF-1.4 report")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "cache.sqlite3")
+        cache = ExtractionCache(db_path)
+        assert cache.get(file_hash, VERSION) is None
+
+        cache.put(file_hash, VERSION, data, b"xlsx-bytes", file_unique_id="AgADx")
+        assert cache.get(file_hash, VERSION) == (data, b"xlsx-bytes")
+        assert cache.get_by_file_id("AgADx", VERSION) == (data, b"xlsx-bytes")
+
+        # A different prompt/model version is a miss
+        assert cache.get(file_hash, "v2") is None
+        cache.close()
+
+        # Entries survive a restart through the on-disk store
+        reopened = ExtractionCache(db_path)
+        assert reopened.get_by_file_id("AgADx", VERSION) == (data, b"xlsx-bytes")
+        reopened.close()
+
+
+def test_size_and_ttl_eviction():
+    data = load_sample()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ExtractionCache(str(Path(tmp) / "cache.sqlite3"), memory_entries=1, max_entries=2)
+        hashes = [content_hash(bytes([i])) for i in range(3)]
+        for h in hashes:
+            cache.put(h, VERSION, data, b"x")
+            time.sleep(0.01)
+
+        assert cache.get(hashes[0], VERSION) is None
+        assert cache.get(hashes[1], VERSION) is not None
+        assert cache.get(hashes[2], VERSION) is not None
+
+        cache.ttl_seconds = 0
+        time.sleep(0.01)
+        assert cache.get(hashes[2], VERSION) is None
+        cache.close()
+
+
+if __name__ == "__main__":
+    print("🧪 Extraction Cache Test")
+    print("=" * 80)
+    test_roundtrip_and_file_id_lookup()
+    test_size_and_ttl_eviction()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test that Gemini extraction does not block the event loop
+Uses a slow fake model in place of the real Gemini API
+"""
+
+import sys
+import json
+import time
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from telegram_bot import GeminiService
+
+MODEL_LATENCY = 0.5
+CONCURRENT_REQUESTS = 8
+
+SAMPLE_JSON = json.dumps({
+    "header": {"reimbursement_batch": "5216"},
+    "transactions": [{"terminal_id": "20020788"}],
+    "totals": {"gross_amount": 0.0, "ewt": 0.0, "net_amount": 0.0},
+})
+
+
+class SlowResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class SlowModel:
+    """Stand-in for GenerativeModel with a blocking, slow generate_content"""
+
+    def generate_content(self, contents):
+        time.sleep(MODEL_LATENCY)
+        return SlowResponse(f"```json\n{SAMPLE_JSON}\n```")
+
+
+def make_service(max_workers):
+    service = GeminiService('test-key', max_workers=max_workers)
+    service.model = SlowModel()
+    return service
+
+
+def test_concurrent_extractions_overlap():
+    """N concurrent extractions should finish in about the time of one"""
+    service = make_service(CONCURRENT_REQUESTS)
+
+    async def run():
+        started = time.perf_counter()
+        results = await asyncio.gather(*[
+            service.extract_from_bytes(b'%PDF-1.4', 'application/pdf')
+            for _ in range(CONCURRENT_REQUESTS)
+        ])
+        return results, time.perf_counter() - started
+
+    try:
+        results, elapsed = asyncio.run(run())
+    finally:
+        service.shutdown()
+
+    print(f"   {CONCURRENT_REQUESTS} extractions in {elapsed:.2f}s (one takes {MODEL_LATENCY}s)")
+    assert len(results) == CONCURRENT_REQUESTS
+    assert all(r['header']['reimbursement_batch'] == '5216' for r in results)
+    assert elapsed < MODEL_LATENCY * 2
+
+
+def test_event_loop_stays_responsive():
+    """Other coroutines keep running while an extraction is in flight"""
+    service = make_service(1)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await service.extract_from_bytes(b'%PDF-1.4', 'application/pdf')
+        task.cancel()
+        return ticks
+
+    try:
+        ticks = asyncio.run(run())
+    finally:
+        service.shutdown()
+
+    print(f"   Event loop ticked {ticks} times during one extraction")
+    assert ticks >= (MODEL_LATENCY / 0.01) * 0.5
+
+
+if __name__ == "__main__":
+    print("🧪 Gemini Concurrency Test")
+    print("=" * 80)
+    test_concurrent_extractions_overlap()
+    test_event_loop_stays_responsive()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test /summary and /terminal: period parsing, incremental rollups and replies
+"""
+
+import sys
+import asyncio
+import tempfile
+from io import BytesIO
+from datetime import date
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import telegram_bot
+from synthetic_report import generate_report_data
+from report_model import SettlementReport, summarize
+from transaction_store import TransactionStore
+from telegram_bot import parse_period
+from fake_telegram import FakeUpdate, FakeContext
+
+TODAY = date(2025, 12, 10)
+
+
+def make_reports():
+    november = generate_report_data(80, terminals=4, days=5, start=date(2025, 11, 3), batch='5216')
+    december = generate_report_data(60, terminals=4, days=3, start=date(2025, 12, 1), batch='5217', seed=1)
+    # Both batches settle through the same terminals
+    terminals = sorted({txn['terminal_id'] for txn in november['transactions']})
+    own = sorted({txn['terminal_id'] for txn in december['transactions']})
+    for txn in december['transactions']:
+        txn['terminal_id'] = terminals[own.index(txn['terminal_id'])]
+    return november, december
+
+
+def test_parse_period():
+    assert parse_period([], TODAY) == (None, None, "All time")
+    assert parse_period(['November'], TODAY) == (date(2025, 11, 1), date(2025, 12, 1), "November 2025")
+    # A month that has not started yet this year means last year's
+    assert parse_period(['dec'], date(2025, 6, 1))[:2] == (date(2024, 12, 1), date(2025, 1, 1))
+    assert parse_period(['this', 'quarter'], TODAY) == (date(2025, 10, 1), date(2026, 1, 1), "Q4 2025")
+    assert parse_period(['last', 'quarter'], date(2025, 2, 1))[2] == "Q4 2024"
+    assert parse_period(['Q3', '2024'], TODAY)[:2] == (date(2024, 7, 1), date(2024, 10, 1))
+    assert parse_period(['2025-11'], TODAY)[:2] == (date(2025, 11, 1), date(2025, 12, 1))
+    assert parse_period(['11/01/2025..11/15/2025'], TODAY)[:2] == (date(2025, 11, 1), date(2025, 11, 16))
+    for bad in (['someday'], ['13/2025'], ['11/15/2025..11/01/2025']):
+        try:
+            parse_period(bad, TODAY)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+def test_rollups_follow_every_import():
+    november, december = make_reports()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TransactionStore(str(Path(tmp) / "transactions.sqlite3"))
+        store.save_report(november)
+        store.save_report(december)
+        # Re-imports and a corrected batch keep the rollups equal to the rows
+        store.save_report(december)
+        corrected = dict(november, transactions=november['transactions'][:70])
+        corrected['totals'] = SettlementReport.from_dict(corrected).row_totals()
+        store.save_report(corrected)
+
+        expected = summarize([SettlementReport.from_dict(corrected), SettlementReport.from_dict(december)])
+        assert store.summary() == expected
+
+        in_november = store.summary(since=date(2025, 11, 1), until=date(2025, 12, 1))
+        assert in_november == summarize([SettlementReport.from_dict(corrected)])
+
+        terminal = november['transactions'][0]['terminal_id']
+        assert list(store.summary(terminal_id=terminal)['by_terminal']) == [terminal]
+        store.close()
+
+
+def run_command(command, *args, user_id=1):
+    update = FakeUpdate(user_id=user_id)
+    asyncio.run(command(update, FakeContext(*args)))
+    return update.message
+
+
+def test_commands():
+    november, december = make_reports()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TransactionStore(str(Path(tmp) / "transactions.sqlite3"))
+        store.save_reports([november, december], owner=1)
+        original = telegram_bot.transaction_store
+        telegram_bot.transaction_store = store
+        try:
+            message = run_command(telegram_bot.summary_command, '2025-11')
+            net = SettlementReport.from_dict(november).row_totals()['net_amount']
+            assert "November 2025" in message.replies[0]
+            assert f"₱{net:,.2f}" in message.replies[0]
+
+            terminal = november['transactions'][0]['terminal_id']
+            message = run_command(telegram_bot.terminal_command, terminal, 'Q4', '2025', 'excel')
+            filename, excel_bytes, caption = message.documents[0]
+            assert filename == f"summary_{terminal}_q4_2025.xlsx"
+            assert f"Terminal {terminal}" in caption
+            ws = load_workbook(BytesIO(excel_bytes)).active
+            assert ws['B4'].value == terminal
+            assert ws['A6'].value == "Terminal ID" and ws['A7'].value == terminal
+
+            assert "No stored transactions" in run_command(telegram_bot.summary_command, '2024').replies[0]
+            assert "Unknown period" in run_command(telegram_bot.summary_command, 'soon').replies[0]
+            assert "Usage" in run_command(telegram_bot.terminal_command).replies[0]
+        finally:
+            telegram_bot.transaction_store = original
+            store.close()
+
+
+def test_users_only_see_their_own_locations():
+    november, december = make_reports()
+    december['header'] = dict(december['header'], business_location_id='0099', business_location_name='Other')
+    user_a, user_b, admin = 1001, 1002, 1003
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TransactionStore(str(Path(tmp) / "transactions.sqlite3"))
+        store.save_report(november, owner=user_a)
+        store.save_report(december, owner=user_b)
+        original = telegram_bot.transaction_store, telegram_bot.ADMIN_USER_IDS
+        telegram_bot.transaction_store, telegram_bot.ADMIN_USER_IDS = store, {admin}
+        try:
+            net_a = f"₱{SettlementReport.from_dict(november).row_totals()['net_amount']:,.2f}"
+            net_b = f"₱{SettlementReport.from_dict(december).row_totals()['net_amount']:,.2f}"
+            assert net_a in run_command(telegram_bot.summary_command, user_id=user_a).replies[0]
+
+            reply = run_command(telegram_bot.summary_command, user_id=user_b).replies[0]
+            assert net_b in reply and net_a not in reply
+            assert "No stored transactions" in run_command(telegram_bot.summary_command, '2025-11', user_id=user_b).replies[0]
+
+            # The terminals are shared, but only B's own location counts for B
+            terminal = november['transactions'][0]['terminal_id']
+            assert "No stored transactions" in \
+                run_command(telegram_bot.terminal_command, terminal, 'November', user_id=user_b).replies[0]
+            assert "No stored transactions" in run_command(telegram_bot.summary_command, user_id=4242).replies[0]
+
+            # A user who sends a report again (e.g. answered from the cache) can see it too
+            store.add_owner(user_b, [november])
+            assert net_a in run_command(telegram_bot.summary_command, '2025-11', user_id=user_b).replies[0]
+
+            both = SettlementReport.from_dict(november).row_totals()['net_amount'] + \
+                SettlementReport.from_dict(december).row_totals()['net_amount']
+            assert f"₱{both:,.2f}" in run_command(telegram_bot.summary_command, user_id=admin).replies[0]
+        finally:
+            telegram_bot.transaction_store, telegram_bot.ADMIN_USER_IDS = original
+            store.close()
+
+
+if __name__ == "__main__":
+    print("🧪 History Query Test")
+    print("=" * 80)
+    test_parse_period()
+    test_rollups_follow_every_import()
+    test_commands()
+    test_users_only_see_their_own_locations()
+    print("✅ Test completed successfully!")
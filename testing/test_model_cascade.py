@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test the model cascade: cheapest model first, escalation when rows or totals do not add up
+"""
+
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+from fake_gemini import make_report, CannedModel
+from json_stream import ReportStreamParser
+from metrics import CASCADE_RESULTS, MODEL_TOKENS
+from telegram_bot import GeminiService, create_gemini_service, extraction_problems, page_problems
+
+
+def unbalanced_report() -> dict:
+    data = make_report(8)
+    data['transactions'][2] = dict(data['transactions'][2], net_amount=1.0)
+    return data
+
+
+def make_cascade(*answers) -> GeminiService:
+    service = create_gemini_service('test-key', ','.join(f"model-{n}" for n in range(len(answers))),
+                                    max_workers=1)
+    for tier, answer in zip(service.cascade, answers):
+        tier.model = CannedModel(answer if isinstance(answer, str) else json.dumps(answer))
+    return service
+
+
+def outcome(model: str, result: str) -> float:
+    return CASCADE_RESULTS.labels(model, result)._value.get()
+
+
+def extract(service, **kwargs) -> dict:
+    try:
+        return asyncio.run(service.extract_from_bytes(b'%PDF-1.4', 'application/pdf', **kwargs))
+    finally:
+        service.shutdown()
+
+
+def test_create_gemini_service_chains_models():
+    service = create_gemini_service('test-key', 'lite, flash ,pro', max_workers=1)
+    try:
+        assert [tier.model_name for tier in service.cascade] == ['lite', 'flash', 'pro']
+        assert service.cascade[-1].escalate_to is None
+    finally:
+        service.shutdown()
+
+    # A single model keeps the cache version it had before the cascade
+    single = GeminiService('test-key', max_workers=1)
+    cascade = create_gemini_service('test-key', 'gemini-2.5-flash,gemini-2.5-pro', max_workers=1)
+    try:
+        assert single.cache_version == create_gemini_service('test-key', 'gemini-2.5-flash').cache_version
+        assert single.cache_version != cascade.cache_version
+    finally:
+        single.shutdown()
+        cascade.shutdown()
+
+
+def test_clean_answer_stays_on_the_cheapest_model():
+    good = make_report(8)
+    service = make_cascade(good, good)
+    cheap, strong = service.cascade
+    accepted = outcome('model-0', 'accepted')
+    output_tokens = MODEL_TOKENS.labels('model-0', 'output')._value.get()
+
+    assert extract(service, validate=extraction_problems) == good
+    assert (cheap.model.calls, strong.model.calls) == (1, 0)
+    assert outcome('model-0', 'accepted') == accepted + 1
+    assert MODEL_TOKENS.labels('model-0', 'output')._value.get() == output_tokens + 200
+
+
+def test_failed_validation_escalates():
+    good = make_report(8)
+    service = make_cascade(unbalanced_report(), "not json", good)
+    escalated = outcome('model-0', 'escalated')
+
+    assert extract(service, validate=extraction_problems) == good
+    assert [tier.model.calls for tier in service.cascade] == [1, 1, 1]
+    assert outcome('model-0', 'escalated') == escalated + 1
+    assert outcome('model-1', 'escalated') >= 1
+
+
+def test_last_model_answer_is_kept():
+    bad = unbalanced_report()
+    service = make_cascade(bad, bad)
+    rejected = outcome('model-1', 'rejected')
+    assert extract(service, validate=extraction_problems) == bad
+    assert outcome('model-1', 'rejected') == rejected + 1
+
+    # Without validation (e.g. focused repair prompts) there is no escalation
+    service = make_cascade(bad, bad)
+    assert extract(service) == bad
+    assert service.cascade[1].model.calls == 0
+
+
+def test_streamed_answer_is_marked_discarded():
+    good = make_report(8)
+    service = make_cascade(unbalanced_report(), good)
+    rows = []
+    parser = ReportStreamParser(on_transaction=rows.append)
+
+    assert extract(service, parser=parser, validate=extraction_problems) == good
+    assert parser.discarded
+    assert len(rows) == 8
+
+
+def test_page_check_ignores_totals():
+    data = make_report(8)
+    data['totals'] = {'gross_amount': 0, 'ewt': 0, 'net_amount': 0}
+    assert page_problems(data) == ''
+    assert extraction_problems(data) != ''
+    assert page_problems(unbalanced_report()) == "gross - EWT ≠ net on 1 row(s)"
+
+
+if __name__ == "__main__":
+    print("🧪 Model Cascade Test")
+    print("=" * 80)
+    test_create_gemini_service_chains_models()
+    test_clean_answer_stays_on_the_cheapest_model()
+    test_failed_validation_escalates()
+    test_last_model_answer_is_kept()
+    test_streamed_answer_is_marked_discarded()
+    test_page_check_ignores_totals()
+    print("✅ Test completed successfully!")
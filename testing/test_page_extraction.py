@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test parallel per-page extraction and merging of multi-page reports
+Uses a slow fake model that answers based on which pages it receives
+"""
+
+import sys
+import json
+import time
+import asyncio
+from io import BytesIO
+from pathlib import Path
+
+from pypdf import PdfReader, PdfWriter
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import telegram_bot
+from telegram_bot import GeminiService, merge_page_results
+from fake_gemini import FakeResponse
+
+MODEL_LATENCY = 0.3
+TOTAL_PAGES = 6
+
+
+def make_txn(n):
+    return {
+        "terminal_id": "50035936",
+        "host_batch_id": str(28900000 + n),
+        "ids": str(13400000 + n),
+        "settle_date": "11/01/2025 12:00AM",
+        "no_of_txn": 1,
+        "gross_amount": 100.0,
+        "ewt": 1.0,
+        "net_amount": 99.0,
+        "description": "Default Fleet Transaction (Prod Level)",
+    }
+
+
+def make_blank_pdf(pages):
+    """Blank PDF whose page widths encode the page number (601, 602, ...)"""
+    writer = PdfWriter()
+    for number in range(1, pages + 1):
+        writer.add_blank_page(width=600 + number, height=800)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+class PageAwareModel:
+    """Returns two rows per page; the last row of each page straddles into the next"""
+
+    def generate_content(self, contents):
+        time.sleep(MODEL_LATENCY)
+        reader = PdfReader(BytesIO(contents[1]['data']))
+        first_page = int(reader.pages[0].mediabox.width) - 600
+        last_page = first_page + len(reader.pages) - 1
+
+        transactions = []
+        for page in range(first_page, last_page + 1):
+            if page > 1:
+                transactions.append(make_txn(page * 2 - 1))
+            transactions.append(make_txn(page * 2))
+            transactions.append(make_txn(page * 2 + 1))
+
+        data = {
+            "header": {"reimbursement_batch": "5216" if first_page == 1 else ""},
+            "transactions": transactions,
+            "totals": {"gross_amount": 0, "ewt": 0, "net_amount": 0},
+        }
+        if last_page == TOTAL_PAGES:
+            data["totals"] = {"gross_amount": 1300.0, "ewt": 13.0, "net_amount": 1287.0}
+        return FakeResponse(json.dumps(data))
+
+
+def test_merge_drops_straddling_duplicates():
+    page1 = {"header": {"reimbursement_batch": "5216"}, "transactions": [make_txn(1), make_txn(2)],
+             "totals": {"gross_amount": 0, "ewt": 0, "net_amount": 0}}
+    cut_row = dict(make_txn(2), description="")
+    page2 = {"header": {"reimbursement_batch": ""}, "transactions": [cut_row, make_txn(3)],
+             "totals": {"gross_amount": 300.0, "ewt": 3.0, "net_amount": 297.0}}
+
+    merged = merge_page_results([page1, page2])
+    assert merged["header"]["reimbursement_batch"] == "5216"
+    assert [t["ids"] for t in merged["transactions"]] == [make_txn(n)["ids"] for n in (1, 2, 3)]
+    assert merged["transactions"][1]["description"] == "Default Fleet Transaction (Prod Level)"
+    assert merged["totals"]["net_amount"] == 297.0
+
+
+def test_pages_extracted_concurrently_in_order():
+    service = GeminiService('test-key', max_workers=TOTAL_PAGES)
+    service.model = PageAwareModel()
+    telegram_bot.gemini_service = service
+    original_chunk = telegram_bot.PAGES_PER_CHUNK
+    telegram_bot.PAGES_PER_CHUNK = 1
+
+    try:
+        started = time.perf_counter()
+        data, _ = asyncio.run(telegram_bot.extract_report(make_blank_pdf(TOTAL_PAGES), 'application/pdf'))
+        elapsed = time.perf_counter() - started
+    finally:
+        telegram_bot.PAGES_PER_CHUNK = original_chunk
+        telegram_bot.gemini_service = None
+        service.shutdown()
+
+    print(f"   {TOTAL_PAGES} pages extracted in {elapsed:.2f}s (one page takes {MODEL_LATENCY}s)")
+    expected_ids = [make_txn(n)["ids"] for n in range(2, TOTAL_PAGES * 2 + 2)]
+    assert [t["ids"] for t in data["transactions"]] == expected_ids
+    assert data["header"]["reimbursement_batch"] == "5216"
+    assert data["totals"]["net_amount"] == 1287.0
+    assert elapsed < MODEL_LATENCY * 3
+
+
+if __name__ == "__main__":
+    print("🧪 Page Extraction Test")
+    print("=" * 80)
+    test_merge_drops_straddling_duplicates()
+    test_pages_extracted_concurrently_in_order()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test that page pruning keeps only the settlement table pages
+"""
+
+import sys
+from io import BytesIO
+from pathlib import Path
+
+from pypdf import PdfReader, PdfWriter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pdf_pages import prune_pages, count_pages
+
+SAMPLE_PDF = Path(__file__).resolve().parent / "PFC Nov 3 2025 (1).pdf"
+
+
+def make_text_pdf(lines):
+    """Minimal one-page PDF showing the given lines in Helvetica"""
+    text = " ".join(f"({line}) Tj 0 -14 Td" for line in lines)
+    stream = f"BT /F1 11 Tf 72 720 Td {text} ET".encode('latin-1')
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+def combine(*pdfs):
+    writer = PdfWriter()
+    for pdf in pdfs:
+        for page in PdfReader(BytesIO(pdf)).pages:
+            writer.add_page(page)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_drops_cover_and_disclaimer_pages():
+    cover = make_text_pdf(["Petron Corporation", "Remittance Advice", "Please see attached statement."])
+    disclaimer = make_text_pdf(["This document is computer generated.", "No signature is required."])
+    file_bytes = combine(cover, SAMPLE_PDF.read_bytes(), disclaimer)
+
+    slim_bytes, kept, total = prune_pages(file_bytes)
+
+    assert total == 5
+    assert kept == 1
+    assert count_pages(slim_bytes) == 1
+    assert len(slim_bytes) < len(file_bytes)
+    text = PdfReader(BytesIO(slim_bytes)).pages[0].extract_text()
+    assert "Terminal ID" in text
+    assert "Total :" in text
+
+
+def test_keeps_header_page_when_table_pages_lack_it():
+    header = make_text_pdf(["From : 01 Nov 2025", "To : 03 Nov 2025", "Reimbursement Batch : 5216"])
+    rows = make_text_pdf([
+        "20020788 28916273 13398430 11/01/2025 1:58PM 3 5,757.21 51.41 5,705.80",
+        "Total : 5,757.21 51.41 5,705.80",
+    ])
+    notice = make_text_pdf(["Thank you for your business."])
+
+    slim_bytes, kept, total = prune_pages(combine(notice, header, rows))
+
+    assert (kept, total) == (2, 3)
+    texts = [page.extract_text() for page in PdfReader(BytesIO(slim_bytes)).pages]
+    assert "Reimbursement Batch" in texts[0]
+    assert "Total :" in texts[1]
+
+
+def test_unreadable_pdf_is_left_alone():
+    """Blank or scanned pages give no signal, so the whole PDF is sent"""
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=612, height=792)
+    buffer = BytesIO()
+    writer.write(buffer)
+    file_bytes = buffer.getvalue()
+
+    assert prune_pages(file_bytes) == (file_bytes, 3, 3)
+
+
+if __name__ == "__main__":
+    print("🧪 Page Pruning Test")
+    print("=" * 80)
+    test_drops_cover_and_disclaimer_pages()
+    test_keeps_header_page_when_table_pages_lack_it()
+    test_unreadable_pdf_is_left_alone()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test the shared Gemini rate limiter and the retry path around extraction
+Uses a fake model that fails with quota errors before answering
+"""
+
+import sys
+import json
+import time
+import asyncio
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+from google.api_core import exceptions as google_exceptions
+
+from rate_limiter import RateLimiter, retry_after_seconds, backoff_delay
+from telegram_bot import GeminiService
+from fake_gemini import FakeResponse
+
+SAMPLE_JSON = json.dumps({
+    "header": {"reimbursement_batch": "5216"},
+    "transactions": [{"terminal_id": "20020788"}],
+    "totals": {"gross_amount": 0.0, "ewt": 0.0, "net_amount": 0.0},
+})
+
+
+class QuotaModel:
+    """Stand-in for GenerativeModel that is out of quota for the first calls"""
+
+    def __init__(self, failures, error):
+        self.failures = failures
+        self.error = error
+        self.calls = []
+
+    def generate_content(self, contents):
+        self.calls.append(time.perf_counter())
+        if len(self.calls) <= self.failures:
+            raise self.error
+        return FakeResponse(SAMPLE_JSON)
+
+
+def test_bucket_allows_burst_then_queues():
+    """Requests within the quota pass at once, the rest wait for refill"""
+    async def run():
+        limiter = RateLimiter(requests_per_minute=600)  # one every 0.1s
+        limiter._requests = 3
+        started = time.perf_counter()
+        done = []
+
+        async def request(n):
+            await limiter.acquire()
+            done.append((n, time.perf_counter() - started))
+
+        await asyncio.gather(*[request(n) for n in range(5)])
+        return done
+
+    done = asyncio.run(run())
+    assert [n for n, _ in done] == [0, 1, 2, 3, 4]  # arrival order
+    assert done[2][1] < 0.05
+    assert 0.08 < done[3][1] < 0.2
+    assert 0.18 < done[4][1] < 0.35
+
+
+def test_token_bucket_limits_large_requests():
+    async def run():
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=60000)  # 1000 tokens/s
+        started = time.perf_counter()
+        await limiter.acquire(60000)
+        await limiter.acquire(200)
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(run())
+    assert 0.15 < elapsed < 0.35
+
+
+def test_pause_holds_back_callers():
+    async def run():
+        limiter = RateLimiter(requests_per_minute=60)
+        limiter.pause(0.2)
+        started = time.perf_counter()
+        await limiter.acquire()
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) >= 0.19
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds(google_exceptions.ResourceExhausted(
+        "Quota exceeded. Please retry in 12.5s.")) == 12.5
+    assert retry_after_seconds(google_exceptions.ServiceUnavailable("overloaded")) is None
+    for attempt in range(8):
+        assert 0 <= backoff_delay(attempt, base=1.0, cap=10.0) <= min(10.0, 2 ** attempt)
+
+
+def test_quota_error_is_retried_after_hint():
+    """A 429 pauses the limiter for the suggested time, then the request succeeds"""
+    service = GeminiService('test-key', max_workers=2)
+    service.model = QuotaModel(2, google_exceptions.ResourceExhausted("Resource exhausted, retry in 0.1s"))
+    service.rate_limiter = RateLimiter(requests_per_minute=600)
+
+    try:
+        data = asyncio.run(service.extract_from_bytes(b'%PDF-1.4', 'application/pdf'))
+    finally:
+        service.shutdown()
+
+    calls = service.model.calls
+    assert data['header']['reimbursement_batch'] == "5216"
+    assert len(calls) == 3
+    assert calls[1] - calls[0] >= 0.09
+    assert calls[2] - calls[1] >= 0.09
+
+
+def test_gives_up_after_max_retries():
+    service = GeminiService('test-key', max_workers=1)
+    service.model = QuotaModel(10, google_exceptions.ServiceUnavailable("retry in 0.01s"))
+    service.max_retries = 2
+
+    try:
+        asyncio.run(service.extract_from_bytes(b'%PDF-1.4', 'application/pdf'))
+        failed = False
+    except google_exceptions.ServiceUnavailable:
+        failed = True
+    finally:
+        service.shutdown()
+
+    assert failed
+    assert len(service.model.calls) == 3
+
+
+if __name__ == "__main__":
+    print("🧪 Rate Limiter Test")
+    print("=" * 80)
+    test_bucket_allows_burst_then_queues()
+    test_token_bucket_limits_large_requests()
+    test_pause_holds_back_callers()
+    test_retry_after_parsing()
+    test_quota_error_is_retried_after_hint()
+    test_gives_up_after_max_retries()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test the columnar report model: typed values, reconciliation and summaries
+"""
+
+import sys
+import json
+from decimal import Decimal
+from datetime import datetime
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+from fake_gemini import make_report
+from report_model import SettlementReport, Transaction, summarize, to_cents, settle_minutes, NO_DATE
+from telegram_bot import extraction_problems, is_balanced
+
+SAMPLE_PATH = HERE / "extracted_from_pdf.json"
+
+
+def test_typed_columns():
+    report = SettlementReport.from_dict(make_report(3))
+    assert len(report) == 3
+    assert report.gross_cents.typecode == 'q'
+
+    txn = report.transaction(0)
+    assert isinstance(txn, Transaction)
+    assert txn.settle_date == datetime(2025, 11, 1, 8, 32)
+    assert txn.gross_amount == Decimal('44540.36')
+    assert txn.no_of_txn == 32
+    assert not hasattr(txn, '__dict__')
+
+    # Repeated descriptions are one shared string
+    assert report.description[0] is report.description[1]
+
+
+def test_amount_conversion():
+    assert to_cents(5705.8) == 570580
+    assert to_cents(0.29) == 29
+    assert to_cents('1,234.505') == 123451
+    assert to_cents(None) == 0
+    assert to_cents('n/a') == 0
+
+
+def test_settle_dates():
+    assert settle_minutes('01/01/1970 12:01AM') == 1
+    assert settle_minutes('11/01/2025 12:00PM') % 1440 == 12 * 60
+    assert settle_minutes('11/01/2025') % 1440 == 0
+    assert settle_minutes('02/30/2025') == NO_DATE
+    assert settle_minutes('11/01/2025 13:00PM') == NO_DATE
+    assert settle_minutes(None) == NO_DATE
+
+
+def test_sample_reconciles():
+    with open(SAMPLE_PATH) as f:
+        data = json.load(f)
+    reconciliation = SettlementReport.from_dict(data).reconcile()
+    assert reconciliation.ok
+    assert reconciliation.describe() == ''
+    assert extraction_problems(data) == ''
+
+
+def test_reconciliation_finds_bad_rows_and_totals():
+    data = make_report(10)
+    data['transactions'][3]['net_amount'] += 0.01
+    data['transactions'][7]['ewt'] = None
+    reconciliation = SettlementReport.from_dict(data).reconcile()
+
+    assert not reconciliation.ok
+    assert reconciliation.bad_rows == [3, 7]
+    assert reconciliation.mismatched_totals == ['ewt', 'net_amount']
+    assert 'row 4, 8' in reconciliation.describe()
+    assert 'Net rows sum to' in extraction_problems(data)
+    assert reconciliation.problem_count == 4
+    # The one-row check agrees with reconcile without building a report
+    assert [n for n, txn in enumerate(data['transactions']) if not is_balanced(txn)] == [3, 7]
+
+
+def test_float_sums_do_not_cause_false_mismatches():
+    # 0.1 + 0.2 != 0.3 in floats; in centavos it is exact
+    data = make_report(0)
+    data['transactions'] = [
+        {'terminal_id': '1', 'host_batch_id': '1', 'ids': str(n), 'settle_date': '11/01/2025',
+         'no_of_txn': 1, 'gross_amount': amount, 'ewt': 0, 'net_amount': amount, 'description': ''}
+        for n, amount in enumerate([0.1, 0.2])
+    ]
+    data['totals'] = {'gross_amount': 0.3, 'ewt': 0, 'net_amount': 0.3}
+    assert SettlementReport.from_dict(data).reconcile().ok
+
+
+def test_summary():
+    first, second = make_report(40), make_report(25)
+    summary = summarize([SettlementReport.from_dict(first), SettlementReport.from_dict(second)])
+
+    net = sum(Decimal(str(txn['net_amount'])) for txn in first['transactions'] + second['transactions'])
+    assert summary['total']['net_amount'] == net
+    assert sum(day['net_amount'] for day in summary['by_day'].values()) == net
+    assert list(summary['by_day']) == sorted(summary['by_day'], key=lambda day: datetime.strptime(day, '%m/%d/%Y'))
+    assert list(summary['by_terminal']) == sorted(summary['by_terminal'])
+
+
+if __name__ == "__main__":
+    print("🧪 Report Model Test")
+    print("=" * 80)
+    test_typed_columns()
+    test_amount_conversion()
+    test_settle_dates()
+    test_sample_reconciles()
+    test_reconciliation_finds_bad_rows_and_totals()
+    test_float_sums_do_not_cause_false_mismatches()
+    test_summary()
+    print("✅ Test completed successfully!")
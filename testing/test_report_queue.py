@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test the report queue: round-robin fairness, per-user limits and backpressure
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from report_queue import ReportQueue, QueueFull
+
+
+def test_round_robin_across_users():
+    """A user bulk-forwarding reports does not starve a later user"""
+    order = []
+
+    async def run():
+        queue = ReportQueue(workers=1, per_user_limit=1)
+        await queue.start()
+        done = asyncio.Event()
+
+        def job(name, last=False):
+            async def run_job():
+                await asyncio.sleep(0.01)
+                order.append(name)
+                if last:
+                    done.set()
+            return run_job
+
+        for n in range(1, 5):
+            await queue.submit('alice', job(f'alice{n}'))
+        await queue.submit('bob', job('bob1'))
+        await queue.submit('bob', job('bob2', last=False))
+        await queue.submit('alice', job('alice5', last=True))
+
+        await asyncio.wait_for(done.wait(), timeout=5)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert order.index('bob1') <= 2
+    assert order.index('bob2') <= 4
+    assert order[-1] == 'alice5'
+
+
+def test_per_user_limit_and_positions():
+    async def run():
+        queue = ReportQueue(workers=4, per_user_limit=1)
+        await queue.start()
+        running = 0
+        peak = 0
+        finished = asyncio.Event()
+        completed = 0
+
+        async def job():
+            nonlocal running, peak, completed
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            completed += 1
+            if completed == 3:
+                finished.set()
+
+        positions = [await queue.submit('alice', job) for _ in range(3)]
+        await asyncio.wait_for(finished.wait(), timeout=5)
+        await queue.stop()
+        return positions, peak
+
+    positions, peak = asyncio.run(run())
+    assert positions[0] == 0
+    assert positions[1] > 0 and positions[2] > positions[1]
+    assert peak == 1
+
+
+def test_backpressure():
+    async def run():
+        queue = ReportQueue(workers=1, max_pending=2, max_pending_per_user=1)
+        await queue.start()
+        blocker = asyncio.Event()
+
+        async def job():
+            await blocker.wait()
+
+        await queue.submit('alice', job)
+        await asyncio.sleep(0)  # let the worker take the first job
+        await queue.submit('alice', job)
+        try:
+            await queue.submit('alice', job)
+            user_limited = False
+        except QueueFull:
+            user_limited = True
+        await queue.submit('bob', job)
+        try:
+            await queue.submit('carol', job)
+            queue_full = False
+        except QueueFull:
+            queue_full = True
+
+        blocker.set()
+        await queue.stop()
+        return user_limited, queue_full
+
+    user_limited, queue_full = asyncio.run(run())
+    assert user_limited
+    assert queue_full
+
+
+if __name__ == "__main__":
+    print("🧪 Report Queue Test")
+    print("=" * 80)
+    test_round_robin_across_users()
+    test_per_user_limit_and_positions()
+    test_backpressure()
+    print("✅ Test completed successfully!")
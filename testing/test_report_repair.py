@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test targeted re-extraction of rows that do not reconcile
+Uses a fake Gemini service that answers the focused prompts with a few rows
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import telegram_bot
+from fake_gemini import make_report
+from report_model import SettlementReport
+from telegram_bot import repair_report, ROW_REPAIR_PROMPT, MISSING_ROWS_PROMPT
+
+
+class FakeService:
+    """Records prompts and answers with the given responses in order"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+        self.documents = []
+
+    @property
+    def cascade(self):
+        return [self]
+
+    async def extract_from_bytes(self, file_bytes, mime_type, prompt=None, parser=None, on_progress=None):
+        self.prompts.append(prompt)
+        self.documents.append(file_bytes)
+        return self.responses.pop(0)
+
+
+def run_repair(service, data, file_bytes=b'image', mime_type='image/png'):
+    original = telegram_bot.gemini_service
+    telegram_bot.gemini_service = service
+    try:
+        return asyncio.run(repair_report(file_bytes, mime_type, data))
+    finally:
+        telegram_bot.gemini_service = original
+
+
+def test_reconciled_report_is_not_requeried():
+    service = FakeService()
+    data = make_report(5)
+    kept, reconciliation = run_repair(service, data)
+    assert kept is data
+    assert reconciliation.ok
+    assert service.prompts == []
+
+
+def test_bad_rows_are_requeried_by_id():
+    truth = make_report(20)
+    data = make_report(20)
+    data['transactions'][4] = dict(data['transactions'][4], net_amount=1.0)
+    data['transactions'][11] = dict(data['transactions'][11], ewt=None)
+
+    service = FakeService({'transactions': [truth['transactions'][4], truth['transactions'][11]]})
+    repaired, reconciliation = run_repair(service, data)
+
+    assert repaired is not data
+    assert reconciliation.ok
+    assert SettlementReport.from_dict(repaired).reconcile().ok
+    assert repaired['transactions'] == truth['transactions']
+    # One focused request naming only the two bad rows
+    assert len(service.prompts) == 1
+    assert ROW_REPAIR_PROMPT.split('{rows}')[0] in service.prompts[0]
+    assert truth['transactions'][4]['ids'] in service.prompts[0]
+    assert truth['transactions'][0]['ids'] not in service.prompts[0]
+    # The input is not modified
+    assert data['transactions'][4]['net_amount'] == 1.0
+
+
+def test_missing_rows_are_requeried():
+    truth = make_report(12)
+    data = dict(truth, transactions=truth['transactions'][:9])
+
+    service = FakeService({'transactions': truth['transactions'][7:]})
+    repaired, reconciliation = run_repair(service, data)
+
+    assert reconciliation.ok
+    assert repaired['transactions'] == truth['transactions']
+    assert len(service.prompts) == 1
+    assert MISSING_ROWS_PROMPT.split('{row_count}')[0] in service.prompts[0]
+
+
+def test_worse_answer_is_rejected():
+    data = make_report(6)
+    data['transactions'][2] = dict(data['transactions'][2], net_amount=1.0)
+    bad = dict(data['transactions'][2], gross_amount=5.0)
+
+    service = FakeService({'transactions': [bad]}, {'transactions': []})
+    kept, reconciliation = run_repair(service, data)
+    assert kept is data
+    assert reconciliation.bad_rows == [2]
+
+
+def test_pdf_is_not_pruned_again():
+    # repair_report gets the PDF as extract_report already pruned it
+    truth = make_report(6)
+    data = make_report(6)
+    data['transactions'][2] = dict(data['transactions'][2], net_amount=1.0)
+
+    def prune_again(file_bytes):
+        raise AssertionError("the PDF was pruned twice")
+
+    prune_pages = telegram_bot.prune_pages
+    telegram_bot.prune_pages = prune_again
+    try:
+        service = FakeService({'transactions': [truth['transactions'][2]]})
+        repaired, _ = run_repair(service, data, b'%PDF pruned', 'application/pdf')
+    finally:
+        telegram_bot.prune_pages = prune_pages
+
+    assert repaired['transactions'] == truth['transactions']
+    assert service.documents == [b'%PDF pruned']
+
+
+if __name__ == "__main__":
+    print("🧪 Report Repair Test")
+    print("=" * 80)
+    test_reconciled_report_is_not_requeried()
+    test_bad_rows_are_requeried_by_id()
+    test_missing_rows_are_requeried()
+    test_worse_answer_is_rejected()
+    test_pdf_is_not_pruned_again()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test that importing the bot stays cheap
+Heavy modules must load on first use or pre-warm, not at import
+"""
+
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+HEAVY_MODULES = ['google.generativeai', 'grpc', 'openpyxl', 'pdfplumber', 'pypdf']
+
+
+def modules_after(code: str) -> list:
+    """Heavy modules present in a fresh interpreter after running code"""
+    script = (f"import sys; sys.path.insert(0, {str(ROOT)!r}); {code}; import json; "
+              f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_is_lazy():
+    assert modules_after("import telegram_bot") == []
+
+
+def test_service_creation_is_lazy():
+    assert modules_after("import telegram_bot; telegram_bot.GeminiService('test-key', max_workers=1)") == []
+
+
+def test_warm_up_loads_everything():
+    loaded = modules_after(
+        "import telegram_bot; "
+        "telegram_bot.gemini_service = telegram_bot.GeminiService('test-key', max_workers=1); "
+        "telegram_bot.warm_up()"
+    )
+    assert set(loaded) >= {'google.generativeai', 'openpyxl', 'pdfplumber', 'pypdf'}
+
+
+def test_dependencies_present():
+    import telegram_bot
+    assert telegram_bot.check_dependencies() == []
+
+
+def test_missing_packages_are_reported():
+    # None of the checked packages may be needed to import the bot, or a
+    # missing one would fail with ImportError before main() could report it
+    import telegram_bot
+    blocked = "; ".join(f"sys.modules[{module!r}] = None" for module in telegram_bot.REQUIRED_MODULES)
+    script = (f"import sys; sys.path.insert(0, {str(ROOT)!r}); {blocked}; import telegram_bot, json; "
+              "print(json.dumps(telegram_bot.check_dependencies()))")
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == list(telegram_bot.REQUIRED_MODULES.values())
+
+if __name__ == "__main__":
+    print("🧪 Start-up Test")
+    print("=" * 80)
+    test_import_is_lazy()
+    test_service_creation_is_lazy()
+    test_warm_up_loads_everything()
+    test_dependencies_present()
+    test_missing_packages_are_reported()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test streamed Gemini responses with incremental JSON row parsing
+"""
+
+import sys
+import json
+import time
+import asyncio
+from io import BytesIO
+from pathlib import Path
+
+import openpyxl
+from openpyxl import load_workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from json_stream import ReportStreamParser
+from telegram_bot import GeminiService
+from excel_report import StreamingReportWriter
+
+SAMPLE_PATH = Path(__file__).resolve().parent / "extracted_from_pdf.json"
+CHUNK_LATENCY = 0.05
+
+
+def load_sample():
+    with open(SAMPLE_PATH) as f:
+        return json.load(f)
+
+
+def sample_answer():
+    return "```json\n" + json.dumps(load_sample(), indent=2) + "\n```"
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StreamingModel:
+    """Streams the sample answer in small chunks with a delay between them"""
+
+    def generate_content(self, contents, stream=False):
+        answer = sample_answer()
+        pieces = [answer[i:i + 200] for i in range(0, len(answer), 200)]
+
+        def chunks():
+            for piece in pieces:
+                time.sleep(CHUNK_LATENCY)
+                yield Chunk(piece)
+        return chunks()
+
+
+def test_parser_handles_any_chunk_boundary():
+    data = load_sample()
+    answer = sample_answer().replace('Prod Level', 'Prod \\"Level\\" {x}')
+    expected = json.loads(answer[8:-4])['transactions']
+
+    for size in (1, 3, 17, 64, len(answer)):
+        rows = []
+        headers = []
+        parser = ReportStreamParser(on_header=headers.append, on_transaction=rows.append)
+        for i in range(0, len(answer), size):
+            parser.feed(answer[i:i + size])
+        assert headers == [data['header']]
+        assert rows == expected
+        assert parser.text == answer
+
+
+def test_rows_arrive_before_the_answer_completes():
+    service = GeminiService('test-key', max_workers=1)
+    service.model = StreamingModel()
+    arrivals = []
+    progress = []
+
+    async def on_progress(count):
+        progress.append(count)
+
+    async def run():
+        started = time.perf_counter()
+        parser = ReportStreamParser(on_transaction=lambda txn: arrivals.append(time.perf_counter() - started))
+        data = await service.extract_from_bytes(b'%PDF-1.4', 'application/pdf', parser=parser, on_progress=on_progress)
+        await asyncio.sleep(0)
+        return data, time.perf_counter() - started
+
+    try:
+        data, elapsed = asyncio.run(run())
+    finally:
+        service.shutdown()
+
+    print(f"   First row after {arrivals[0]:.2f}s, complete after {elapsed:.2f}s")
+    assert data == load_sample()
+    assert len(arrivals) == 17
+    assert arrivals[0] < elapsed / 3
+    assert progress == sorted(progress) and progress[-1] == 17
+
+
+def test_writer_builds_workbook_from_streamed_rows():
+    data = load_sample()
+    writer = StreamingReportWriter()
+    parser = ReportStreamParser(on_header=writer.start, on_transaction=writer.add_transaction)
+    parser.feed(sample_answer())
+
+    ws = load_workbook(BytesIO(writer.finish(data['totals']))).active
+    assert ws['H5'].value == data['header']['reimbursement_batch']
+    assert [row[2] for row in ws.iter_rows(min_row=8, max_row=24, values_only=True)] == \
+        [txn['ids'] for txn in data['transactions']]
+    assert ws.cell(25, 8).value == data['totals']['net_amount']
+    writer.discard()
+
+
+def test_discarded_writer_leaves_no_temp_files():
+    data = load_sample()
+    writer = StreamingReportWriter(max_rows_per_sheet=15)
+    writer.start(data['header'])
+    for txn in data['transactions']:
+        writer.add_transaction(txn)
+    assert writer.sheet_count == 3
+
+    spooled = [ws._writer.out for ws in writer.wb.worksheets]
+    assert all(Path(path).exists() for path in spooled)
+    writer.discard()
+    assert not any(Path(path).exists() for path in spooled)
+    # A second call, or one after nothing was written, is harmless
+    writer.discard()
+    StreamingReportWriter().discard()
+
+
+def test_openpyxl_version_is_pinned():
+    # discard() removes the spool files of write-only sheets through their
+    # writer, which is not public API; check it again before moving off the
+    # version in requirements.txt
+    requirements = (Path(__file__).resolve().parent.parent / "requirements.txt").read_text()
+    assert f"openpyxl=={openpyxl.__version__}" in requirements.split()
+
+
+if __name__ == "__main__":
+    print("🧪 Streaming Extraction Test")
+    print("=" * 80)
+    test_parser_handles_any_chunk_boundary()
+    test_rows_arrive_before_the_answer_completes()
+    test_writer_builds_workbook_from_streamed_rows()
+    test_discarded_writer_leaves_no_temp_files()
+    test_openpyxl_version_is_pinned()
+    print("✅ Test completed successfully!")
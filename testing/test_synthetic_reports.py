@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test the synthetic report generator against the local parsers
+The text layer of a generated PDF must parse back to its ground truth
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthetic_report import generate, generate_report_data
+from pdf_parser import extract_text_layer
+from report_model import SettlementReport
+from pdf_pages import count_pages, prune_pages
+
+
+def test_ground_truth_reconciles():
+    data = generate_report_data(rows=2000, terminals=12, days=30, seed=7, long_descriptions=0.1)
+    assert len(data['transactions']) == 2000
+    assert len({txn['terminal_id'] for txn in data['transactions']}) <= 12
+    assert len({txn['ids'] for txn in data['transactions']}) == 2000
+    assert data['header']['date_to'] == "30 Nov 2025"
+    assert SettlementReport.from_dict(data).reconcile().ok
+
+
+def test_pages_option():
+    data, pdf_bytes = generate(rows=100, pages=4)
+    assert count_pages(pdf_bytes) == 4
+
+
+def test_text_layer_matches_ground_truth():
+    data, pdf_bytes = generate(rows=60, terminals=4, lines_per_page=25, long_descriptions=0.2, seed=3)
+    assert extract_text_layer(pdf_bytes) == data
+
+
+def test_edge_cases_parse_back():
+    """Descriptions wrapped across page breaks, behind a cover page"""
+    data, pdf_bytes = generate(rows=80, lines_per_page=7, long_descriptions=0.5,
+                               straddle=True, cover=True, seed=11)
+    assert extract_text_layer(pdf_bytes) == data
+
+    slim_bytes, kept, total = prune_pages(pdf_bytes)
+    assert total == count_pages(pdf_bytes)
+    assert kept == total - 1
+
+
+def test_long_pdf_is_left_to_gemini():
+    data, pdf_bytes = generate(rows=60, pages=4, seed=5)
+    assert extract_text_layer(pdf_bytes, max_pages=3) is None
+    assert extract_text_layer(pdf_bytes, max_pages=4) == data
+    assert extract_text_layer(pdf_bytes, max_pages=0) == data
+
+
+if __name__ == "__main__":
+    print("🧪 Synthetic Report Test")
+    print("=" * 80)
+    test_ground_truth_reconciles()
+    test_pages_option()
+    test_text_layer_matches_ground_truth()
+    test_edge_cases_parse_back()
+    test_long_pdf_is_left_to_gemini()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test the local text-layer parser against the golden Gemini extraction
+"""
+
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pdf_parser import extract_text_layer
+from report_model import SettlementReport
+
+TESTING_DIR = Path(__file__).resolve().parent
+PDF_PATH = TESTING_DIR / "PFC Nov 3 2025 (1).pdf"
+GOLDEN_PATH = TESTING_DIR / "extracted_from_pdf.json"
+
+
+def test_matches_golden_output():
+    with open(PDF_PATH, 'rb') as f:
+        data = extract_text_layer(f.read())
+    with open(GOLDEN_PATH) as f:
+        golden = json.load(f)
+
+    assert data is not None
+    assert data['header'] == golden['header']
+    assert data['totals'] == golden['totals']
+    assert len(data['transactions']) == 17
+    assert data['transactions'] == golden['transactions']
+
+
+def test_reconcile_rejects_mismatched_totals():
+    with open(GOLDEN_PATH) as f:
+        golden = json.load(f)
+    assert SettlementReport.from_dict(golden).reconcile().ok
+
+    golden['transactions'].pop()
+    assert not SettlementReport.from_dict(golden).reconcile().ok
+
+
+def test_no_text_layer_returns_none():
+    # Minimal one-page PDF with no content stream
+    pdf = (
+        b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+        b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+        b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 612 792]>>endobj\n"
+        b"trailer<</Root 1 0 R>>\n%%EOF"
+    )
+    assert extract_text_layer(pdf) is None
+
+
+if __name__ == "__main__":
+    print("🧪 Text Layer Parser Test")
+    print("=" * 80)
+    test_matches_golden_output()
+    test_reconcile_rejects_mismatched_totals()
+    test_no_text_layer_returns_none()
+    print("✅ Test completed successfully!")
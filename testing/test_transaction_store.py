@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite transaction history: storage, idempotent re-imports and indexed queries
+"""
+
+import sys
+import tempfile
+from decimal import Decimal
+from datetime import date, datetime
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+from synthetic_report import generate_report_data
+from report_model import SettlementReport, summarize
+from transaction_store import TransactionStore
+
+
+def make_store(tmp):
+    return TransactionStore(str(Path(tmp) / "transactions.sqlite3"))
+
+
+def test_roundtrip_and_totals():
+    data = generate_report_data(50, terminals=3)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        store.save_report(data)
+
+        rows = store.transactions(reimbursement_batch='5216')
+        assert len(rows) == 50
+        assert all(isinstance(row['settle_date'], datetime) for row in rows)
+        assert rows == sorted(rows, key=lambda row: row['settle_date'])
+        assert sorted(row['gross_amount'] for row in rows) == \
+            sorted(Decimal(str(txn['gross_amount'])) for txn in data['transactions'])
+        assert rows[0]['business_location_id'] == data['header']['business_location_id']
+
+        totals = store.totals(reimbursement_batch='5216')
+        assert totals['rows'] == 50
+        assert totals['net_amount'] == Decimal(str(data['totals']['net_amount']))
+        assert store.batches() == ['5216']
+        store.close()
+
+
+def test_reimport_is_idempotent():
+    data = generate_report_data(40, terminals=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        store.save_report(data)
+        store.save_report(data)
+        assert store.totals()['rows'] == 40
+
+        # A corrected re-extraction with fewer rows replaces the old rows
+        shorter = dict(data, transactions=data['transactions'][:30])
+        shorter['totals'] = SettlementReport.from_dict(shorter).row_totals()
+        store.save_report(shorter)
+        assert store.totals()['rows'] == 30
+        assert store.totals()['gross_amount'] == SettlementReport.from_dict(shorter).row_totals()['gross_amount']
+        store.close()
+
+
+def test_filters():
+    first = generate_report_data(60, terminals=3, days=3, start=date(2025, 11, 1), batch='5216')
+    second = generate_report_data(60, terminals=3, days=3, start=date(2025, 11, 4), batch='5217', seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        store.save_reports([first, second])
+        assert store.batches() == ['5216', '5217']
+
+        terminal = first['transactions'][0]['terminal_id']
+        expected = sum(1 for txn in first['transactions'] if txn['terminal_id'] == terminal)
+        assert store.totals(terminal_id=terminal, until=date(2025, 11, 4))['rows'] == expected
+
+        # since is inclusive, until exclusive
+        assert store.totals(since=date(2025, 11, 4))['rows'] == 60
+        assert store.totals(since=datetime(2025, 11, 1), until=date(2025, 11, 7))['rows'] == 120
+
+        host_batch = second['transactions'][5]['host_batch_id']
+        assert [row['ids'] for row in store.transactions(host_batch_id=host_batch, reimbursement_batch='5217')] == \
+            [txn['ids'] for txn in second['transactions'] if txn['host_batch_id'] == host_batch]
+        assert len(store.transactions(limit=7)) == 7
+        store.close()
+
+
+def test_locations_sharing_a_batch_number():
+    first = generate_report_data(40, terminals=2, batch='5216')
+    second = generate_report_data(30, terminals=2, batch='5216', seed=1)
+    second['header'] = dict(second['header'], business_location_id='0099', business_location_name='Other')
+    for txn in second['transactions']:
+        txn['terminal_id'] = '9' + txn['terminal_id'][1:]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        store.save_reports([first, second])
+        assert store.totals()['rows'] == 70
+        assert store.totals(business_location_id='0099')['rows'] == 30
+        assert store.batches() == ['5216']
+        assert store.batches(business_location_id='0099') == ['5216']
+
+        # Re-importing one location's batch leaves the other's alone
+        shorter = dict(first, transactions=first['transactions'][:25])
+        shorter['totals'] = SettlementReport.from_dict(shorter).row_totals()
+        store.save_report(shorter)
+        assert store.totals(reimbursement_batch='5216')['rows'] == 55
+        assert store.summary() == summarize([SettlementReport.from_dict(shorter), SettlementReport.from_dict(second)])
+        assert store.summary(business_location_id='0099') == summarize([SettlementReport.from_dict(second)])
+        store.close()
+
+
+def test_unreconciled_reports_are_flagged():
+    good = generate_report_data(40, terminals=2, batch='5216')
+    bad = generate_report_data(30, terminals=2, batch='5217', seed=1)
+    bad['transactions'].pop()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        store.save_reports([good, bad])
+        flags = dict(store._db.execute("SELECT reimbursement_batch, reconciled FROM reports"))
+        assert flags == {'5216': 1, '5217': 0}
+
+        # Flagged batches are left out of every lookup
+        assert store.batches() == ['5216']
+        assert store.totals()['rows'] == 40
+        assert store.transactions(reimbursement_batch='5217') == []
+        assert store.summary() == summarize([SettlementReport.from_dict(good)])
+
+        # A bad re-extraction never replaces a batch that reconciles
+        store.save_report(dict(good, transactions=good['transactions'][:10]))
+        assert store.totals()['rows'] == 40
+        # and a good one replaces a flagged batch
+        bad['totals'] = SettlementReport.from_dict(bad).row_totals()
+        store.save_report(bad)
+        assert store.batches() == ['5216', '5217']
+        assert store.summary() == summarize([SettlementReport.from_dict(good), SettlementReport.from_dict(bad)])
+
+        # A caller that has already reconciled a report passes the outcome on
+        third = generate_report_data(20, terminals=2, batch='5218', seed=2)
+        store.save_reports([third], reconciled=[False])
+        assert store.batches() == ['5216', '5217']
+        store.close()
+
+
+def test_wal_mode_and_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        db = store._db
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+        def plan(sql, *params):
+            return ' '.join(row[-1] for row in db.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+        assert 'transactions_location_date' in plan(
+            "SELECT * FROM transactions WHERE business_location_id = ? AND settle_date >= ?", 'x', '2025')
+        assert 'transactions_terminal' in plan("SELECT * FROM transactions WHERE terminal_id = ?", 'x')
+        assert 'transactions_host_batch' in plan("SELECT * FROM transactions WHERE host_batch_id = ?", 'x')
+        # Either the primary key or transactions_batch, which carries it, seeks on both columns
+        by_key = plan("SELECT * FROM transactions WHERE business_location_id = ? AND reimbursement_batch = ?", 'x', 'y')
+        assert 'business_location_id=?' in by_key and 'reimbursement_batch=?' in by_key
+        assert 'transactions_batch' in plan("SELECT * FROM transactions WHERE reimbursement_batch = ?", 'x')
+        store.close()
+
+
+if __name__ == "__main__":
+    print("🧪 Transaction Store Test")
+    print("=" * 80)
+    test_roundtrip_and_totals()
+    test_reimport_is_idempotent()
+    test_filters()
+    test_locations_sharing_a_batch_number()
+    test_unreconciled_reports_are_flagged()
+    test_wal_mode_and_indexes()
+    print("✅ Test completed successfully!")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test the webhook server's update intake, metrics and health endpoints
+Uses a stand-in Application and a real server on a local port
+"""
+
+import sys
+import time
+import socket
+import asyncio
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metrics import REPORTS, stage_timer
+from web_server import make_web_app, RecentUpdates
+
+URL_PATH = "123456:TEST-token_abc"
+
+
+class FakeApplication:
+    """The parts of telegram.ext.Application the web server uses"""
+
+    def __init__(self):
+        self.bot = None
+        self.update_queue = asyncio.Queue()
+        self.running = True
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def with_server(application, readiness, requests):
+    port = free_port()
+    server = make_web_app(application, URL_PATH, readiness).listen(port, address='127.0.0.1')
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            return await requests(client)
+    finally:
+        server.stop()
+
+
+def test_webhook_puts_update_on_queue():
+    async def run():
+        application = FakeApplication()
+
+        async def requests(client):
+            ok = await client.post(f"/{URL_PATH}", json={'update_id': 42})
+            bad = await client.post(f"/{URL_PATH}", content=b"not json")
+            wrong_path = await client.post("/other", json={'update_id': 43})
+            return ok.status_code, bad.status_code, wrong_path.status_code
+
+        statuses = await with_server(application, None, requests)
+        return statuses, application.update_queue
+
+    (ok, bad, wrong_path), queue = asyncio.run(run())
+    assert (ok, bad, wrong_path) == (200, 400, 404)
+    assert queue.qsize() == 1
+    assert queue.get_nowait().update_id == 42
+
+
+def test_redelivered_updates_are_dropped():
+    async def run():
+        application = FakeApplication()
+
+        async def requests(client):
+            return [(await client.post(f"/{URL_PATH}", json={'update_id': n})).status_code
+                    for n in (1, 2, 1, 3, 2)]
+
+        statuses = await with_server(application, None, requests)
+        return statuses, application.update_queue
+
+    statuses, queue = asyncio.run(run())
+    assert statuses == [200] * 5
+    assert [queue.get_nowait().update_id for _ in range(queue.qsize())] == [1, 2, 3]
+
+
+def test_recent_updates_is_bounded():
+    recent = RecentUpdates(size=3)
+    assert all(recent.add(n) for n in range(5))
+    assert not recent.add(4)
+    assert recent.add(0)  # forgotten
+
+
+def test_acknowledges_without_waiting_for_processing():
+    """Nothing consumes the queue, yet 64 concurrent deliveries are acknowledged quickly"""
+    async def run():
+        application = FakeApplication()
+
+        async def requests(client):
+            async def post(n):
+                started = time.perf_counter()
+                response = await client.post(f"/{URL_PATH}", json={'update_id': n, 'message': None})
+                return response.status_code, time.perf_counter() - started
+            return await asyncio.gather(*[post(n) for n in range(64)])
+
+        results = await with_server(application, None, requests)
+        return results, application.update_queue.qsize()
+
+    results, queued = asyncio.run(run())
+    assert all(status == 200 for status, _ in results)
+    assert queued == 64
+    assert max(elapsed for _, elapsed in results) < 1.0
+
+
+def test_health_and_readiness():
+    problems = []
+
+    async def run():
+        application = FakeApplication()
+
+        async def requests(client):
+            results = [(await client.get("/healthz")).status_code, (await client.get("/readyz")).status_code]
+            problems.append('report queue full')
+            results.append((await client.get("/readyz")).status_code)
+            problems.clear()
+            application.running = False
+            not_running = await client.get("/readyz")
+            results.append(not_running.status_code)
+            return results, not_running.json()
+
+        return await with_server(application, lambda: list(problems), requests)
+
+    statuses, body = asyncio.run(run())
+    assert statuses == [200, 200, 503, 503]
+    assert body['problems'] == ['application not running']
+
+
+def test_metrics_endpoint():
+    REPORTS.labels('success').inc()
+    with stage_timer('extract'):
+        pass
+
+    async def run():
+        async def requests(client):
+            return await client.get("/metrics")
+        return await with_server(FakeApplication(), None, requests)
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert 'reports_total{outcome="success"}' in response.text
+    assert 'report_stage_seconds_bucket{le="0.05",stage="extract"}' in response.text
+    assert 'report_queue_depth' in response.text
+
+
+if __name__ == "__main__":
+    print("🧪 Web Server Test")
+    print("=" * 80)
+    test_webhook_puts_update_on_queue()
+    test_redelivered_updates_are_dropped()
+    test_recent_updates_is_bounded()
+    test_acknowledges_without_waiting_for_processing()
+    test_health_and_readiness()
+    test_metrics_endpoint()
+    print("✅ Test completed successfully!")
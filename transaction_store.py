@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Local history of extracted settlement reports
+Every extracted report is kept in a SQLite database (WAL mode) with one row
+per transaction, so questions about past batches are answered by an indexed
+query instead of re-extracting old PDFs.
+
+Amounts are stored as integer centavos and settle dates as ISO text
+('2025-11-01 13:58'), which sorts and compares correctly in SQL. Saving a
+batch again replaces its rows, so re-imports are idempotent. Batch numbers
+are only unique within a business location, so reports and transactions
+are keyed on (business_location_id, reimbursement_batch); a report without
+a location is stored under ''.
+
+Each report also records who sent it (report_owners), so a user can be
+shown only the locations they have sent reports for.
+
+Reports whose rows do not reconcile with their printed totals are kept,
+flagged, but left out of every query and rollup. They never replace a
+stored batch that does reconcile.
+
+A rollup table keeps the totals per settle day and terminal. It is updated
+in the same transaction as the rows (the batch's old rows are subtracted,
+its new rows added), so summaries over years of history read a few
+thousand rollup rows instead of every transaction.
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+from datetime import date, datetime
+
+from report_model import (
+    SettlementReport, AMOUNT_FIELDS, NO_DATE, cents_to_decimal, minutes_to_datetime
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    reimbursement_batch TEXT NOT NULL,
+    customer_number TEXT,
+    business_location_id TEXT NOT NULL,
+    business_location_name TEXT,
+    date_from TEXT,
+    date_to TEXT,
+    row_count INTEGER NOT NULL,
+    gross_cents INTEGER NOT NULL,
+    ewt_cents INTEGER NOT NULL,
+    net_cents INTEGER NOT NULL,
+    imported REAL NOT NULL,
+    reconciled INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (business_location_id, reimbursement_batch)
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    reimbursement_batch TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    business_location_id TEXT NOT NULL,
+    terminal_id TEXT,
+    host_batch_id TEXT,
+    ids TEXT,
+    settle_date TEXT,
+    no_of_txn INTEGER NOT NULL,
+    gross_cents INTEGER NOT NULL,
+    ewt_cents INTEGER NOT NULL,
+    net_cents INTEGER NOT NULL,
+    description TEXT,
+    PRIMARY KEY (business_location_id, reimbursement_batch, line)
+) WITHOUT ROWID;
+-- The primary key serves lookups by location and batch; this one by batch alone
+CREATE INDEX IF NOT EXISTS transactions_batch ON transactions (reimbursement_batch);
+CREATE INDEX IF NOT EXISTS transactions_location_date ON transactions (business_location_id, settle_date);
+CREATE INDEX IF NOT EXISTS transactions_terminal ON transactions (terminal_id, settle_date);
+CREATE INDEX IF NOT EXISTS transactions_host_batch ON transactions (host_batch_id);
+-- Who sent each report; one report may be sent by several users
+CREATE TABLE IF NOT EXISTS report_owners (
+    owner TEXT NOT NULL,
+    business_location_id TEXT NOT NULL,
+    reimbursement_batch TEXT NOT NULL,
+    PRIMARY KEY (owner, business_location_id, reimbursement_batch)
+) WITHOUT ROWID;
+-- Totals per settle day ('' without a date), location and terminal
+CREATE TABLE IF NOT EXISTS daily_terminal (
+    settle_day TEXT NOT NULL,
+    business_location_id TEXT NOT NULL,
+    terminal_id TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    no_of_txn INTEGER NOT NULL,
+    gross_cents INTEGER NOT NULL,
+    ewt_cents INTEGER NOT NULL,
+    net_cents INTEGER NOT NULL,
+    PRIMARY KEY (settle_day, business_location_id, terminal_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS daily_terminal_terminal ON daily_terminal (terminal_id, settle_day);
+CREATE INDEX IF NOT EXISTS daily_terminal_location ON daily_terminal (business_location_id, settle_day);
+"""
+
+REPORT_UPSERT = """
+INSERT INTO reports (reimbursement_batch, customer_number, business_location_id, business_location_name,
+                     date_from, date_to, row_count, gross_cents, ewt_cents, net_cents, imported, reconciled)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (business_location_id, reimbursement_batch) DO UPDATE SET
+    customer_number = excluded.customer_number,
+    business_location_name = excluded.business_location_name,
+    date_from = excluded.date_from,
+    date_to = excluded.date_to,
+    row_count = excluded.row_count,
+    gross_cents = excluded.gross_cents,
+    ewt_cents = excluded.ewt_cents,
+    net_cents = excluded.net_cents,
+    imported = excluded.imported,
+    reconciled = excluded.reconciled
+"""
+
+TRANSACTION_UPSERT = """
+INSERT INTO transactions (reimbursement_batch, line, business_location_id, terminal_id, host_batch_id, ids,
+                          settle_date, no_of_txn, gross_cents, ewt_cents, net_cents, description)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (business_location_id, reimbursement_batch, line) DO UPDATE SET
+    terminal_id = excluded.terminal_id,
+    host_batch_id = excluded.host_batch_id,
+    ids = excluded.ids,
+    settle_date = excluded.settle_date,
+    no_of_txn = excluded.no_of_txn,
+    gross_cents = excluded.gross_cents,
+    ewt_cents = excluded.ewt_cents,
+    net_cents = excluded.net_cents,
+    description = excluded.description
+"""
+
+# Adds ({sign} '+') or removes ({sign} '-') one batch's rows in the rollup
+ROLLUP_UPDATE = """
+INSERT INTO daily_terminal (settle_day, business_location_id, terminal_id,
+                            rows, no_of_txn, gross_cents, ewt_cents, net_cents)
+SELECT COALESCE(substr(settle_date, 1, 10), ''), business_location_id, COALESCE(terminal_id, ''),
+       {sign}COUNT(*), {sign}SUM(no_of_txn), {sign}SUM(gross_cents), {sign}SUM(ewt_cents), {sign}SUM(net_cents)
+FROM transactions WHERE business_location_id = ? AND reimbursement_batch = ?
+GROUP BY 1, 2, 3
+ON CONFLICT (settle_day, business_location_id, terminal_id) DO UPDATE SET
+    rows = rows + excluded.rows,
+    no_of_txn = no_of_txn + excluded.no_of_txn,
+    gross_cents = gross_cents + excluded.gross_cents,
+    ewt_cents = ewt_cents + excluded.ewt_cents,
+    net_cents = net_cents + excluded.net_cents
+"""
+
+# Rows of batches flagged as not reconciling are left out of every query
+RECONCILED_ONLY = ("(business_location_id, reimbursement_batch) NOT IN "
+                   "(SELECT business_location_id, reimbursement_batch FROM reports WHERE NOT reconciled)")
+
+# Rollup query filters and the SQL condition each one adds
+ROLLUP_FILTERS = {
+    'business_location_id': 'business_location_id = ?',
+    'terminal_id': 'terminal_id = ?',
+    'since': 'settle_day >= ?',
+    'until': 'settle_day < ?',
+}
+
+TRANSACTION_COLUMNS = ('reimbursement_batch', 'business_location_id', 'terminal_id', 'host_batch_id', 'ids',
+                       'settle_date', 'no_of_txn', 'gross_cents', 'ewt_cents', 'net_cents', 'description')
+
+# Query filters and the SQL condition each one adds
+FILTERS = {
+    'business_location_id': 'business_location_id = ?',
+    'terminal_id': 'terminal_id = ?',
+    'host_batch_id': 'host_batch_id = ?',
+    'reimbursement_batch': 'reimbursement_batch = ?',
+    'since': 'settle_date >= ?',
+    'until': 'settle_date < ?',
+}
+
+
+def settle_text(minutes: int):
+    """Minutes since 1970 as '2025-11-01 13:58', or None without a date"""
+    if minutes == NO_DATE:
+        return None
+    return minutes_to_datetime(minutes).strftime('%Y-%m-%d %H:%M')
+
+
+def date_bound(value) -> str:
+    """A date or datetime filter in the stored settle date format"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def where_clause(filters: dict) -> tuple:
+    """(' WHERE ...', params) for the filters that are set"""
+    unknown = set(filters) - set(FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+    conditions, params = [RECONCILED_ONLY], []
+    for name, value in filters.items():
+        if value is None:
+            continue
+        conditions.append(FILTERS[name])
+        params.append(date_bound(value) if name in ('since', 'until') else value)
+    return ' WHERE ' + ' AND '.join(conditions), params
+
+
+class TransactionStore:
+    """SQLite store of extracted reports, one row per transaction"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        logger.info(f"Transaction store opened at {path}")
+
+    def _upsert(self, report: SettlementReport, now: float, reconciled: bool = None):
+        """Write one report's header and rows (the caller commits); reconciled is checked if not given"""
+        header = report.header
+        batch = str(header.get('reimbursement_batch') or '')
+        if not batch:
+            raise ValueError("Report has no reimbursement batch")
+        location = str(header.get('business_location_id') or '')
+        key = (location, batch)
+        totals = report.total_cents
+        if reconciled is None:
+            reconciled = report.reconcile().ok
+
+        stored = self._db.execute(
+            "SELECT reconciled FROM reports WHERE business_location_id = ? AND reimbursement_batch = ?", key
+        ).fetchone()
+        was_reconciled = stored is not None and stored[0]
+        if was_reconciled and not reconciled:
+            logger.warning(f"Kept stored batch {batch}: the new extraction does not reconcile")
+            return
+
+        self._db.execute(REPORT_UPSERT, (
+            batch, header.get('customer_number') or None, location, header.get('business_location_name') or None,
+            header.get('date_from') or None, header.get('date_to') or None, len(report),
+            totals['gross_amount'], totals['ewt'], totals['net_amount'], now, reconciled
+        ))
+        if was_reconciled:
+            self._db.execute(ROLLUP_UPDATE.format(sign='-'), key)
+
+        # Rows share few distinct settle times, so each is formatted once
+        settle_dates = {}
+        for minutes in report.settle_minutes:
+            if minutes not in settle_dates:
+                settle_dates[minutes] = settle_text(minutes)
+
+        rows = zip(
+            range(len(report)), report.terminal_id, report.host_batch_id, report.ids,
+            report.settle_minutes, report.no_of_txn,
+            report.gross_cents, report.ewt_cents, report.net_cents, report.description
+        )
+        self._db.executemany(TRANSACTION_UPSERT, (
+            (batch, line, location, terminal_id or None, host_batch_id or None, ids or None,
+             settle_dates[minutes], count, gross, ewt, net, description or None)
+            for line, terminal_id, host_batch_id, ids, minutes, count, gross, ewt, net, description in rows
+        ))
+        # A re-extraction may have fewer rows than the stored one
+        self._db.execute(
+            "DELETE FROM transactions WHERE business_location_id = ? AND reimbursement_batch = ? AND line >= ?",
+            key + (len(report),)
+        )
+        if reconciled:
+            self._db.execute(ROLLUP_UPDATE.format(sign='+'), key)
+        else:
+            logger.warning(f"Stored batch {batch} flagged as not reconciling; it is left out of queries")
+        self._db.execute("DELETE FROM daily_terminal WHERE rows = 0")
+
+    def save_reports(self, reports: list, owner=None, reconciled: list = None):
+        """
+        Insert or replace extracted reports (dicts or SettlementReports) in one transaction
+
+        owner (e.g. a Telegram user ID) is recorded as one of the senders of
+        each report; see add_owner. reconciled, if given, says for each report
+        whether it reconciles, so a caller that has checked already does not
+        pay for a second check.
+        """
+        models = [report if isinstance(report, SettlementReport) else SettlementReport.from_dict(report)
+                  for report in reports]
+        if reconciled is None:
+            reconciled = [None] * len(models)
+        now = time.time()
+        with self._lock:
+            try:
+                for model, is_reconciled in zip(models, reconciled):
+                    self._upsert(model, now, is_reconciled)
+                if owner is not None:
+                    self._add_owner(owner, [model.header for model in models])
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+        logger.info(f"Stored {len(models)} report(s), {sum(map(len, models))} transactions")
+
+    def save_report(self, report, owner=None, reconciled: bool = None):
+        """Insert or replace one extracted report"""
+        self.save_reports([report], owner, None if reconciled is None else [reconciled])
+
+    def _add_owner(self, owner, headers: list):
+        self._db.executemany(
+            "INSERT OR IGNORE INTO report_owners (owner, business_location_id, reimbursement_batch) VALUES (?, ?, ?)",
+            [(str(owner), str(header.get('business_location_id') or ''), str(header.get('reimbursement_batch') or ''))
+             for header in headers]
+        )
+
+    def add_owner(self, owner, reports: list):
+        """Record owner as a sender of already stored reports, e.g. on a cache hit"""
+        with self._lock:
+            self._add_owner(owner, [report['header'] for report in reports])
+            self._db.commit()
+
+    def locations(self, owner) -> list:
+        """Business locations of the reports owner has sent"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT business_location_id FROM report_owners WHERE owner = ? ORDER BY 1", (str(owner),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def transactions(self, limit: int = None, **filters) -> list:
+        """
+        Stored transactions matching the filters, ordered by settle date
+
+        Filters: business_location_id, terminal_id, host_batch_id,
+        reimbursement_batch, and since (inclusive) / until (exclusive) as
+        dates or datetimes. Amounts are Decimals and settle dates datetimes.
+        """
+        where, params = where_clause(filters)
+        sql = (f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM transactions{where} "
+               f"ORDER BY settle_date, business_location_id, reimbursement_batch, line")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+
+        results = []
+        settle_dates = {None: None}
+        for row in rows:
+            txn = dict(zip(TRANSACTION_COLUMNS, row))
+            settle_date = txn['settle_date']
+            if settle_date not in settle_dates:
+                settle_dates[settle_date] = datetime.strptime(settle_date, '%Y-%m-%d %H:%M')
+            txn['settle_date'] = settle_dates[settle_date]
+            for field in AMOUNT_FIELDS:
+                txn[field] = cents_to_decimal(txn.pop(field.replace('_amount', '') + '_cents'))
+            results.append(txn)
+        return results
+
+    def totals(self, **filters) -> dict:
+        """Row count, transaction count, gross, EWT and net over the matching transactions"""
+        where, params = where_clause(filters)
+        with self._lock:
+            rows, count, gross, ewt, net = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(no_of_txn), 0), COALESCE(SUM(gross_cents), 0), "
+                "COALESCE(SUM(ewt_cents), 0), COALESCE(SUM(net_cents), 0) "
+                f"FROM transactions{where}", params
+            ).fetchone()
+        return {
+            'rows': rows,
+            'no_of_txn': count,
+            'gross_amount': cents_to_decimal(gross),
+            'ewt': cents_to_decimal(ewt),
+            'net_amount': cents_to_decimal(net),
+        }
+
+    def summary(self, since: date = None, until: date = None, terminal_id: str = None,
+                business_location_id: str = None, business_location_ids: list = None) -> dict:
+        """
+        Totals per terminal and per settle day from the rollup table
+
+        Same shape as report_model.summarize: by_terminal, by_day (keyed
+        MM/DD/YYYY, '' for rows without a date) and total. since is
+        inclusive and until exclusive; rows without a settle date are only
+        included when neither is given. business_location_ids limits the
+        totals to those locations (an empty list matches nothing).
+        """
+        filters = {'since': since, 'until': until, 'terminal_id': terminal_id,
+                   'business_location_id': business_location_id}
+        conditions, params = [], []
+        for name, value in filters.items():
+            if value is None:
+                continue
+            conditions.append(ROLLUP_FILTERS[name])
+            if isinstance(value, datetime):
+                value = value.date()
+            params.append(value.isoformat() if isinstance(value, date) else value)
+        if business_location_ids is not None:
+            conditions.append(f"business_location_id IN ({', '.join('?' * len(business_location_ids))})")
+            params.extend(business_location_ids)
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+        sums = "SUM(no_of_txn), SUM(gross_cents), SUM(ewt_cents), SUM(net_cents)"
+        with self._lock:
+            by_terminal = self._db.execute(
+                f"SELECT terminal_id, {sums} FROM daily_terminal{where} GROUP BY terminal_id ORDER BY terminal_id",
+                params
+            ).fetchall()
+            by_day = self._db.execute(
+                f"SELECT settle_day, {sums} FROM daily_terminal{where} GROUP BY settle_day ORDER BY settle_day",
+                params
+            ).fetchall()
+
+        def bucket(count, gross, ewt, net) -> dict:
+            return {
+                'no_of_txn': count,
+                'gross_amount': cents_to_decimal(gross),
+                'ewt': cents_to_decimal(ewt),
+                'net_amount': cents_to_decimal(net),
+            }
+
+        def day_label(day: str) -> str:
+            return f"{day[5:7]}/{day[8:10]}/{day[:4]}" if day else ''
+
+        # Undated rows sort first in SQL; summarize puts them last
+        days = sorted(by_day, key=lambda row: row[0] == '')
+        total = [sum(column) for column in zip(*(row[1:] for row in by_terminal))] or [0, 0, 0, 0]
+        return {
+            'by_terminal': {row[0]: bucket(*row[1:]) for row in by_terminal},
+            'by_day': {day_label(row[0]): bucket(*row[1:]) for row in days},
+            'total': bucket(*total),
+        }
+
+    def batches(self, business_location_id: str = None) -> list:
+        """Stored reimbursement batches that reconcile, of one location or all, in batch number order"""
+        sql = "SELECT DISTINCT reimbursement_batch FROM reports WHERE reconciled"
+        params = []
+        if business_location_id is not None:
+            sql += " AND business_location_id = ?"
+            params.append(business_location_id)
+        sql += " ORDER BY CAST(reimbursement_batch AS INTEGER), reimbursement_batch"
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
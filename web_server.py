@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Webhook server for production deployments
+Receives Telegram updates and serves /metrics, /healthz and /readyz on the same port
+"""
+
+import re
+import json
+import signal
+import asyncio
+import logging
+from collections import OrderedDict
+
+import tornado.web
+import tornado.httpserver
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from telegram import Update
+from telegram.ext import Application
+
+from metrics import WEBHOOK_SECONDS, WEBHOOK_DUPLICATES
+
+logger = logging.getLogger(__name__)
+
+# How many recent update_ids are remembered to drop redeliveries
+RECENT_UPDATES = 10000
+
+
+class RecentUpdates:
+    """Bounded memory of update_ids that were already accepted"""
+
+    def __init__(self, size: int = RECENT_UPDATES):
+        self.size = size
+        self._ids = OrderedDict()
+
+    def add(self, update_id: int) -> bool:
+        """Remember an update_id; returns False if it was seen before"""
+        if update_id in self._ids:
+            return False
+        self._ids[update_id] = None
+        if len(self._ids) > self.size:
+            self._ids.popitem(last=False)
+        return True
+
+
+class TelegramWebhookHandler(tornado.web.RequestHandler):
+    """
+    Hands each update posted by Telegram to the application
+
+    The update is only queued here, so Telegram gets its 200 right away and
+    the download, extraction and reply run in the application's background
+    update processing. Telegram redelivers updates it thinks timed out;
+    those are recognized by update_id and acknowledged without queueing.
+    """
+
+    def initialize(self, bot_app: Application, recent_updates: RecentUpdates):
+        self.bot_app = bot_app
+        self.recent_updates = recent_updates
+
+    async def post(self):
+        with WEBHOOK_SECONDS.time():
+            try:
+                data = json.loads(self.request.body)
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                raise tornado.web.HTTPError(400, reason="Invalid JSON")
+
+            update_id = data.get('update_id') if isinstance(data, dict) else None
+            if update_id is not None and not self.recent_updates.add(update_id):
+                WEBHOOK_DUPLICATES.inc()
+                logger.info(f"Ignoring redelivered update {update_id}")
+                return
+
+            update = Update.de_json(data, self.bot_app.bot)
+            self.bot_app.update_queue.put_nowait(update)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header('Content-Type', CONTENT_TYPE_LATEST)
+        self.write(generate_latest())
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    """Liveness: the process and its event loop are responding"""
+
+    def get(self):
+        self.write({'status': 'ok'})
+
+
+class ReadyHandler(tornado.web.RequestHandler):
+    """Readiness: the bot is running and its report queue can take more work"""
+
+    def initialize(self, bot_app: Application, readiness):
+        self.bot_app = bot_app
+        self.readiness = readiness
+
+    def get(self):
+        problems = [] if self.bot_app.running else ['application not running']
+        if self.readiness is not None:
+            problems.extend(self.readiness())
+
+        if problems:
+            self.set_status(503)
+            self.write({'status': 'unavailable', 'problems': problems})
+        else:
+            self.write({'status': 'ready'})
+
+
+def make_web_app(application: Application, url_path: str, readiness=None,
+                 recent_updates: RecentUpdates = None) -> tornado.web.Application:
+    """
+    Routes for the webhook and the monitoring endpoints
+
+    readiness is an optional callable returning a list of reasons the bot
+    cannot take traffic right now (empty when ready).
+    """
+    webhook_args = {'bot_app': application, 'recent_updates': recent_updates or RecentUpdates()}
+    return tornado.web.Application([
+        (rf'/{re.escape(url_path.strip("/"))}/?', TelegramWebhookHandler, webhook_args),
+        (r'/metrics', MetricsHandler),
+        (r'/healthz', HealthHandler),
+        (r'/readyz', ReadyHandler, {'bot_app': application, 'readiness': readiness}),
+    ])
+
+
+async def serve_webhook(application: Application, listen: str, port: int, url_path: str,
+                        webhook_url: str, readiness=None, on_listening=None):
+    """
+    Run the bot behind our own webhook server until SIGINT or SIGTERM
+
+    on_listening is an optional coroutine function started as a background
+    task once the server accepts connections.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    # The Application only calls these hooks itself in run_polling/run_webhook
+    await application.initialize()
+    if application.post_init is not None:
+        await application.post_init(application)
+
+    server = tornado.httpserver.HTTPServer(make_web_app(application, url_path, readiness))
+    try:
+        await application.bot.set_webhook(url=webhook_url, allowed_updates=Update.ALL_TYPES)
+        await application.start()
+        server.listen(port, address=listen)
+        logger.info(f"Webhook server listening on {listen}:{port}")
+        if on_listening is not None:
+            application.create_task(on_listening())
+
+        await stop.wait()
+    finally:
+        server.stop()
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        if application.post_shutdown is not None:
+            await application.post_shutdown(application)
+
+
+def run_webhook_server(application: Application, listen: str, port: int, url_path: str,
+                       webhook_url: str, readiness=None, on_listening=None):
+    """Blocking entry point, like Application.run_webhook"""
+    asyncio.run(serve_webhook(application, listen, port, url_path, webhook_url, readiness, on_listening))